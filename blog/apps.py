@@ -1,4 +1,6 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_migrate
+from django.urls import register_converter
 
 
 class BlogConfig(AppConfig):
@@ -8,3 +10,10 @@ class BlogConfig(AppConfig):
     def ready(self):
         # Imported for its side effects: registers the signal handlers.
         import blog.signals  # noqa: F401
+        from blog.converters import MonthConverter
+
+        register_converter(MonthConverter, "month")
+
+        from blog import search
+
+        post_migrate.connect(search.install, sender=self)
@@ -0,0 +1,62 @@
+"""
+Path converters for blog URLs.
+
+Registered in BlogConfig.ready() so both blog.urls and the til redirect
+shim can use them.
+"""
+
+MONTHS = (
+    "jan",
+    "feb",
+    "mar",
+    "apr",
+    "may",
+    "jun",
+    "jul",
+    "aug",
+    "sep",
+    "oct",
+    "nov",
+    "dec",
+)
+_FULL_NAMES = (
+    "january",
+    "february",
+    "march",
+    "april",
+    "may",
+    "june",
+    "july",
+    "august",
+    "september",
+    "october",
+    "november",
+    "december",
+)
+_NUMBERS = {
+    name: number
+    for names in (MONTHS, _FULL_NAMES)
+    for number, name in enumerate(names, start=1)
+}
+
+
+class MonthConverter:
+    """
+    A month in a date URL: "jul" (canonical) or "July", any case -> 7.
+
+    Anything else fails to match, so /2025/foo/ is a 404 before the view
+    runs instead of quietly meaning January.
+    """
+
+    regex = "[A-Za-z]{3,9}"
+
+    def to_python(self, value):
+        try:
+            return _NUMBERS[value.lower()]
+        except KeyError:
+            raise ValueError(value) from None
+
+    def to_url(self, value):
+        if isinstance(value, int):
+            return MONTHS[value - 1]
+        return MONTHS[self.to_python(value) - 1]
@@ -0,0 +1,88 @@
+"""
+Generation counters: versions for cache keys that move when content does.
+
+A scope names something pages are built from: "site" (SiteSettings),
+"entry:12", "blogmark:7", "tag:3" (a tag's name and members) and
+"year:2024" (what was published that year). Its counter lives in the
+default cache, and keys built from it, such as {% cache %} fragments
+varying on {% generation %} or the cached year/month/tag timelines, change
+when it moves. bump() therefore invalidates all of them at once in O(1):
+nothing is deleted, the old entries are simply never read again and expire
+on their own timeout.
+
+Counters never expire unless started with a timeout (the per-URL ones of
+blog.page_cache are, so paths nobody links to do not pile up). One the
+cache has lost (expired, evicted, flushed) restarts from the clock in
+nanoseconds, never from a value an old key may still carry. A cache
+outage is logged and gives a fresh value, i.e. a miss: pages must never
+fail because a cache is down.
+
+The signals use bump_on_commit(), which bumps at once and again after the
+transaction commits: a request rendering between the two could cache the
+old content under the first new generation, and the second retires it.
+"""
+
+import logging
+import time
+
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+PREFIX = "generation:"
+
+
+def _fresh():
+    return time.time_ns()
+
+
+def get_many(scopes, timeout=None):
+    """{scope: generation} for `scopes`, starting any that are missing (to
+    expire after `timeout` seconds, if given)."""
+    keys = {f"{PREFIX}{scope}": scope for scope in scopes}
+    try:
+        found = cache.get_many(keys)
+        missing = [key for key in keys if key not in found]
+        for key in missing:
+            # add() keeps a counter another process started meanwhile.
+            cache.add(key, _fresh(), timeout)
+        if missing:
+            found.update(cache.get_many(missing))
+    except Exception:
+        logger.warning("generation read failed", exc_info=True)
+        found = {}
+    return {scope: found.get(key) or _fresh() for key, scope in keys.items()}
+
+
+def get(scope, timeout=None):
+    """The current generation of `scope`."""
+    return get_many([scope], timeout)[scope]
+
+
+def content_scopes(obj):
+    """The scopes a save of an entry or blogmark `obj` changes, but for its
+    tags': its own and its year's."""
+    year = timezone.localtime(obj.created).year  # as the year pages bucket it
+    return [f"{obj._meta.model_name}:{obj.pk}", f"year:{year}"]
+
+
+def bump(*scopes, timeout=None):
+    """Move the counters of `scopes`, invalidating every key built on them."""
+    for scope in scopes:
+        key = f"{PREFIX}{scope}"
+        try:
+            try:
+                cache.incr(key)
+            except ValueError:  # lost: restart from the clock
+                cache.add(key, _fresh(), timeout)
+        except Exception:
+            logger.warning("generation bump of %s failed", scope, exc_info=True)
+
+
+def bump_on_commit(*scopes, timeout=None):
+    """bump() now and again once the current transaction commits."""
+    if scopes:
+        bump(*scopes, timeout=timeout)
+        transaction.on_commit(lambda: bump(*scopes, timeout=timeout))
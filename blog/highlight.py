@@ -0,0 +1,74 @@
+"""
+Content-addressed cache for Pygments code-block highlighting.
+
+codehilite (and fenced_code, which delegates to it) re-lexes and re-highlights
+every code block on every render, and for unlabelled blocks first runs
+Pygments' lexer guessing over every lexer. Highlighted HTML depends only on
+the code, the language and the highlighter options, so it is cached under
+(lexer, options, sha256 of the code) in two layers:
+
+- an in-process LRU, for repeated blocks within a worker;
+- the default Django cache (Redis in production), shared across workers,
+  re-renders and deploys. The key includes the markdown and Pygments
+  versions, so an upgrade never serves stale markup.
+
+The two layers are a blog.layered_cache.LayeredCache.
+
+Both markdown extensions construct CodeHilite through their module globals,
+so install() points those at CachedCodeHilite; it is called once, when
+blog.rendering is imported. Hit/miss counters are available from stats().
+"""
+
+import hashlib
+
+import markdown
+import pygments
+from django.conf import settings
+from markdown.extensions import codehilite, fenced_code
+
+from blog.layered_cache import LayeredCache
+
+_cache = LayeredCache(
+    "highlight",
+    memory_entries=1024,
+    timeout=lambda: settings.HIGHLIGHT_CACHE_TIMEOUT,
+)
+stats = _cache.stats
+reset = _cache.reset
+
+
+def cache_key(highlighter):
+    """Key for a CodeHilite instance, taken before hilite() mutates it."""
+    options = sorted((k, repr(v)) for k, v in highlighter.options.items())
+    params = repr(
+        (
+            markdown.__version__,
+            pygments.__version__,
+            highlighter.lang,
+            highlighter.guess_lang,
+            highlighter.use_pygments,
+            highlighter.lang_prefix,
+            repr(highlighter.pygments_formatter),
+            options,
+        )
+    )
+    digest = hashlib.sha256(params.encode())
+    digest.update(b"\0")
+    digest.update(highlighter.src.encode())
+    return f"highlight:{digest.hexdigest()}"
+
+
+class CachedCodeHilite(codehilite.CodeHilite):
+    def hilite(self, shebang=True):
+        key = cache_key(self) + (":shebang" if shebang else "")
+        html = _cache.get(key)
+        if html is None:
+            html = super().hilite(shebang)
+            _cache.set(key, html)
+        return html
+
+
+def install():
+    """Route codehilite and fenced_code through CachedCodeHilite."""
+    codehilite.CodeHilite = CachedCodeHilite
+    fenced_code.CodeHilite = CachedCodeHilite
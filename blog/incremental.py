@@ -0,0 +1,161 @@
+"""
+Block-level incremental rendering for long markdown documents.
+
+Saving a long post re-renders its whole body even when one paragraph changed.
+For documents over INCREMENTAL_MIN_CHARS, render() instead splits the source
+into top-level blocks (paragraphs, headings, fenced code, lists, tables),
+renders each block on its own and caches the HTML by a hash of the block plus
+the rendering config. After a one-line edit only the changed block misses;
+the rest come from the in-process LRU (or the shared cache), so the cost is a
+hash over the document plus one block render, whatever the post's length.
+
+Python-Markdown serialises each top-level element followed by a newline,
+strips that, runs the postprocessors (which splice stashed HTML such as
+highlighted code back in, often with its own trailing newline) and strips
+again. Joining each block's output from before that final strip (captured by
+RawOutputExtension) with "\\n" and stripping once therefore gives the same
+bytes as a full render, provided no block's meaning depends on another.
+split_blocks() only cuts at a run of blank lines, outside fenced code and
+outside a {{shortcode}}, and only when the next line starts a block of its
+own: not indented, and not a list item, blockquote or definition, which can
+continue across blank lines. A definition list also absorbs a following one,
+so those stay together.
+
+Documents with reference-link, footnote or abbreviation definitions, or with
+raw HTML blocks, have document-wide state (or blocks that can span blank
+lines); split_blocks() returns None for them and they are rendered whole.
+"""
+
+import hashlib
+import re
+
+from django.conf import settings
+from markdown.extensions import Extension
+from markdown.postprocessors import Postprocessor
+
+from blog.layered_cache import LayeredCache
+from blog.manifest import FENCE_OPEN, merge
+
+_cache = LayeredCache(
+    "markdown block",
+    memory_entries=4096,
+    timeout=lambda: settings.MARKDOWN_BLOCK_CACHE_TIMEOUT,
+)
+stats = _cache.stats
+reset = _cache.reset
+
+# [label]: url, [^note]: text and *[ABBR]: title definitions, and raw HTML.
+_DOCUMENT_STATE = re.compile(r"^(?: {0,3}\[[^\]\n]+\]:|\*\[[^\]\n]+\]:| {0,3}<)", re.M)
+# Lines that may continue the previous block after a blank line.
+_CONTINUATION = re.compile(r"[ \t>:]|[*+-][ \t]|\d+[.)][ \t]")
+# def_list's definition line; a definition list absorbs the next one.
+_DEFINITION = re.compile(r"^ {0,3}: {1,3}", re.M)
+
+
+def _chunks(text):
+    """(blank lines before, lines) per run of lines between blank lines.
+
+    Fenced code, and a {{shortcode}} whose caption spans a blank line, are
+    kept whole, blank lines and all.
+    """
+    before, lines, blanks, fence = [], [], [], None
+    unclosed = 0
+    for line in text.split("\n"):
+        if fence is not None:
+            lines.append(line)
+            if line.rstrip(" ") == fence:
+                fence = None
+            continue
+        if not line.strip():
+            blanks.append(line)
+            continue
+        if blanks and lines and not unclosed:
+            yield before, lines
+            lines = []
+        if not lines:
+            before, blanks = blanks, []
+        lines.extend(blanks)
+        blanks = []
+        lines.append(line)
+        unclosed = max(0, unclosed + line.count("{{") - line.count("}}"))
+        match = FENCE_OPEN.match(line)
+        if match:
+            fence = match.group("fence")
+    if lines:
+        yield before, lines
+
+
+def split_blocks(text):
+    """Top-level blocks of `text`, or None if it must be rendered whole."""
+    if _DOCUMENT_STATE.search(text):
+        return None
+    # As NormalizeWhitespace does, so admin (\r\n) input splits the same way.
+    text = text.replace("\r\n", "\n").replace("\r", "\n")
+    chunks = list(_chunks(text))
+    blocks, current = [], []
+    in_deflist = False
+    for i, (blanks, lines) in enumerate(chunks):
+        chunk = "\n".join(lines)
+        # Would this chunk (a definition, or the term of one that follows)
+        # join a definition list already in the current block?
+        defines = bool(_DEFINITION.search(chunk)) or (
+            i + 1 < len(chunks) and chunks[i + 1][1][0].startswith(":")
+        )
+        if current and not (_CONTINUATION.match(lines[0]) or (defines and in_deflist)):
+            blocks.append("\n".join(current))
+            current, in_deflist = [], False
+        elif current:
+            current.extend(blanks)
+        current.append(chunk)
+        in_deflist = in_deflist or defines
+    if current:
+        blocks.append("\n".join(current))
+    return blocks
+
+
+class RawOutputPostprocessor(Postprocessor):
+    """Keep the serialised output before Markdown.convert() strips it."""
+
+    def run(self, text):
+        self.md.raw_output = text
+        return text
+
+
+class RawOutputExtension(Extension):
+    def extendMarkdown(self, md):
+        # Lowest priority: runs after every other postprocessor.
+        md.postprocessors.register(RawOutputPostprocessor(md), "raw_output", 0)
+
+
+def block_key(fingerprint, block):
+    digest = hashlib.sha256(fingerprint.encode())
+    digest.update(b"\0")
+    digest.update(block.encode())
+    return f"mdblock:{digest.hexdigest()}"
+
+
+def render(text, render_block, fingerprint):
+    """(html, manifest) for `text`, rendered block by block with cached blocks.
+
+    `render_block` must return a block's unstripped output (see
+    RawOutputPostprocessor) and its content manifest; the block manifests
+    are merged in document order.
+
+    Returns None when the document is too short, or has document-wide state;
+    the caller then renders it whole.
+    """
+    if not text or len(text) < settings.INCREMENTAL_MIN_CHARS:
+        return None
+    blocks = split_blocks(text)
+    if blocks is None or len(blocks) < 2:
+        return None
+    rendered = []
+    for block in blocks:
+        key = block_key(fingerprint, block)
+        result = _cache.get(key)
+        if result is None:
+            result = render_block(block)
+            _cache.set(key, result)
+        rendered.append(result)
+    html = "\n".join(output for output, _ in rendered).strip()
+    return html, merge(manifest for _, manifest in rendered)
@@ -0,0 +1,73 @@
+"""
+Two-level cache for rendering fragments: an in-process LRU in front of the
+default Django cache.
+
+The in-process layer serves repeats within a worker without a network round
+trip; the Django cache (Redis in production) is shared across workers, the
+render_content process pool and deploys. Callers build content-addressed
+keys, so entries never need invalidating. A cache outage is logged and
+treated as a miss: rendering must never fail because a cache is down.
+"""
+
+import logging
+import threading
+from collections import Counter, OrderedDict
+
+from django.core.cache import cache
+
+logger = logging.getLogger(__name__)
+
+
+class LayeredCache:
+    def __init__(self, name, memory_entries, timeout):
+        self.name = name
+        self.memory_entries = memory_entries
+        # Seconds, or a zero-argument callable so settings are read lazily.
+        self.timeout = timeout
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._counters = Counter()
+
+    def stats(self):
+        """Counters for this process: memory_hits, cache_hits and misses."""
+        with self._lock:
+            return dict(self._counters)
+
+    def reset(self):
+        """Empty the in-process layer and zero the counters."""
+        with self._lock:
+            self._memory.clear()
+            self._counters.clear()
+
+    def get(self, key):
+        with self._lock:
+            value = self._memory.get(key)
+            if value is not None:
+                self._memory.move_to_end(key)
+                self._counters["memory_hits"] += 1
+                return value
+        try:
+            value = cache.get(key)
+        except Exception:
+            logger.warning("%s cache read failed", self.name, exc_info=True)
+            value = None
+        with self._lock:
+            self._counters["cache_hits" if value is not None else "misses"] += 1
+        if value is not None:
+            self._remember(key, value)
+        return value
+
+    def set(self, key, value):
+        try:
+            timeout = self.timeout() if callable(self.timeout) else self.timeout
+            cache.set(key, value, timeout)
+        except Exception:
+            logger.warning("%s cache write failed", self.name, exc_info=True)
+        self._remember(key, value)
+
+    def _remember(self, key, value):
+        with self._lock:
+            self._memory[key] = value
+            self._memory.move_to_end(key)
+            if len(self._memory) > self.memory_entries:
+                self._memory.popitem(last=False)
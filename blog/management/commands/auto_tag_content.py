@@ -14,15 +14,17 @@ Options:
     --limit N          Only process N items (useful for testing)
     --min-tags N       Minimum number of tags to generate (default: 2)
     --max-tags N       Maximum number of tags to generate (default: 5)
+    --offline          Suggest existing tags from similar posts instead of
+                       calling the API (needs build_similarity_index)
 """
 
 import os
 from typing import List
 
-import anthropic
 from django.core.management.base import BaseCommand, CommandError
 from django.db import transaction
 
+from blog import similarity
 from blog.models import Blogmark, Entry
 
 
@@ -61,21 +63,38 @@ class Command(BaseCommand):
             default=5,
             help="Maximum number of tags to generate (default: 5)",
         )
+        parser.add_argument(
+            "--offline",
+            action="store_true",
+            help="Vote existing tags from the most similar posts (blog.similarity) "
+            "instead of calling the API",
+        )
 
     def handle(self, *args, **options):
-        # Validate API key
-        api_key = os.environ.get("ANTHROPIC_API_KEY")
-        if not api_key:
-            raise CommandError(
-                "ANTHROPIC_API_KEY environment variable not set. "
-                "Please add it to your .env file."
-            )
+        self.offline = options["offline"]
+        if self.offline:
+            if similarity.get_index() is None:
+                raise CommandError(
+                    "No similarity index; run build_similarity_index first "
+                    "(it needs numpy)."
+                )
+        else:
+            # Validate API key
+            api_key = os.environ.get("ANTHROPIC_API_KEY")
+            if not api_key:
+                raise CommandError(
+                    "ANTHROPIC_API_KEY environment variable not set. "
+                    "Please add it to your .env file."
+                )
+            # Only the API path needs the client library.
+            import anthropic
+
+            self.client = anthropic.Anthropic(api_key=api_key)
 
         self.dry_run = options["dry_run"]
         self.force = options["force"]
         self.min_tags = options["min_tags"]
         self.max_tags = options["max_tags"]
-        self.client = anthropic.Anthropic(api_key=api_key)
 
         from taggit.models import Tag
 
@@ -201,7 +220,8 @@ class Command(BaseCommand):
         self, title: str, body: str, content_type: str, content_obj=None
     ) -> List[str]:
         """
-        Use Claude API to generate relevant tags for content.
+        Use Claude API to generate relevant tags for content, or with
+        --offline, existing tags voted for by the most similar posts.
 
         Args:
             title: Content title
@@ -212,6 +232,12 @@ class Command(BaseCommand):
         Returns:
             List of tag names
         """
+        if self.offline:
+            # --force replaces the tags, so the post's own may be suggested.
+            return similarity.suggest_tags(
+                content_obj, limit=self.max_tags, include_own=self.force
+            )
+
         # Truncate body if too long (keep first 2000 chars)
         truncated_body = body[:2000] + ("..." if len(body) > 2000 else "")
 
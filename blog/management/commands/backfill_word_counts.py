@@ -0,0 +1,70 @@
+"""
+Backfill Entry.word_count / reading_time for rows saved before those columns
+existed, or after the counting rules in blog.utils change.
+
+Entry.save() keeps the counts current, so this only matters for existing
+rows. Bodies are streamed in pk order as (pk, body, counts) tuples; each chunk
+is counted in one pass (the tag strip and split run in C) and only rows whose
+counts differ are written back, with a single bulk_update per chunk. As with
+render_content, `updated` is not bumped and no save signals fire.
+
+Examples:
+    python manage.py backfill_word_counts
+    python manage.py backfill_word_counts --dry-run
+"""
+
+from django.core.management.base import BaseCommand
+
+from blog.models import Entry
+from blog.utils import count_words, reading_time
+
+
+class Command(BaseCommand):
+    help = "Recompute stored word counts and reading times for entries"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=500,
+            help="Rows read and bulk-updated per batch (default: 500)",
+        )
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Report how many rows would change without writing",
+        )
+
+    def handle(self, *args, **options):
+        chunk_size = max(1, options["chunk_size"])
+        dry_run = options["dry_run"]
+        rows = (
+            Entry.objects.order_by("pk")
+            .values_list("pk", "body", "word_count", "reading_time")
+            .iterator(chunk_size=chunk_size)
+        )
+        checked = changed = 0
+        chunk = []
+        for row in rows:
+            chunk.append(row)
+            if len(chunk) >= chunk_size:
+                changed += self._flush(chunk, dry_run)
+                checked += len(chunk)
+                chunk = []
+        if chunk:
+            changed += self._flush(chunk, dry_run)
+            checked += len(chunk)
+
+        verb = "Would update" if dry_run else "Updated"
+        self.stdout.write(self.style.SUCCESS(f"{verb} {changed} of {checked} entries"))
+
+    def _flush(self, chunk, dry_run):
+        words = [count_words(body) for _, body, _, _ in chunk]
+        stale = [
+            Entry(pk=pk, word_count=count, reading_time=reading_time(count))
+            for (pk, _, old_count, old_minutes), count in zip(chunk, words)
+            if (count, reading_time(count)) != (old_count, old_minutes)
+        ]
+        if stale and not dry_run:
+            Entry.objects.bulk_update(stale, ["word_count", "reading_time"])
+        return len(stale)
@@ -0,0 +1,43 @@
+"""
+Build the static search index the browser queries (see
+blog.search.static_index).
+
+Incremental by default: only documents published, unpublished or saved since
+the last build are re-indexed, and only the shards they touch are written.
+With SEARCH_INDEX_ENABLED this also happens on every publish; run it once to
+create the index, and with --full after writes that bypass save().
+
+Examples:
+    python manage.py build_search_index
+    python manage.py build_search_index --full
+"""
+
+from django.core.management.base import BaseCommand
+
+from blog.search import static_index
+
+
+class Command(BaseCommand):
+    help = "Build the static client-side search index"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--full",
+            action="store_true",
+            help="Ignore the existing index and re-index every document",
+        )
+
+    def handle(self, *args, **options):
+        result = static_index.build(full=options["full"])
+        if result is None:
+            self.stdout.write(
+                "Another build is running; it builds again for this one when done"
+            )
+            return
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Indexed {result.documents} documents: {result.reindexed} "
+                f"re-indexed, {result.removed} removed, {result.written} files "
+                f"written to {static_index.manifest_url()}"
+            )
+        )
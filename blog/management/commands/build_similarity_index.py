@@ -0,0 +1,46 @@
+"""
+Build the TF-IDF index of published entries and blogmarks (see
+blog.similarity), then recompute the related items that draw on it.
+
+Incremental by default: only documents published or saved since the last
+build are re-tokenized. Run it on a schedule (after publish_scheduled, say);
+--full re-tokenizes everything, after writes that bypass save(). Needs numpy.
+
+Examples:
+    python manage.py build_similarity_index
+    python manage.py build_similarity_index --full
+"""
+
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from blog import similarity
+from blog.models import RelatedContent
+
+
+class Command(BaseCommand):
+    help = "Build the TF-IDF index behind related posts and tag suggestions"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--full",
+            action="store_true",
+            help="Ignore the existing index and re-tokenize every document",
+        )
+
+    def handle(self, *args, **options):
+        if similarity.np is None:
+            raise CommandError("build_similarity_index needs numpy installed")
+        start = time.perf_counter()
+        documents, tokenized = similarity.build(full=options["full"])
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Indexed {documents} documents ({tokenized} tokenized) in "
+                f"{time.perf_counter() - start:.1f}s at "
+                f"{settings.SIMILARITY_INDEX_DIR}"
+            )
+        )
+        rows = RelatedContent.rebuild()
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {rows} related items"))
@@ -3,15 +3,24 @@ Management command to publish scheduled content that is due.
 """
 
 import logging
+from collections import defaultdict
 
+from django.conf import settings
+from django.core.cache import cache
 from django.core.management.base import BaseCommand
 from django.db.models import Q
 from django.utils import timezone
 
-from blog.models import Blogmark, Entry
+from blog import generations, page_cache
+from blog.models import Blogmark, Entry, RelatedContent, TagCount
+from blog.search import static_index
+from projects.models import Project
 
 logger = logging.getLogger(__name__)
 
+# When the previous run started; content published since is what went live.
+LAST_RUN_KEY = "publish_scheduled:last-run"
+
 
 class Command(BaseCommand):
     help = "Publish scheduled blog content whose publish_date has passed"
@@ -70,6 +79,14 @@ class Command(BaseCommand):
                 count_blogmarks += 1
                 self.stdout.write(f"Published blogmark: {blogmark.title}")
 
+        if not dry_run:
+            # Content saved as published with a future publish_date goes live
+            # without any write, so no signal has counted it yet.
+            went_live = self._went_live()
+            if went_live:
+                self._refresh_went_live(went_live)
+            cache.set(LAST_RUN_KEY, now, None)
+
         # Output summary
         if dry_run:
             self.stdout.write(
@@ -83,3 +100,39 @@ class Command(BaseCommand):
                     f"Published {count_entries} entries and {count_blogmarks} blogmarks"
                 )
             )
+
+    def _went_live(self):
+        """Content published since the last run, saved or not."""
+        since = cache.get(LAST_RUN_KEY)
+        went_live = []
+        for model in (Entry, Blogmark, Project):
+            live = model.objects.published().filter(publish_date__isnull=False)
+            if since is not None:
+                live = live.filter(published_at__gt=since)
+            went_live.extend(live.prefetch_related("tags"))
+        return went_live
+
+    def _refresh_went_live(self, went_live):
+        """Recount the tag cloud, re-rank the related items and update the
+        search index for `went_live`, then retire its cached fragments
+        (blog.generations) and pages (blog.page_cache)."""
+        tag_ids, related, scopes, paths = defaultdict(set), set(), set(), set()
+        for obj in went_live:
+            ids = {tag.pk for tag in obj.tags.all()}
+            tag_ids[type(obj)].update(ids)
+            related.update(RelatedContent.affected_by(obj, ids))
+            scopes.update(generations.content_scopes(obj))
+            scopes.update(f"tag:{pk}" for pk in ids)
+            paths.update(page_cache.paths_for(obj))
+        for model in TagCount.TRACKED:
+            if tag_ids[model]:
+                TagCount.refresh(model, tag_ids[model])
+        RelatedContent.refresh(related)
+        if settings.SEARCH_INDEX_ENABLED:
+            try:
+                static_index.build()
+            except Exception:
+                # /search/ still finds it; the next save or run retries.
+                logger.exception("Could not update the static search index")
+        generations.bump(*scopes)
+        page_cache.purge(*paths)
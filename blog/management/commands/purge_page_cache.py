@@ -0,0 +1,37 @@
+"""
+Purge pages from the full-page cache (blog.page_cache).
+
+Saves purge the pages they change on their own; this is for what they
+cannot see: a deploy changing templates or static asset URLs (--all), or a
+page fixed by hand. Every cached variant of a path goes, whatever its query
+string or headers.
+
+Examples:
+    python manage.py purge_page_cache --all
+    python manage.py purge_page_cache / /posts/ /tag/python/
+"""
+
+from django.core.management.base import BaseCommand, CommandError
+
+from blog import page_cache
+
+
+class Command(BaseCommand):
+    help = "Purge pages from the full-page cache"
+
+    def add_arguments(self, parser):
+        parser.add_argument("paths", nargs="*", help="URL paths, e.g. /posts/")
+        parser.add_argument("--all", action="store_true", help="Purge every page")
+
+    def handle(self, *args, **options):
+        paths = options["paths"]
+        if options["all"]:
+            page_cache.purge_all()
+            self.stdout.write(self.style.SUCCESS("Purged every page"))
+        elif paths:
+            if bad := [path for path in paths if not path.startswith("/")]:
+                raise CommandError(f"Paths start with /: {', '.join(bad)}")
+            page_cache.purge(*paths)
+            self.stdout.write(self.style.SUCCESS(f"Purged {len(paths)} path(s)"))
+        else:
+            raise CommandError("Give paths to purge or --all")
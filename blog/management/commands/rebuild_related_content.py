@@ -0,0 +1,23 @@
+"""
+Recompute the precomputed related items of every entry, blogmark and project
+(RelatedContent).
+
+The blog signals keep the rows current on every save, tag change and delete,
+so this is only needed after writes that bypass them (queryset update(), raw
+SQL, loaddata) or to create the rows after the table is added.
+
+Examples:
+    python manage.py rebuild_related_content
+"""
+
+from django.core.management.base import BaseCommand
+
+from blog.models import RelatedContent
+
+
+class Command(BaseCommand):
+    help = "Recompute the related items shown on entry pages"
+
+    def handle(self, *args, **options):
+        rows = RelatedContent.rebuild()
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {rows} related items"))
@@ -0,0 +1,32 @@
+"""
+Rebuild the /search/ index of entries and blogmarks (see blog.search).
+
+The index is kept current on save (PostgreSQL: the blog signals recompute
+search_vector; SQLite: triggers update the FTS5 tables), so this is only
+needed after writes that bypass it (queryset update(), raw SQL, loaddata on
+PostgreSQL) or after changing SEARCH_CONFIG or a model's SEARCH_WEIGHTS.
+Does nothing with SimpleBackend, which has no index.
+
+Examples:
+    python manage.py rebuild_search_index
+"""
+
+from django.core.management.base import BaseCommand
+
+from blog import search
+
+
+class Command(BaseCommand):
+    help = "Rebuild the search index behind /search/"
+
+    def handle(self, *args, **options):
+        backend = search.get_backend()
+        if not backend.indexed:
+            self.stdout.write(f"{type(backend).__name__} keeps no index; nothing to do")
+            return
+        search.install()
+        for model in search.searchable_models():
+            rows = backend.rebuild(model)
+            self.stdout.write(
+                self.style.SUCCESS(f"Indexed {rows} {model._meta.verbose_name_plural}")
+            )
@@ -0,0 +1,23 @@
+"""
+Rebuild the materialized tag counts behind the /posts/ tag cloud (TagCount).
+
+The blog signals keep the counts current on every tag change, save and
+delete, so this is only needed after writes that bypass them (queryset
+update(), raw SQL, loaddata) or to create the rows after the table is added.
+Each tracked model is recounted with one grouped query.
+
+Examples:
+    python manage.py rebuild_tag_counts
+"""
+
+from django.core.management.base import BaseCommand
+
+from blog.models import TagCount
+
+
+class Command(BaseCommand):
+    help = "Recount published tag usage for the /posts/ tag cloud"
+
+    def handle(self, *args, **options):
+        rows = TagCount.rebuild()
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {rows} tag counts"))
@@ -0,0 +1,229 @@
+"""
+Backfill or refresh the stored HTML renders of markdown content.
+
+Entry/Blogmark/Project keep pre-rendered HTML next to their markdown, keyed by
+a hash of the sources plus the markdown config and library versions (see
+blog.rendering). save() keeps it current, but rows written before the columns
+existed, or after a MARKDOWN_EXTENSIONS / markdown / Pygments change, need a
+pass of this command. Rows whose hash is already current are skipped unless
+--force is given; rows whose last render went over budget are retried.
+
+Rows are streamed in pk order with .iterator(); the markdown work for each
+chunk fans out across a process pool (one worker per core by default) and the
+results are written back with bulk_update, so `updated` (sitemap lastmod) is
+not bumped and no save signals fire for what is a cache refresh. The rows'
+generations (blog.generations) are bumped instead, retiring cached fragments,
+and if anything was rendered the full-page cache (blog.page_cache) is purged.
+
+Resuming: every chunk is committed as it completes, so after an interruption
+a plain re-run only picks up rows that are still stale. A --force run can't
+tell done rows from pending ones; it prints the last committed pk per type,
+to pass back as --after-pk.
+
+Examples:
+    python manage.py render_content --all
+    python manage.py render_content --type entry --since 2025-01-01
+    python manage.py render_content --all --force --jobs 4
+    python manage.py render_content --type entry --force --after-pk 1200
+"""
+
+import datetime
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import django
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+from blog import generations, page_cache
+from blog.rendering import RenderBudgetExceeded, render_document
+
+from ._content_registry import CONTENT_TYPES, resolve_types
+
+
+def _init_worker():
+    # Under the spawn/forkserver start methods the worker is a fresh
+    # interpreter; load settings (inherited via DJANGO_SETTINGS_MODULE). It is
+    # a no-op for forked workers, which inherit the configured parent.
+    django.setup()
+
+
+def _render_row(sources):
+    """Worker: (html, manifest) for each of one row's markdown sources.
+
+    An over-budget source comes back as its RenderBudgetExceeded, for the
+    parent to resolve against the row's stored HTML.
+    """
+    rendered = []
+    for text in sources:
+        # Whole-document renders: a backfill mostly follows a config change,
+        # which invalidates every cached block, so per-block rendering would
+        # only add overhead and fill the cache.
+        try:
+            rendered.append(render_document(text, blocks=False))
+        except RenderBudgetExceeded as exc:
+            rendered.append(exc)
+    return rendered
+
+
+def _parse_since(value):
+    moment = parse_datetime(value)
+    if moment is None:
+        day = parse_date(value)
+        if day is None:
+            raise CommandError(f"--since: cannot parse '{value}' as a date")
+        moment = datetime.datetime.combine(day, datetime.time.min)
+    if timezone.is_naive(moment):
+        moment = timezone.make_aware(moment)
+    return moment
+
+
+class Command(BaseCommand):
+    help = "Re-render stored HTML for markdown content whose source or config changed"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--type",
+            choices=sorted(CONTENT_TYPES),
+            help="Content type to render (omit when using --all)",
+        )
+        parser.add_argument(
+            "--all", action="store_true", help="Render all content types"
+        )
+        parser.add_argument(
+            "--since",
+            help="Only rows updated on/after this date or ISO datetime",
+        )
+        parser.add_argument(
+            "--force",
+            action="store_true",
+            help="Re-render every row, even if its stored hash is current",
+        )
+        parser.add_argument(
+            "--after-pk",
+            type=int,
+            default=0,
+            help="Skip rows with pk <= this (resume an interrupted --force run; "
+            "needs --type)",
+        )
+        parser.add_argument(
+            "--jobs",
+            type=int,
+            default=os.cpu_count() or 1,
+            help="Worker processes (default: one per core; 1 renders in-process)",
+        )
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=200,
+            help="Rows read, rendered and bulk-updated per batch (default: 200)",
+        )
+
+    def handle(self, *args, **options):
+        types = resolve_types(options)
+        if options["after_pk"] and not options["type"]:
+            # pks are per table: one resume point would skip rows of the rest.
+            raise CommandError("--after-pk needs --type")
+        since = _parse_since(options["since"]) if options["since"] else None
+        self.jobs = max(1, options["jobs"])
+        self.force = options["force"]
+        self.chunk_size = max(1, options["chunk_size"])
+        # Started on the first batch with work to spread, so a deploy-time run
+        # where nothing is stale never pays for spinning up workers.
+        self.pool = None
+        self.rendered = self.unchanged = self.over_budget = 0
+        started = time.perf_counter()
+        try:
+            for tname in types:
+                model = CONTENT_TYPES[tname]["model"]
+                qs = model.objects.filter(pk__gt=options["after_pk"]).order_by("pk")
+                if since:
+                    qs = qs.filter(updated__gte=since)
+                self._render_type(tname, model, qs)
+        finally:
+            if self.pool:
+                self.pool.shutdown(cancel_futures=True)
+            if self.rendered:
+                # Whole pages embed the HTML wherever it is listed.
+                page_cache.purge_all()
+
+        elapsed = time.perf_counter() - started
+        rate = self.rendered / elapsed if elapsed else 0.0
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Rendered {self.rendered}, unchanged {self.unchanged} "
+                f"in {elapsed:.1f}s ({rate:.1f} docs/sec)"
+            )
+        )
+        if self.over_budget:
+            self.stderr.write(
+                f"{self.over_budget} field(s) exceeded the render budget and "
+                "fell back to the last good render or escaped source (see the log)"
+            )
+
+    def _render_type(self, tname, model, qs):
+        columns = model.rendered_columns()
+        # Only what hashing/rendering needs; the HTML columns are write-only here.
+        # `created` names the year whose cached listings show the HTML.
+        qs = qs.only(
+            "pk", "created", "rendered_hash", "render_failed", *model.RENDERED_FIELDS
+        )
+        batch, last_pk = [], None
+        try:
+            for obj in qs.iterator(chunk_size=self.chunk_size):
+                batch.append(obj)
+                if len(batch) >= self.chunk_size:
+                    self._flush(model, batch, columns)
+                    last_pk, batch = batch[-1].pk, []
+            if batch:
+                self._flush(model, batch, columns)
+                last_pk = batch[-1].pk
+        except KeyboardInterrupt:
+            if last_pk is not None:
+                self.stderr.write(
+                    f"Interrupted: {tname} committed through pk {last_pk}; "
+                    f"resume with --type {tname} --after-pk {last_pk}"
+                )
+            raise
+
+    def _flush(self, model, batch, columns):
+        stale = []
+        for obj in batch:
+            digest = obj.compute_rendered_hash()
+            if self.force or obj.render_failed or digest != obj.rendered_hash:
+                stale.append((obj, digest))
+        self.unchanged += len(batch) - len(stale)
+        if not stale:
+            return
+
+        sources = [obj.rendered_sources() for obj, _ in stale]
+        if self.jobs > 1 and len(sources) > 1:
+            if self.pool is None:
+                self.pool = ProcessPoolExecutor(
+                    max_workers=self.jobs, initializer=_init_worker
+                )
+            chunksize = max(1, len(sources) // (self.jobs * 4))
+            results = self.pool.map(_render_row, sources, chunksize=chunksize)
+        else:
+            results = map(_render_row, sources)
+        for (obj, digest), rendered in zip(stale, results):
+            for i, source in enumerate(model.RENDERED_FIELDS):
+                if isinstance(rendered[i], RenderBudgetExceeded):
+                    # The stored HTML was deferred by .only(); it is loaded
+                    # just for this row.
+                    html = obj.budget_fallback(
+                        source, getattr(obj, source), rendered[i]
+                    )
+                    rendered[i] = (html, None)  # render_failed: retried next run
+                    self.over_budget += 1
+            obj.apply_rendered(rendered, digest)
+
+        model.objects.bulk_update([obj for obj, _ in stale], columns)
+        # No save signals fire, so retire the cached fragments and timelines
+        # showing the old HTML here.
+        generations.bump_on_commit(
+            *{scope for obj, _ in stale for scope in generations.content_scopes(obj)}
+        )
+        self.rendered += len(stale)
@@ -4,13 +4,15 @@ Django management command to sync images to Azure Blob Storage.
 This command is useful when:
 1. Migrating from local storage to Azure Blob Storage
 2. Re-uploading images that failed to upload
-3. Fixing broken image references
+3. Fixing broken image references, including images referenced from markdown
+   ({{img:...}} shortcodes and ![](...)), read from each row's content manifest
 
 Usage:
     python manage.py sync_images_to_azure [--dry-run] [--force]
 """
 
 from django.conf import settings
+from django.core.files.storage import default_storage
 from django.core.management.base import BaseCommand
 
 from blog.models import Blogmark, Entry
@@ -60,6 +62,10 @@ class Command(BaseCommand):
         self.stdout.write(self.style.HTTP_INFO("\n🔗 Checking blogmarks..."))
         self.check_entries(Blogmark.objects.all(), dry_run, force)
 
+        # Check images referenced inside markdown content
+        self.stdout.write(self.style.HTTP_INFO("\n🖼️  Checking inline images..."))
+        self.check_inline_images([Entry, Blogmark])
+
         self.stdout.write("\n" + "=" * 70)
         self.stdout.write(self.style.SUCCESS("✅ Sync complete!"))
         self.stdout.write("=" * 70 + "\n")
@@ -122,3 +128,34 @@ class Command(BaseCommand):
                 self.style.ERROR(f"    ⚠️  {entry.title[:50]}: ERROR - {str(e)}")
             )
             return "error"
+
+    def check_inline_images(self, models):
+        """Check media files referenced from markdown, via content_manifest."""
+        missing_count = checked = 0
+        for model in models:
+            rows = (
+                model.objects.filter(content_manifest__has_key="images")
+                .only("pk", "title", "content_manifest")
+                .iterator()
+            )
+            for obj in rows:
+                for url in obj.content_manifest["images"]:
+                    if not url.startswith(settings.MEDIA_URL):
+                        continue  # external image
+                    checked += 1
+                    name = url[len(settings.MEDIA_URL) :]
+                    if not default_storage.exists(name):
+                        missing_count += 1
+                        self.stdout.write(
+                            self.style.ERROR(
+                                f"    ❌ {obj.title[:50]}: MISSING - {name}"
+                            )
+                        )
+                        self.stdout.write(
+                            f"       Admin URL: /admin/{model._meta.app_label}/"
+                            f"{model._meta.model_name}/{obj.pk}/change/"
+                        )
+
+        self.stdout.write(f"\n  Checked {checked} inline image references")
+        if missing_count:
+            self.stdout.write(self.style.ERROR(f"    ❌ Missing: {missing_count}"))
@@ -0,0 +1,155 @@
+"""
+Content manifest: facts about a document, gathered during its markdown parse.
+
+ManifestExtension rides along with the render (it is part of the converter
+render_markdown uses), so the manifest costs one walk over the element tree
+and the stashed raw HTML, with no second parse. BaseEntry stores the merged
+manifest of its markdown fields in `content_manifest`, next to the HTML:
+
+    {
+        "links": ["https://example.com/", "/2025/jan/1/post/"],
+        "images": ["/media/uploads/photo.jpg"],
+        "media": ["https://www.youtube.com/embed/..."],
+        "headings": [[2, "Setup", "setup"], [3, "Install", null]],
+        "code": ["python", "bash"],
+    }
+
+links/images/media are unique, in document order; headings are
+[level, text, id]; code lists the languages declared on fenced blocks.
+Empty keys are omitted, so a plain-prose post stores {}. Query it from the
+ORM, e.g. Entry.objects.filter(content_manifest__code__contains=["rust"]).
+"""
+
+import re
+from html import unescape
+
+from markdown import util
+from markdown.extensions import Extension
+from markdown.preprocessors import Preprocessor
+from markdown.treeprocessors import Treeprocessor
+
+# Keys whose values are de-duplicated strings.
+UNIQUE_KEYS = ("links", "images", "media", "code")
+HEADINGS = {"h1": 1, "h2": 2, "h3": 3, "h4": 4, "h5": 5, "h6": 6}
+MEDIA_TAGS = {"iframe", "video", "audio", "source", "embed"}
+
+# Same opening rule as fenced_code's FENCED_BLOCK_RE, capturing the language.
+FENCE_OPEN = re.compile(
+    r"(?P<fence>~{3,}|`{3,})[ ]*"
+    r"(?:\{(?P<attrs>[^\n]*)\}|\.?(?P<lang>[\w#.+-]*)[ ]*"
+    r"(?:hl_lines=(?P<quot>\"|').*?(?P=quot)[ ]*)?)$"
+)
+_ATTR_LANG = re.compile(r"\.([\w#.+-]+)")
+# src/href on tags in raw HTML (shortcode figures, embeds, inline HTML).
+_RAW_REFERENCE = re.compile(
+    r"<(a|img|iframe|video|audio|source|embed)\b[^>]*?\s(?:href|src)=[\"']([^\"']+)",
+    re.IGNORECASE,
+)
+
+
+def merge(manifests):
+    """Combine manifests (e.g. of a post's summary and body, or its blocks)."""
+    merged = {}
+    for manifest in manifests:
+        for key, values in manifest.items():
+            if key in UNIQUE_KEYS:
+                existing = merged.setdefault(key, [])
+                existing.extend(value for value in values if value not in existing)
+            else:
+                merged.setdefault(key, []).extend(values)
+    return merged
+
+
+class _Collector:
+    def __init__(self):
+        self.manifest = {}
+
+    def add(self, key, value):
+        values = self.manifest.setdefault(key, [])
+        if value not in values:
+            values.append(value)
+
+
+class FenceLanguagePreprocessor(Preprocessor):
+    """Record the language declared on each fenced code block."""
+
+    def run(self, lines):
+        collector = self.md.manifest_collector
+        fence = None
+        for line in lines:
+            if fence is not None:
+                if line.rstrip(" ") == fence:
+                    fence = None
+                continue
+            match = FENCE_OPEN.match(line)
+            if match:
+                fence = match.group("fence")
+                lang = match.group("lang")
+                if match.group("attrs"):
+                    found = _ATTR_LANG.search(match.group("attrs"))
+                    lang = found.group(1) if found else None
+                if lang:
+                    collector.add("code", lang)
+        return lines
+
+
+class ManifestTreeprocessor(Treeprocessor):
+    """Collect links, images, media and headings from the finished tree."""
+
+    def run(self, root):
+        self.collector = self.md.manifest_collector
+        self._walk(root)
+
+    def _walk(self, element):
+        # Depth-first, visiting raw HTML where its placeholder sits, so
+        # everything is recorded in document order.
+        tag = element.tag
+        if tag == "a" and element.get("href"):
+            self.collector.add("links", self._unescape(element.get("href")))
+        elif tag == "img" and element.get("src"):
+            self.collector.add("images", self._unescape(element.get("src")))
+        elif tag in MEDIA_TAGS and element.get("src"):
+            self.collector.add("media", self._unescape(element.get("src")))
+        elif tag in HEADINGS:
+            text = util.HTML_PLACEHOLDER_RE.sub("", "".join(element.itertext()))
+            self.collector.manifest.setdefault("headings", []).append(
+                [HEADINGS[tag], self._unescape(text).strip(), element.get("id")]
+            )
+        self._raw_html(element.text)
+        for child in element:
+            self._walk(child)
+            self._raw_html(child.tail)
+
+    def _raw_html(self, text):
+        """References in raw HTML (shortcode output included) stashed in `text`."""
+        if not text or util.STX not in text:
+            return
+        blocks = self.md.htmlStash.rawHtmlBlocks
+        for placeholder in util.HTML_PLACEHOLDER_RE.finditer(text):
+            index = int(placeholder.group(1))
+            block = blocks[index] if index < len(blocks) else None
+            if not isinstance(block, str):
+                continue
+            for tag, url in _RAW_REFERENCE.findall(block):
+                tag = tag.lower()
+                key = "links" if tag == "a" else "images" if tag == "img" else "media"
+                self.collector.add(key, unescape(url))
+
+    @staticmethod
+    def _unescape(value):
+        return value.replace(util.AMP_SUBSTITUTE, "&")
+
+
+class ManifestExtension(Extension):
+    def extendMarkdown(self, md):
+        md.registerExtension(self)
+        self.md = md
+        self.reset()
+        # After normalize_whitespace (30), ahead of fenced_code (25), which
+        # swallows the fences.
+        md.preprocessors.register(FenceLanguagePreprocessor(md), "manifest_code", 28)
+        # After inline processing (20), which creates links and images.
+        md.treeprocessors.register(ManifestTreeprocessor(md), "manifest", 0)
+
+    def reset(self):
+        self.md.manifest_collector = _Collector()
@@ -0,0 +1,23 @@
+# Generated by Django 5.2 on 2026-10-16 23:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0009_stored_rendered_html'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='entry',
+            name='reading_time',
+            field=models.PositiveIntegerField(default=0, editable=False, help_text='Estimated minutes to read the body'),
+        ),
+        migrations.AddField(
+            model_name='entry',
+            name='word_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+    ]
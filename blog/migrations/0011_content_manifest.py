@@ -0,0 +1,23 @@
+# Generated by Django 5.2 on 2026-10-16 23:25
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0010_entry_word_count'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='blogmark',
+            name='content_manifest',
+            field=models.JSONField(blank=True, default=dict, editable=False, help_text='Links, images, media, headings and code languages found when the markdown was last rendered (see blog.manifest)'),
+        ),
+        migrations.AddField(
+            model_name='entry',
+            name='content_manifest',
+            field=models.JSONField(blank=True, default=dict, editable=False, help_text='Links, images, media, headings and code languages found when the markdown was last rendered (see blog.manifest)'),
+        ),
+    ]
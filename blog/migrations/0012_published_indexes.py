@@ -0,0 +1,32 @@
+# Generated by Django 5.2 on 2026-10-16 23:29
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0011_content_manifest'),
+        ('taggit', '0006_rename_taggeditem_content_type_object_id_taggit_tagg_content_8fc721_idx'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='blogmark',
+            index=models.Index(condition=models.Q(('status', 'published')), fields=['-created', 'publish_date'], name='blog_blogmark_published_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='blogmark',
+            index=models.Index(condition=models.Q(models.Q(('status', 'published'), _negated=True), ('publish_date__isnull', False)), fields=['publish_date'], name='blog_blogmark_scheduled_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='entry',
+            index=models.Index(condition=models.Q(('status', 'published')), fields=['-created', 'publish_date'], name='blog_entry_published_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='entry',
+            index=models.Index(condition=models.Q(models.Q(('status', 'published'), _negated=True), ('publish_date__isnull', False)), fields=['publish_date'], name='blog_entry_scheduled_idx'),
+        ),
+    ]
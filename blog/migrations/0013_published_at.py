@@ -0,0 +1,95 @@
+"""Add published_at = COALESCE(publish_date, created) to Entry and Blogmark.
+
+The column is added nullable, filled for existing rows in one UPDATE per
+table, then made NOT NULL; save() keeps it current from then on. The
+published indexes move from (created, publish_date) to published_at.
+"""
+
+from django.db import migrations, models
+from django.db.models.functions import Coalesce
+
+
+def fill_published_at(apps, schema_editor):
+    for name in ("Entry", "Blogmark"):
+        model = apps.get_model("blog", name)
+        model.objects.update(published_at=Coalesce("publish_date", "created"))
+
+
+def published_at_field(null=False):
+    return models.DateTimeField(
+        editable=False,
+        null=null,
+        help_text="When this content goes public: publish_date if set, else "
+        "created. Kept in step by save()",
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("blog", "0012_published_indexes"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="entry",
+            name="published_at",
+            field=published_at_field(null=True),
+        ),
+        migrations.AddField(
+            model_name="blogmark",
+            name="published_at",
+            field=published_at_field(null=True),
+        ),
+        migrations.RunPython(fill_published_at, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name="entry",
+            name="published_at",
+            field=published_at_field(),
+        ),
+        migrations.AlterField(
+            model_name="blogmark",
+            name="published_at",
+            field=published_at_field(),
+        ),
+        migrations.RemoveIndex(
+            model_name="entry",
+            name="blog_entry_published_idx",
+        ),
+        migrations.RemoveIndex(
+            model_name="blogmark",
+            name="blog_blogmark_published_idx",
+        ),
+        migrations.AddIndex(
+            model_name="entry",
+            index=models.Index(
+                condition=models.Q(("status", "published")),
+                fields=["-published_at"],
+                name="blog_entry_published_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="entry",
+            index=models.Index(
+                condition=models.Q(("status", "published")),
+                fields=["-created", "published_at"],
+                name="blog_entry_archive_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="blogmark",
+            index=models.Index(
+                condition=models.Q(("status", "published")),
+                fields=["-published_at"],
+                name="blog_blogmark_published_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="blogmark",
+            index=models.Index(
+                condition=models.Q(("status", "published")),
+                fields=["-created", "published_at"],
+                name="blog_blogmark_archive_idx",
+            ),
+        ),
+    ]
@@ -0,0 +1,58 @@
+# Generated by Django 5.2 on 2026-10-16 23:35
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def count_tags(apps, schema_editor):
+    """Fill TagCount for existing content (TagCount.rebuild, inlined for the
+    historical models)."""
+    ContentType = apps.get_model("contenttypes", "ContentType")
+    TaggedItem = apps.get_model("taggit", "TaggedItem")
+    TagCount = apps.get_model("blog", "TagCount")
+    for name in ("entry", "blogmark"):
+        content_type = ContentType.objects.filter(app_label="blog", model=name).first()
+        if content_type is None:
+            continue  # Fresh database: no content yet.
+        published = apps.get_model("blog", name).objects.filter(
+            status="published", published_at__lte=timezone.now()
+        )
+        counts = (
+            TaggedItem.objects.filter(
+                content_type=content_type, object_id__in=published.values("pk")
+            )
+            .order_by()
+            .values_list("tag_id")
+            .annotate(count=models.Count("id"))
+            .values_list("tag_id", "count")
+        )
+        TagCount.objects.bulk_create(
+            TagCount(tag_id=tag_id, content_type=content_type, count=count)
+            for tag_id, count in counts
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0013_published_at'),
+        ('contenttypes', '0002_remove_content_type_name'),
+        ('taggit', '0006_rename_taggeditem_content_type_object_id_taggit_tagg_content_8fc721_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TagCount',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('count', models.PositiveIntegerField()),
+                ('content_type', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='contenttypes.contenttype')),
+                ('tag', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='counts', to='taggit.tag')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('content_type', 'tag'), name='blog_tagcount_unique')],
+            },
+        ),
+        migrations.RunPython(count_tags, migrations.RunPython.noop),
+    ]
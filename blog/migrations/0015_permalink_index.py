@@ -0,0 +1,24 @@
+# Generated by Django 5.2 on 2026-10-16 23:44
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0014_tag_counts'),
+        ('taggit', '0006_rename_taggeditem_content_type_object_id_taggit_tagg_content_8fc721_idx'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='blogmark',
+            index=models.Index(fields=['slug', 'created'], name='blog_blogmark_permalink_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='entry',
+            index=models.Index(fields=['slug', 'created'], name='blog_entry_permalink_idx'),
+        ),
+    ]
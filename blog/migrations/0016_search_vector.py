@@ -0,0 +1,63 @@
+# Generated by Django 5.2 on 2026-10-16 23:46
+
+import django.contrib.postgres.search
+from django.conf import settings
+from django.contrib.postgres.search import SearchVector
+from django.db import migrations
+
+# Entry/Blogmark.SEARCH_WEIGHTS at the time of this migration.
+WEIGHTS = {
+    "entry": {"title": "A", "summary": "B", "body": "C"},
+    "blogmark": {"title": "A", "commentary": "B"},
+}
+
+
+def index_and_fill(apps, schema_editor):
+    """GIN-index search_vector and fill it (blog.search.rebuild, inlined).
+
+    PostgreSQL only; elsewhere the column stays NULL and search falls back
+    to icontains.
+    """
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    for name, weights in WEIGHTS.items():
+        schema_editor.execute(
+            f"CREATE INDEX blog_{name}_search_idx ON blog_{name} "
+            "USING gin (search_vector)"
+        )
+        vectors = [
+            SearchVector(field, weight=weight, config=settings.SEARCH_CONFIG)
+            for field, weight in weights.items()
+        ]
+        document = vectors[0]
+        for vector in vectors[1:]:
+            document += vector
+        apps.get_model("blog", name).objects.update(search_vector=document)
+
+
+def drop_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    for name in WEIGHTS:
+        schema_editor.execute(f"DROP INDEX IF EXISTS blog_{name}_search_idx")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0015_permalink_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='blogmark',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='entry',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.RunPython(index_and_fill, drop_indexes),
+    ]
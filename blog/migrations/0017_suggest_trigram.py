@@ -0,0 +1,53 @@
+import logging
+
+from django.db import DatabaseError, migrations, transaction
+
+logger = logging.getLogger(__name__)
+
+# Expression GIN indexes for blog.search.suggest: Django compiles
+# title__icontains to UPPER("title"::text) LIKE UPPER('%...%').
+INDEXES = {
+    "blog_entry_title_trgm_idx": ("blog_entry", "title"),
+    "blog_blogmark_title_trgm_idx": ("blog_blogmark", "title"),
+    "blog_tag_name_trgm_idx": ("taggit_tag", "name"),
+}
+
+
+def create_indexes(apps, schema_editor):
+    """pg_trgm indexes, PostgreSQL only.
+
+    Managed databases may not allow pg_trgm; suggestions then still work,
+    by scanning, so a refused CREATE EXTENSION is logged rather than fatal.
+    """
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    try:
+        with transaction.atomic(using=schema_editor.connection.alias):
+            schema_editor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    except DatabaseError as exc:
+        logger.warning("pg_trgm unavailable, suggestions will scan: %s", exc)
+        return
+    for name, (table, column) in INDEXES.items():
+        schema_editor.execute(
+            f"CREATE INDEX IF NOT EXISTS {name} ON {table} "
+            f"USING gin (UPPER({column}::text) gin_trgm_ops)"
+        )
+
+
+def drop_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    for name in INDEXES:
+        schema_editor.execute(f"DROP INDEX IF EXISTS {name}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0016_search_vector'),
+        ('taggit', '0006_rename_taggeditem_content_type_object_id_taggit_tagg_content_8fc721_idx'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_indexes, drop_indexes),
+    ]
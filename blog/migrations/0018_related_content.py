@@ -0,0 +1,35 @@
+# Generated by Django 5.2 on 2026-10-17 00:11
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0017_suggest_trigram'),
+        ('contenttypes', '0002_remove_content_type_name'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RelatedContent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('source_id', models.BigIntegerField()),
+                ('rank', models.PositiveSmallIntegerField()),
+                ('target_id', models.BigIntegerField()),
+                ('score', models.FloatField()),
+                ('title', models.CharField(max_length=200)),
+                ('url', models.CharField(max_length=255)),
+                ('created', models.DateTimeField()),
+                ('source_type', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='contenttypes.contenttype')),
+                ('target_type', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='contenttypes.contenttype')),
+            ],
+            options={
+                'ordering': ['rank'],
+                'indexes': [models.Index(fields=['target_type', 'target_id'], name='blog_relatedcontent_target_idx')],
+                'constraints': [models.UniqueConstraint(fields=('source_type', 'source_id', 'rank'), name='blog_relatedcontent_unique')],
+            },
+        ),
+    ]
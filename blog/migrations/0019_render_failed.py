@@ -0,0 +1,23 @@
+# Generated by Django 5.2 on 2026-10-17 01:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0018_related_content'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='blogmark',
+            name='render_failed',
+            field=models.BooleanField(default=False, editable=False, help_text='The last render went over budget; the stored HTML is its fallback, retried on the next save or render_content run'),
+        ),
+        migrations.AddField(
+            model_name='entry',
+            name='render_failed',
+            field=models.BooleanField(default=False, editable=False, help_text='The last render went over budget; the stored HTML is its fallback, retried on the next save or render_content run'),
+        ),
+    ]
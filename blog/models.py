@@ -1,13 +1,69 @@
-import markdown
+import functools
+import math
+from collections import defaultdict
+
+from django.apps import apps
 from django.conf import settings
 from django.contrib.auth.models import User
-from django.db import models
+from django.contrib.contenttypes.models import ContentType
+from django.contrib.postgres.search import SearchVectorField
+from django.core.cache import cache
+from django.db import models, transaction
+from django.db.models.fields.files import FieldFile
 from django.urls import reverse
 from django.utils import timezone
 from django.utils.html import mark_safe, strip_tags
 from taggit.managers import TaggableManager
+from taggit.models import Tag, TaggedItem
+
+from blog import generations, similarity
+from blog.manifest import merge as merge_manifests
+from blog.rendering import (
+    RenderBudgetExceeded,
+    budget_fallback,
+    content_hash,
+    convert,
+    render_document,
+)
+from blog.utils import count_words, date_kwargs, reading_time
+
+# A derived value may itself be None.
+_NOT_CACHED = object()
+
+
+def derived_from(*sources):
+    """Property memoized per instance until one of its `sources` is reassigned.
+
+    The cached value remembers the exact source objects it was computed from
+    and is reused only while each source attribute is still that same object,
+    so assigning a new summary/body/caption (or refresh_from_db) recomputes on
+    the next read. Templates that read the same property several times render
+    it once. File fields are keyed on their name, since a FieldFile is
+    updated in place (image.name = ..., image.save()).
+    """
+
+    def token(value):
+        return value.name if isinstance(value, FieldFile) else value
+
+    def decorator(func):
+        name = func.__name__
 
-from blog.templatetags.markdown_extras import preprocess_image_shortcodes
+        @functools.wraps(func)
+        def getter(self):
+            current = tuple(token(getattr(self, source)) for source in sources)
+            memo = self.__dict__.setdefault("_derived_cache", {})
+            cached = memo.get(name, _NOT_CACHED)
+            if cached is not _NOT_CACHED and all(
+                old is new for old, new in zip(cached[0], current)
+            ):
+                return cached[1]
+            value = func(self)
+            memo[name] = (current, value)
+            return value
+
+        return property(getter)
+
+    return decorator
 
 
 class SiteSettings(models.Model):
@@ -49,10 +105,41 @@ class SiteSettings(models.Model):
         settings, created = cls.objects.get_or_create(pk=1)
         return settings
 
+    @classmethod
+    def get_cached(cls, generation=None):
+        """get_settings(), from the cache until the next save bumps the "site"
+        generation (pass it in if the caller already has it)."""
+        if generation is None:
+            generation = generations.get("site")
+        key = f"site-settings:{generation}"
+        site_settings = cache.get(key)
+        if site_settings is None:
+            site_settings = cls.get_settings()
+            cache.set(key, site_settings, settings.FRAGMENT_CACHE_TIMEOUT)
+        return site_settings
+
 
 # Tag model moved to core.models.EnhancedTag
 
 
+class PublishedQuerySet(models.QuerySet):
+    def published(self):
+        """Published content, respecting scheduled publish_date.
+
+        Single source of truth for "publicly visible" — used by the views,
+        the Atom feed, the sitemaps and related posts so they cannot drift
+        apart. A draft therefore 404s at its real URL; logged-in authors
+        preview it through the separate @login_required *_preview views.
+
+        Filters on the stored published_at (publish_date, or created when
+        unscheduled) so visibility is one range rather than an IS NULL / <=
+        pair. Ordered by -published_at it is served by the partial
+        "<model>_published_idx" index: a listing walks it backwards from now
+        and stops at the LIMIT instead of sorting every published row.
+        """
+        return self.filter(status="published", published_at__lte=timezone.now())
+
+
 class BaseEntry(models.Model):
     STATUS_CHOICES = (
         ("draft", "Draft"),
@@ -70,6 +157,11 @@ class BaseEntry(models.Model):
         blank=True,
         help_text="Schedule this content to be published at a future date and time",
     )
+    published_at = models.DateTimeField(
+        editable=False,
+        help_text="When this content goes public: publish_date if set, else "
+        "created. Kept in step by save()",
+    )
     slug = models.SlugField(unique_for_date="created")
     tags = TaggableManager(blank=True)
     is_draft = models.BooleanField(
@@ -82,6 +174,31 @@ class BaseEntry(models.Model):
         default="draft",
         help_text="Draft entries are only visible to logged-in users with the preview link",
     )
+    rendered_hash = models.CharField(
+        max_length=64,
+        blank=True,
+        editable=False,
+        help_text="Fingerprint of the markdown sources and config behind the stored HTML",
+    )
+    render_failed = models.BooleanField(
+        default=False,
+        editable=False,
+        help_text="The last render went over budget; the stored HTML is its "
+        "fallback, retried on the next save or render_content run",
+    )
+    content_manifest = models.JSONField(
+        default=dict,
+        blank=True,
+        editable=False,
+        help_text="Links, images, media, headings and code languages found "
+        "when the markdown was last rendered (see blog.manifest)",
+    )
+
+    # Markdown source field -> column holding its pre-rendered HTML. Subclasses
+    # declare their own; refresh_rendered() keeps the columns in step on save.
+    RENDERED_FIELDS = {}
+    # Markdown source field -> column holding the tag-stripped rendering.
+    PLAIN_TEXT_FIELDS = {}
 
     @property
     def is_published(self):
@@ -99,6 +216,151 @@ class BaseEntry(models.Model):
     def __str__(self):
         return self.title
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # The markdown sources as loaded, so _stored_render() can tell an
+        # untouched source from an edited one when others were deferred.
+        instance._loaded_sources = {
+            field: instance.__dict__[field]
+            for field in cls.RENDERED_FIELDS
+            if field in instance.__dict__
+        }
+        return instance
+
+    def save(self, *args, **kwargs):
+        changed = []
+        if self.refresh_published_at():
+            changed.append("published_at")
+        if self.refresh_rendered():
+            changed.extend(self.rendered_columns())
+        update_fields = kwargs.get("update_fields")
+        if changed and update_fields is not None:
+            kwargs["update_fields"] = {*update_fields, *changed}
+        super().save(*args, **kwargs)
+
+    @classmethod
+    def rendered_columns(cls):
+        """Every column refresh_rendered() writes."""
+        return [
+            "rendered_hash",
+            "render_failed",
+            "content_manifest",
+            *cls.RENDERED_FIELDS.values(),
+            *cls.PLAIN_TEXT_FIELDS.values(),
+        ]
+
+    def rendered_sources(self):
+        """Markdown sources to render, in RENDERED_FIELDS order."""
+        return [getattr(self, field) for field in self.RENDERED_FIELDS]
+
+    def compute_rendered_hash(self):
+        return content_hash(self.rendered_sources())
+
+    def refresh_published_at(self):
+        """Recompute published_at; returns True if it changed."""
+        published_at = self.publish_date or self.created
+        if published_at == self.published_at:
+            return False
+        self.published_at = published_at
+        return True
+
+    def refresh_rendered(self, force=False):
+        """Re-render the stored HTML if the sources or markdown config changed.
+
+        A fallback (render_failed) is rendered again whatever its hash.
+        Returns True when the rendered columns were rewritten.
+        """
+        digest = self.compute_rendered_hash()
+        if digest == self.rendered_hash and not self.render_failed and not force:
+            return False
+        rendered = [
+            self.render_source(source, text)
+            for source, text in zip(self.RENDERED_FIELDS, self.rendered_sources())
+        ]
+        self.apply_rendered(rendered, digest)
+        return True
+
+    def render_label(self, source):
+        """Identifies a source field in render-budget warnings."""
+        return f"{self._meta.label} pk={self.pk} {source}"
+
+    def render_source(self, source, text):
+        """(html, manifest) for `text` as `source`; over budget, keep the stored HTML.
+
+        The HTML column still holds the last good render (or nothing, for a new
+        row, in which case the escaped source is used). A fallback has no
+        manifest: it comes back as None, which apply_rendered() records as a
+        failed render.
+        """
+        try:
+            return render_document(text)
+        except RenderBudgetExceeded as exc:
+            return self.budget_fallback(source, text, exc), None
+
+    def budget_fallback(self, source, text, exc):
+        """Log an over-budget render of `source`; the HTML to store instead."""
+        return budget_fallback(
+            text,
+            self.render_label(source),
+            exc,
+            last_good=getattr(self, self.RENDERED_FIELDS[source]),
+        )
+
+    def apply_rendered(self, rendered, digest):
+        """Store (html, manifest) pairs for rendered_sources() rendered elsewhere.
+
+        `rendered` is in RENDERED_FIELDS order; render_content's worker pool
+        renders out of process and hands the results back through here.
+
+        If any source fell back (manifest None), the manifest keeps its old
+        value and render_failed is set: reads serve the stored fallback
+        instead of rendering the markdown again on every view, and the next
+        save or render_content run retries it.
+        """
+        items = zip(self.RENDERED_FIELDS.items(), rendered)
+        for (source, target), (html, _) in items:
+            setattr(self, target, html)
+            plain_field = self.PLAIN_TEXT_FIELDS.get(source)
+            if plain_field:
+                setattr(self, plain_field, strip_tags(html))
+        self.rendered_hash = digest
+        self.render_failed = any(manifest is None for _, manifest in rendered)
+        if not self.render_failed:
+            self.content_manifest = merge_manifests(
+                manifest for _, manifest in rendered
+            )
+
+    def _stored_render(self, source, plain=False):
+        """Stored rendering of `source`, or a live render if it is stale.
+
+        Unsaved edits (and rows not yet backfilled by render_content) fail the
+        hash check and are rendered on the fly, so callers never see HTML that
+        disagrees with the markdown in hand.
+
+        List views defer `body`, which the hash covers. Rather than load it,
+        the stored HTML is trusted while `source` is still the value loaded
+        with the row (render_content refreshes stale rows on deploy).
+        """
+        if set(self.RENDERED_FIELDS) & self.get_deferred_fields():
+            loaded = getattr(self, "_loaded_sources", {})
+            fresh = (
+                bool(self.rendered_hash)
+                and source in loaded
+                and getattr(self, source) is loaded[source]
+            )
+        else:
+            fresh = (
+                bool(self.rendered_hash)
+                and self.rendered_hash == self.compute_rendered_hash()
+            )
+        if fresh:
+            if plain:
+                return getattr(self, self.PLAIN_TEXT_FIELDS[source])
+            return getattr(self, self.RENDERED_FIELDS[source])
+        html, _ = self.render_source(source, getattr(self, source))
+        return strip_tags(html) if plain else html
+
     # Legacy method for backward compatibility
     def check_published(self):
         """Legacy method - use is_published property instead"""
@@ -127,10 +389,57 @@ class Entry(BaseEntry):
         help_text="Markdown-formatted caption for the image (used as caption and stripped for alt text)",
     )
     authors = models.ManyToManyField(User, through="Authorship", blank=True)
+    summary_html = models.TextField(blank=True, editable=False)
+    summary_plain = models.TextField(blank=True, editable=False)
+    body_html = models.TextField(blank=True, editable=False)
+    word_count = models.PositiveIntegerField(default=0, editable=False)
+    reading_time = models.PositiveIntegerField(
+        default=0, editable=False, help_text="Estimated minutes to read the body"
+    )
+    search_vector = SearchVectorField(null=True, editable=False)
+
+    RENDERED_FIELDS = {"summary": "summary_html", "body": "body_html"}
+    PLAIN_TEXT_FIELDS = {"summary": "summary_plain"}
+    # Field -> tsvector weight in search_vector, and the field search results
+    # quote from. See blog.search.
+    SEARCH_WEIGHTS = {"title": "A", "summary": "B", "body": "C"}
+    SEARCH_HEADLINE = "body"
+
+    # Columns list pages never read; defer them with .defer(*LIST_DEFERRED).
+    LIST_DEFERRED = ("body", "body_html", "search_vector")
+
+    objects = PublishedQuerySet.as_manager()
 
     class Meta:
         verbose_name_plural = "entries"
         ordering = ["-created"]
+        indexes = [
+            # PublishedQuerySet.published(): ordered by -published_at for the
+            # latest-first listings, by -created for the date archives.
+            models.Index(
+                fields=["-published_at"],
+                condition=models.Q(status="published"),
+                name="blog_entry_published_idx",
+            ),
+            models.Index(
+                fields=["-created", "published_at"],
+                condition=models.Q(status="published"),
+                name="blog_entry_archive_idx",
+            ),
+            # blog_entry_search_idx, a GIN index on search_vector, is created
+            # by migration 0016 on PostgreSQL only (see blog.search), and
+            # blog_entry_title_trgm_idx, a pg_trgm index for suggestions, by
+            # migration 0017 (see blog.search.suggest).
+            # Permalinks: slug plus the day's [start, end) range on created.
+            models.Index(fields=["slug", "created"], name="blog_entry_permalink_idx"),
+            # publish_scheduled: unpublished rows whose publish_date has passed.
+            models.Index(
+                fields=["publish_date"],
+                condition=~models.Q(status="published")
+                & models.Q(publish_date__isnull=False),
+                name="blog_entry_scheduled_idx",
+            ),
+        ]
 
     def save(self, *args, **kwargs):
         # Ensure consistency between status and is_draft fields
@@ -138,89 +447,67 @@ class Entry(BaseEntry):
             self.is_draft = False
         else:
             self.is_draft = True
+        if self.refresh_word_count():
+            update_fields = kwargs.get("update_fields")
+            if update_fields is not None:
+                kwargs["update_fields"] = {
+                    *update_fields,
+                    "word_count",
+                    "reading_time",
+                }
         super().save(*args, **kwargs)
 
-    @property
+    def refresh_word_count(self):
+        """Recount the body's words; returns True if the stored counts changed."""
+        words = count_words(self.body)
+        minutes = reading_time(words)
+        if (words, minutes) == (self.word_count, self.reading_time):
+            return False
+        self.word_count, self.reading_time = words, minutes
+        return True
+
+    @derived_from("summary")
     def summary_rendered(self):
-        # Use same configuration as body_rendered to ensure consistency
-        # Preprocess custom shortcodes before markdown rendering
-        processed = preprocess_image_shortcodes(self.summary)
-        return mark_safe(
-            markdown.markdown(
-                processed,
-                extensions=settings.MARKDOWN_EXTENSIONS,
-                output_format=settings.MARKDOWN_OUTPUT_FORMAT,
-            )
-        )
+        return mark_safe(self._stored_render("summary"))
 
-    @property
+    @derived_from("summary")
     def summary_text(self):
-        # Preprocess custom shortcodes before markdown rendering
-        processed = preprocess_image_shortcodes(self.summary)
-        return strip_tags(
-            markdown.markdown(
-                processed,
-                extensions=settings.MARKDOWN_EXTENSIONS,
-                output_format=settings.MARKDOWN_OUTPUT_FORMAT,
-            )
-        )
+        return self._stored_render("summary", plain=True)
 
-    @property
+    @derived_from("body")
     def body_rendered(self):
-        # Preprocess custom shortcodes before markdown rendering
-        processed = preprocess_image_shortcodes(self.body)
-        return mark_safe(
-            markdown.markdown(
-                processed,
-                extensions=settings.MARKDOWN_EXTENSIONS,
-                output_format=settings.MARKDOWN_OUTPUT_FORMAT,
-            )
-        )
+        return mark_safe(self._stored_render("body"))
 
     def get_absolute_url(self):
         return reverse(
             "blog:entry",
-            kwargs={
-                "year": self.created.year,
-                "month": self.created.strftime("%b").lower(),
-                "day": self.created.day,
-                "slug": self.slug,
-            },
+            kwargs={**date_kwargs(self.created), "slug": self.slug},
         )
 
     def get_preview_url(self):
         """Get URL for previewing draft entries"""
         return reverse("blog:entry_preview", kwargs={"slug": self.slug})
 
-    @property
+    @derived_from("image", "card_image")
     def get_image_url(self):
         """Get the effective image URL (prioritize uploaded image over card_image URL)"""
         if self.image:
             return self.image.url
         return self.card_image
 
-    @property
+    @derived_from("image_caption")
     def image_caption_html(self):
         """Render image caption markdown as HTML for figcaption"""
         if self.image_caption:
-            return mark_safe(
-                markdown.markdown(
-                    self.image_caption,
-                    extensions=settings.MARKDOWN_EXTENSIONS,
-                    output_format=settings.MARKDOWN_OUTPUT_FORMAT,
-                )
-            )
+            return mark_safe(convert(self.image_caption))
         return None
 
-    @property
+    @derived_from("image_caption", "title")
     def image_alt_text(self):
         """Strip markdown from caption for use as alt text"""
         if self.image_caption:
             # Convert markdown to HTML then strip all HTML tags for plain text
-            html = markdown.markdown(
-                self.image_caption, extensions=settings.MARKDOWN_EXTENSIONS
-            )
-            return strip_tags(html)
+            return strip_tags(convert(self.image_caption))
         return self.title  # Fallback to entry title if no caption
 
 
@@ -261,6 +548,41 @@ class Blogmark(BaseEntry):
         verbose_name="Image Title",
         help_text="Markdown-formatted caption for the image (used as caption and stripped for alt text)",
     )
+    commentary_html = models.TextField(blank=True, editable=False)
+    search_vector = SearchVectorField(null=True, editable=False)
+
+    RENDERED_FIELDS = {"commentary": "commentary_html"}
+    SEARCH_WEIGHTS = {"title": "A", "commentary": "B"}
+    SEARCH_HEADLINE = "commentary"
+
+    objects = PublishedQuerySet.as_manager()
+
+    class Meta:
+        ordering = ["-created"]
+        indexes = [
+            models.Index(
+                fields=["-published_at"],
+                condition=models.Q(status="published"),
+                name="blog_blogmark_published_idx",
+            ),
+            models.Index(
+                fields=["-created", "published_at"],
+                condition=models.Q(status="published"),
+                name="blog_blogmark_archive_idx",
+            ),
+            # blog_blogmark_search_idx and blog_blogmark_title_trgm_idx are
+            # created by migrations 0016 and 0017 on PostgreSQL only.
+            # Permalinks: slug plus the day's [start, end) range on created.
+            models.Index(
+                fields=["slug", "created"], name="blog_blogmark_permalink_idx"
+            ),
+            models.Index(
+                fields=["publish_date"],
+                condition=~models.Q(status="published")
+                & models.Q(publish_date__isnull=False),
+                name="blog_blogmark_scheduled_idx",
+            ),
+        ]
 
     def save(self, *args, **kwargs):
         # Ensure consistency between status and is_draft fields
@@ -270,63 +592,360 @@ class Blogmark(BaseEntry):
             self.is_draft = True
         super().save(*args, **kwargs)
 
-    @property
+    @derived_from("commentary")
     def commentary_rendered(self):
-        # Preprocess custom shortcodes before markdown rendering
-        processed = preprocess_image_shortcodes(self.commentary)
-        return mark_safe(
-            markdown.markdown(
-                processed,
-                extensions=settings.MARKDOWN_EXTENSIONS,
-                output_format=settings.MARKDOWN_OUTPUT_FORMAT,
-            )
-        )
+        return mark_safe(self._stored_render("commentary"))
 
     def get_absolute_url(self):
         return reverse(
             "blog:blogmark",
-            kwargs={
-                "year": self.created.year,
-                "month": self.created.strftime("%b").lower(),
-                "day": self.created.day,
-                "slug": self.slug,
-            },
+            kwargs={**date_kwargs(self.created), "slug": self.slug},
         )
 
     def get_preview_url(self):
         """Get URL for previewing draft blogmarks"""
         return reverse("blog:blogmark_preview", kwargs={"slug": self.slug})
 
-    @property
+    @derived_from("image")
     def get_image_url(self):
         """Get the image URL if available"""
         if self.image:
             return self.image.url
         return None
 
-    @property
+    @derived_from("image_caption")
     def image_caption_html(self):
         """Render image caption markdown as HTML for figcaption"""
         if self.image_caption:
-            return mark_safe(
-                markdown.markdown(
-                    self.image_caption,
-                    extensions=settings.MARKDOWN_EXTENSIONS,
-                    output_format=settings.MARKDOWN_OUTPUT_FORMAT,
-                )
-            )
+            return mark_safe(convert(self.image_caption))
         return None
 
-    @property
+    @derived_from("image_caption", "title")
     def image_alt_text(self):
         """Strip markdown from caption for use as alt text"""
         if self.image_caption:
             # Convert markdown to HTML then strip all HTML tags for plain text
-            html = markdown.markdown(
-                self.image_caption, extensions=settings.MARKDOWN_EXTENSIONS
-            )
-            return strip_tags(html)
+            return strip_tags(convert(self.image_caption))
         return self.title  # Fallback to blogmark title if no caption
 
 
+class TagCount(models.Model):
+    """How many published objects of one content type carry a tag.
+
+    Materialized so /posts/ can read its tag cloud in one query instead of
+    loading every published object with its tags. blog.signals refreshes
+    the rows for the affected tags whenever tags are added or removed, or
+    a tagged object is saved or deleted; refresh() recounts those tags
+    from TaggedItem, so the rows cannot drift through missed increments.
+    Content published purely by the clock passing its publish_date is
+    picked up by publish_scheduled, which rebuilds every row, as does
+    `python manage.py rebuild_tag_counts`.
+    """
+
+    tag = models.ForeignKey(Tag, on_delete=models.CASCADE, related_name="counts")
+    content_type = models.ForeignKey(ContentType, on_delete=models.CASCADE)
+    count = models.PositiveIntegerField()
+
+    # Models whose published objects are counted.
+    TRACKED = (Entry, Blogmark)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["content_type", "tag"], name="blog_tagcount_unique"
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.tag} ({self.content_type.model}): {self.count}"
+
+    @classmethod
+    def refresh(cls, model, tag_ids=None):
+        """Recount `tag_ids` (every tag when None) for `model`'s published
+        objects; returns the number of rows written."""
+        content_type = ContentType.objects.get_for_model(model)
+        items = TaggedItem.objects.filter(
+            content_type=content_type,
+            object_id__in=model.objects.published().values("pk"),
+        )
+        rows = cls.objects.filter(content_type=content_type)
+        if tag_ids is not None:
+            items = items.filter(tag_id__in=tag_ids)
+            rows = rows.filter(tag_id__in=tag_ids)
+        counts = dict(
+            items.order_by()
+            .values_list("tag_id")
+            .annotate(count=models.Count("id"))
+            .values_list("tag_id", "count")
+        )
+        with transaction.atomic():
+            rows.exclude(tag_id__in=counts).delete()
+            cls.objects.bulk_create(
+                [
+                    cls(tag_id=tag_id, content_type=content_type, count=count)
+                    for tag_id, count in counts.items()
+                ],
+                update_conflicts=True,
+                unique_fields=["content_type", "tag"],
+                update_fields=["count"],
+            )
+        return len(counts)
+
+    @classmethod
+    def rebuild(cls):
+        """Recount every tag for every tracked model."""
+        return sum(cls.refresh(model) for model in cls.TRACKED)
+
+    @classmethod
+    def cloud(cls):
+        """Tags on published entries and blogmarks, most used first, each
+        annotated with `.count` across both."""
+        content_types = ContentType.objects.get_for_models(*cls.TRACKED).values()
+        return (
+            Tag.objects.filter(counts__content_type__in=content_types)
+            .annotate(count=models.Sum("counts__count"))
+            .order_by("-count", "name")
+        )
+
+
+class RelatedContent(models.Model):
+    """One of the most related items for an entry, blogmark or project.
+
+    Materialized so a page reads its related items in one query on the
+    unique (source, rank) index instead of joining and counting tags per
+    request. Any published entry, blogmark or project can be a target.
+    It scores by the tags it shares with the source, each weighted
+    1 / log2(1 + n) for the n published items carrying it, so a shared rare
+    tag counts for more than a shared "python". Ties go to the newest. The
+    target's title, URL and date are copied in, so listing needs no other
+    query. An item sharing tags with fewer than LIMIT others is topped up
+    with its nearest neighbours by text from blog.similarity's index, when
+    one is built.
+
+    blog.signals recomputes, on every save, tag change or delete, the rows
+    of the changed item, of the items listing it and, when it is published
+    or was until the change, of the items sharing a tag it has or just lost:
+    the only rows it can affect.
+    Content published purely by the clock passing its publish_date is
+    picked up by publish_scheduled, which rebuilds every row, as does
+    `python manage.py rebuild_related_content`.
+    """
+
+    source_type = models.ForeignKey(
+        ContentType, on_delete=models.CASCADE, related_name="+"
+    )
+    source_id = models.BigIntegerField()
+    rank = models.PositiveSmallIntegerField()
+    target_type = models.ForeignKey(
+        ContentType, on_delete=models.CASCADE, related_name="+"
+    )
+    target_id = models.BigIntegerField()
+    score = models.FloatField()
+    title = models.CharField(max_length=200)
+    url = models.CharField(max_length=255)
+    created = models.DateTimeField()
+
+    # Rows kept per source; pages show a prefix.
+    LIMIT = 6
+    # Models related to each other ("app_label.Model"; projects depends on blog).
+    MODELS = ("blog.Entry", "blog.Blogmark", "projects.Project")
+
+    class Meta:
+        ordering = ["rank"]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["source_type", "source_id", "rank"],
+                name="blog_relatedcontent_unique",
+            ),
+        ]
+        indexes = [
+            # Which sources list a changed item.
+            models.Index(
+                fields=["target_type", "target_id"],
+                name="blog_relatedcontent_target_idx",
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.source_type.model} {self.source_id} #{self.rank}: {self.title}"
+
+    def get_absolute_url(self):
+        return self.url
+
+    @classmethod
+    def tracked(cls):
+        return tuple(apps.get_model(label) for label in cls.MODELS)
+
+    @classmethod
+    def for_object(cls, obj):
+        """The rows for `obj`, best first."""
+        return cls.objects.filter(
+            source_type=ContentType.objects.get_for_model(obj), source_id=obj.pk
+        )
+
+    @classmethod
+    def affected_by(cls, obj, tag_ids=()):
+        """(content_type_id, object_id) of every item whose rows may change
+        when `obj` does: itself, the items listing it, and the items tagged
+        with any of `tag_ids` (pass its tags if it is published)."""
+        content_type = ContentType.objects.get_for_model(obj)
+        keys = {(content_type.pk, obj.pk)}
+        keys.update(
+            cls.objects.filter(target_type=content_type, target_id=obj.pk).values_list(
+                "source_type_id", "source_id"
+            )
+        )
+        if tag_ids:
+            keys.update(
+                TaggedItem.objects.filter(
+                    tag_id__in=tag_ids,
+                    content_type__in=ContentType.objects.get_for_models(
+                        *cls.tracked()
+                    ).values(),
+                ).values_list("content_type_id", "object_id")
+            )
+        return keys
+
+    @classmethod
+    def _tags(cls, content_type, object_ids=None, tag_ids=None, published=False):
+        """{(content_type_id, object_id): {tag_id}} for one model."""
+        items = TaggedItem.objects.filter(content_type=content_type)
+        if object_ids is not None:
+            items = items.filter(object_id__in=object_ids)
+        if tag_ids is not None:
+            items = items.filter(tag_id__in=tag_ids)
+        if published:
+            model = content_type.model_class()
+            items = items.filter(object_id__in=model.objects.published().values("pk"))
+        tags = defaultdict(set)
+        for object_id, tag_id in items.values_list("object_id", "tag_id"):
+            tags[content_type.pk, object_id].add(tag_id)
+        return tags
+
+    @classmethod
+    def refresh(cls, keys=None):
+        """Recompute the rows of `keys`, (content_type_id, object_id) pairs
+        (every item when None); returns the number of rows written."""
+        content_types = ContentType.objects.get_for_models(*cls.tracked())
+        by_type = defaultdict(set)
+        for content_type_id, object_id in keys or ():
+            by_type[content_type_id].add(object_id)
+        if keys is not None and not by_type:
+            return 0
+
+        sources = {}
+        for content_type in content_types.values():
+            if keys is None:
+                sources.update(cls._tags(content_type))
+            elif content_type.pk in by_type:
+                sources.update(cls._tags(content_type, by_type[content_type.pk]))
+        # Every published item carrying any of the sources' tags.
+        tag_ids = set().union(*sources.values())
+        carrying = defaultdict(list)
+        for content_type in content_types.values():
+            targets = cls._tags(content_type, tag_ids=tag_ids, published=True)
+            for target, tags in targets.items():
+                for tag_id in tags:
+                    carrying[tag_id].append(target)
+        weights = {
+            tag: 1 / math.log2(1 + len(items)) for tag, items in carrying.items()
+        }
+
+        # Scores to 9 places, so equal tag sets tie exactly.
+        ranked = {}
+        for source, tags in sources.items():
+            scores = defaultdict(float)
+            for tag_id in tags:
+                for target in carrying[tag_id]:
+                    if target != source:
+                        scores[target] += weights[tag_id]
+            best = sorted((round(v, 9), k) for k, v in scores.items())[::-1]
+            if len(best) > cls.LIMIT:
+                # Keep everything tied with the last place for the date tiebreak.
+                best = [item for item in best if item[0] >= best[cls.LIMIT - 1][0]]
+            ranked[source] = best
+
+        # Sources sharing tags with too few items are topped up with the
+        # items nearest them by text (blog.similarity), ranked after those.
+        by_text = {}
+        models_by_type = {ct.pk: model for model, ct in content_types.items()}
+        for source_type_id, source_id in cls._text_sources(keys, content_types):
+            listed = {key for _, key in ranked.get((source_type_id, source_id), ())}
+            if len(listed) >= cls.LIMIT:
+                continue
+            nearest = similarity.neighbours(
+                models_by_type[source_type_id], source_id, cls.LIMIT + len(listed)
+            )
+            by_text[source_type_id, source_id] = [
+                (round(score, 9), key)
+                for model, pk, score in nearest
+                if (key := (content_types[model].pk, pk)) not in listed
+            ]
+
+        wanted = defaultdict(set)
+        for best in (*ranked.values(), *by_text.values()):
+            for _, (content_type_id, object_id) in best:
+                wanted[content_type_id].add(object_id)
+        targets = {}
+        for model, content_type in content_types.items():
+            if content_type.pk in wanted:
+                found = model.objects.published().filter(pk__in=wanted[content_type.pk])
+                for obj in found:
+                    targets[content_type.pk, obj.pk] = obj
+
+        rows = []
+        for source in ranked.keys() | by_text.keys():
+            source_type_id, source_id = source
+            best = [
+                (s, targets[key]) for s, key in ranked.get(source, ()) if key in targets
+            ]
+            best.sort(key=lambda item: (-item[0], -item[1].created.timestamp()))
+            best += [
+                (s, targets[key])
+                for s, key in by_text.get(source, ())
+                if key in targets
+            ]
+            for rank, (score, obj) in enumerate(best[: cls.LIMIT]):
+                rows.append(
+                    cls(
+                        source_type_id=source_type_id,
+                        source_id=source_id,
+                        rank=rank,
+                        target_type=content_types[type(obj)],
+                        target_id=obj.pk,
+                        score=score,
+                        title=obj.title,
+                        url=obj.get_absolute_url(),
+                        created=obj.created,
+                    )
+                )
+        stale = models.Q() if keys is None else models.Q(pk__in=[])
+        for content_type_id, object_ids in by_type.items():
+            stale |= models.Q(source_type_id=content_type_id, source_id__in=object_ids)
+        with transaction.atomic():
+            cls.objects.filter(stale).delete()
+            cls.objects.bulk_create(rows, batch_size=1000)
+        return len(rows)
+
+    @classmethod
+    def _text_sources(cls, keys, content_types):
+        """The sources among `keys` (all when None) blog.similarity indexes."""
+        index = similarity.get_index()
+        if index is None:
+            return []
+        if keys is not None:
+            return keys
+        prefixes = {
+            similarity.KINDS[model._meta.model_name]: content_type.pk
+            for model, content_type in content_types.items()
+            if model._meta.model_name in similarity.KINDS
+        }
+        return [(prefixes[key[0]], int(key[1:])) for key in index.keys]
+
+    @classmethod
+    def rebuild(cls):
+        """Recompute every row."""
+        return cls.refresh()
+
+
 # LinkedIn models moved to linkedin app
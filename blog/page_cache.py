@@ -0,0 +1,305 @@
+"""
+Targeted purging of the full-page cache.
+
+Production caches whole responses with Django's cache middleware. The
+subclasses here build its key prefix from two generation counters
+(blog.generations): "pages", for every page, and one per URL path.
+purge(*paths) bumps the counters of the given paths. This retires every
+cached variant of those pages in O(1) per path, whatever their query
+string or Vary header values (with Vary: User-Agent the variants cannot be
+listed, let alone deleted). purge_all() bumps "pages".
+
+The paths a change shows up on come from a registry: @depends(Model)
+registers a function returning the paths an instance of Model is listed
+on, and paths_for(obj) collects them. The signals purge paths_for() of the
+object before and after each save, so a moved or retitled post clears
+both its old and its new pages.
+
+Because only changed pages are purged, entries can outlive the max-age
+browsers are sent: they are fresh for CACHE_MIDDLEWARE_SECONDS. The
+prefix is read once per request and reused to store the response, so a
+purge landing mid-render cannot file the old page under the new
+generation.
+
+Expiry is soft: for PAGE_CACHE_STALE_SECONDS more, a page is still served
+from the cache while a background thread renders its replacement through
+the same middleware (revalidate(); a small pool per process, one refresh
+per page at a time). Only a purge or a page left unrequested that long
+makes a visitor wait for a render.
+
+Never cached whole: search results and suggestions (UNCACHED). Every
+query string would be a page of its own, and the suggestions keep their
+short max-age and their own cache (blog.search.suggest).
+
+Deliberately not purged: other posts whose related list gains the changed
+post (they list it once their entry expires); a tag rename, or anything
+else without a registered function, purges everything.
+"""
+
+import copy
+import functools
+import hashlib
+import io
+import logging
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.contrib.contenttypes.models import ContentType
+from django.core.cache import cache
+from django.core.handlers.base import BaseHandler
+from django.core.handlers.wsgi import WSGIRequest
+from django.db import connections
+from django.middleware import cache as cache_middleware
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.cache import cc_delim_re, get_max_age, patch_response_headers
+from taggit.models import Tag
+
+from projects.models import Project
+
+from . import generations
+from .models import Blogmark, Entry, RelatedContent
+
+logger = logging.getLogger(__name__)
+
+# Marks the requests revalidate() makes: never answered from the cache. Not
+# an HTTP_ key, so no client can set it.
+REFRESH = "blog.page_cache.refresh"
+# Background renders at once, per process.
+REFRESH_WORKERS = 2
+# Seconds other requests leave a page's refresh to the one that started it.
+REFRESH_LOCK_SECONDS = 60
+
+# URL names of the pages never cached (see the module docstring).
+UNCACHED = ("blog:search", "blog:search_suggest")
+
+_dependencies = defaultdict(list)
+
+
+def depends(*models):
+    """Register a function(obj) returning the paths `obj` shows up on."""
+
+    def register(function):
+        for model in models:
+            _dependencies[model].append(function)
+        return function
+
+    return register
+
+
+def paths_for(obj):
+    """Every path whose cached page may show `obj`."""
+    paths = set()
+    for function in _dependencies[type(obj)]:
+        paths.update(function(obj))
+    return paths
+
+
+def _scope(path):
+    # Paths can be long or carry characters memcached keys cannot.
+    return f"page:{hashlib.md5(path.encode()).hexdigest()}"
+
+
+def _timeout():
+    # A lost per-path counter only costs a re-render, so they expire with
+    # the pages filed under them instead of piling up for every path ever
+    # requested.
+    return settings.CACHE_MIDDLEWARE_SECONDS + settings.PAGE_CACHE_STALE_SECONDS
+
+
+def purge(*paths):
+    """Retire the cached pages of `paths`, now and once the transaction
+    commits."""
+    generations.bump_on_commit(*map(_scope, set(paths)), timeout=_timeout())
+
+
+def purge_all():
+    generations.bump_on_commit("pages")
+
+
+def key_prefix(path, base=""):
+    scopes = ["pages", _scope(path)]
+    found = generations.get_many(scopes, timeout=_timeout())
+    return ".".join([base, *(str(found[scope]) for scope in scopes)])
+
+
+def _with_prefix(middleware, prefix):
+    bound = copy.copy(middleware)
+    bound.key_prefix = prefix
+    return bound
+
+
+@functools.cache
+def _uncached_paths():
+    return frozenset(reverse(name) for name in UNCACHED)
+
+
+@functools.cache
+def _handler():
+    handler = BaseHandler()
+    handler.load_middleware()
+    return handler
+
+
+@functools.cache
+def _executor():
+    return ThreadPoolExecutor(REFRESH_WORKERS, thread_name_prefix="page-refresh")
+
+
+def _in_background(function, *args):
+    def run():
+        try:
+            function(*args)
+        finally:
+            connections.close_all()  # this thread's
+
+    _executor().submit(run)
+
+
+def _refresh(environ, lock):
+    try:
+        _handler().get_response(WSGIRequest(environ))
+    except Exception:
+        logger.exception("Could not refresh the cached %s", environ.get("PATH_INFO"))
+    finally:
+        cache.delete(lock)
+
+
+def _refresh_environ(request, response):
+    """A WSGI environ for rendering `request` afresh as an anonymous visitor.
+
+    Only the URL and the headers `response` varies on are carried over: the
+    result is the shared public page, so it must not render with the
+    visitor's cookies or credentials, and the refresh thread must not touch
+    their connection's server objects.
+    """
+    meta = request.META
+    environ = {
+        "REQUEST_METHOD": "GET",
+        "SCRIPT_NAME": meta.get("SCRIPT_NAME", ""),
+        "PATH_INFO": meta.get("PATH_INFO", request.path_info),
+        "QUERY_STRING": meta.get("QUERY_STRING", ""),
+        "SERVER_NAME": meta.get("SERVER_NAME", "localhost"),
+        "SERVER_PORT": meta.get("SERVER_PORT", "80"),
+        "CONTENT_LENGTH": "0",
+        "wsgi.input": io.BytesIO(),
+        "wsgi.url_scheme": request.scheme,
+        REFRESH: True,
+    }
+    headers = ["Host"]
+    if response.has_header("Vary"):
+        headers += cc_delim_re.split(response["Vary"])
+    for header in headers:
+        key = "HTTP_" + header.upper().replace("-", "_")
+        if key in meta and key not in ("HTTP_COOKIE", "HTTP_AUTHORIZATION"):
+            environ[key] = meta[key]
+    return environ
+
+
+def revalidate(request, response):
+    """Render `request` again in the background, storing the result, unless
+    a refresh of the page is already running. `response` is the cached copy
+    being served."""
+    key = hashlib.md5(
+        (request._page_cache_prefix + request.build_absolute_uri()).encode()
+    ).hexdigest()
+    lock = f"page-refresh:{key}"
+    if not cache.add(lock, True, REFRESH_LOCK_SECONDS):
+        return
+    _in_background(_refresh, _refresh_environ(request, response), lock)
+
+
+class UpdateCacheMiddleware(cache_middleware.UpdateCacheMiddleware):
+    """UpdateCacheMiddleware filing pages under their generations."""
+
+    def process_response(self, request, response):
+        prefix = getattr(request, "_page_cache_prefix", None)
+        if prefix is None:  # not fetched, so not to be stored either
+            return super().process_response(request, response)
+        bound = _with_prefix(self, prefix)
+        if get_max_age(response) != 0:
+            # Purged when it changes: keep it past what browsers are told,
+            # and past its soft expiry for revalidate().
+            bound.page_timeout = self.cache_timeout + settings.PAGE_CACHE_STALE_SECONDS
+            response._page_cache_fresh_until = time.time() + self.cache_timeout
+        return super(UpdateCacheMiddleware, bound).process_response(request, response)
+
+
+class FetchFromCacheMiddleware(cache_middleware.FetchFromCacheMiddleware):
+    """FetchFromCacheMiddleware reading pages under their generations, and
+    serving them past their soft expiry while revalidate() runs."""
+
+    def process_request(self, request):
+        if request.method not in ("GET", "HEAD"):
+            return super().process_request(request)
+        if request.path in _uncached_paths():
+            request._cache_update_cache = False
+            return None
+        request._page_cache_prefix = key_prefix(request.path, self.key_prefix)
+        if request.META.get(REFRESH):
+            request._cache_update_cache = True
+            return None
+        bound = _with_prefix(self, request._page_cache_prefix)
+        response = super(FetchFromCacheMiddleware, bound).process_request(request)
+        if response is not None:
+            fresh_until = getattr(response, "_page_cache_fresh_until", None)
+            if fresh_until is not None and fresh_until < time.time():
+                revalidate(request, response)
+            # A copy older than its max-age is still current until purged:
+            # send it as fresh as a new render would be.
+            del response["Age"]
+            del response["Expires"]
+            if max_age := get_max_age(response):
+                patch_response_headers(response, max_age)
+        return response
+
+
+# What shows up where.
+
+SITEMAP = "django.contrib.sitemaps.views.sitemap"
+
+
+@depends(Entry, Blogmark)
+def _content_paths(obj):
+    created = timezone.localtime(obj.created)  # as the year pages bucket it
+    yield obj.get_absolute_url()
+    for name in ("index", "posts", "archive", "feed"):
+        yield reverse(f"blog:{name}")
+    yield reverse("blog:year", args=[created.year])
+    yield reverse("blog:month", args=[created.year, created.month])
+    yield reverse(SITEMAP)
+    for slug in obj.tags.values_list("slug", flat=True):
+        yield reverse("blog:tag", args=[slug])
+
+
+@depends(Project)
+def _project_paths(obj):
+    yield obj.get_absolute_url()
+    for name in ("index", "feed"):
+        yield reverse(f"projects:{name}")
+    yield reverse(SITEMAP)
+    for slug in obj.tags.values_list("slug", flat=True):
+        yield reverse("projects:tag", args=[slug])
+
+
+@depends(Entry, Blogmark, Project)
+def _listing_paths(obj):
+    """The permalinks of the items listing `obj` as related (RelatedContent)."""
+    sources = defaultdict(list)
+    for source_type_id, source_id in RelatedContent.objects.filter(
+        target_type=ContentType.objects.get_for_model(obj), target_id=obj.pk
+    ).values_list("source_type_id", "source_id"):
+        sources[source_type_id].append(source_id)
+    for source_type_id, ids in sources.items():
+        model = ContentType.objects.get_for_id(source_type_id).model_class()
+        for source in model.objects.filter(pk__in=ids):
+            yield source.get_absolute_url()
+
+
+def tag_paths(model, tag_ids):
+    """The tag pages of `tag_ids` that list `model` objects."""
+    name = "projects:tag" if model is Project else "blog:tag"
+    slugs = Tag.objects.filter(pk__in=tag_ids).values_list("slug", flat=True)
+    return [reverse(name, args=[slug]) for slug in slugs]
@@ -1,47 +1,29 @@
-from django.db.models import Count
+from django.contrib.contenttypes.models import ContentType
+
+from blog.models import Entry, RelatedContent
 
 
 def get_related_entries(entry, limit=3):
     """
-    Get related blog entries based on shared tags
+    Related items for an entry page: the entry's precomputed RelatedContent
+    rows (entries, blogmarks and projects sharing its tags; one indexed
+    query), topped up with recent entries when it shares tags with too few.
     """
-    # Get the tags for this entry
-    entry_tags = entry.tags.all()
-
-    if not entry_tags:
-        # If no tags, return recent entries
-        return get_recent_entries(exclude_id=entry.id, limit=limit)
-
-    # Find entries that share tags with this entry
-    related_entries = (
-        type(entry)
-        .objects.filter(tags__in=entry_tags)
-        .exclude(id=entry.id)
-        .filter(is_draft=False)
-        .annotate(same_tags=Count("id"))
-        .order_by("-same_tags", "-created")
-        .distinct()[:limit]
-    )
-
-    # If we don't have enough related entries, supplement with recent entries
-    if related_entries.count() < limit:
-        recent_entries = get_recent_entries(
-            exclude_id=entry.id,
-            exclude_ids=[e.id for e in related_entries],
-            limit=limit - related_entries.count(),
+    related = list(RelatedContent.for_object(entry)[:limit])
+    if len(related) < limit:
+        entry_type = ContentType.objects.get_for_model(Entry).pk
+        listed = [r.target_id for r in related if r.target_type_id == entry_type]
+        related += get_recent_entries(
+            exclude_id=entry.id, exclude_ids=listed, limit=limit - len(related)
         )
-        return list(related_entries) + list(recent_entries)
-
-    return related_entries
+    return related
 
 
 def get_recent_entries(exclude_id=None, exclude_ids=None, limit=3):
     """
     Get recent blog entries, excluding specified IDs
     """
-    from blog.models import Entry
-
-    queryset = Entry.objects.filter(is_draft=False).order_by("-created")
+    queryset = Entry.objects.published().order_by("-created")
 
     if exclude_id:
         queryset = queryset.exclude(id=exclude_id)
@@ -49,4 +31,4 @@ def get_recent_entries(exclude_id=None, exclude_ids=None, limit=3):
     if exclude_ids:
         queryset = queryset.exclude(id__in=exclude_ids)
 
-    return queryset[:limit]
+    return list(queryset[:limit])
@@ -0,0 +1,250 @@
+"""
+Markdown rendering shared by every content model.
+
+All markdown -> HTML conversion for Entry, Blogmark and Project goes through
+convert() / render_markdown(), so the shortcode preprocessing and the
+extension config cannot drift between models. content_hash() fingerprints a
+set of source fields together with that config; BaseEntry stores the
+fingerprint next to the pre-rendered HTML and only re-renders when it changes.
+
+markdown.markdown() builds a fresh Markdown instance per call, re-importing and
+re-registering every extension. Instead each thread keeps one pre-built
+converter per (extensions, output_format) and resets it between documents;
+gunicorn gthread workers therefore never share an instance mid-convert.
+See scripts/bench_markdown.py for the per-call overhead this saves.
+
+Code blocks are highlighted through blog.highlight's content-addressed cache,
+installed when this module is imported. Long documents are rendered per
+top-level block with a block cache (blog.incremental). render_document()
+also returns the content manifest (links, images, headings, code languages;
+see blog.manifest) collected during the same parse.
+
+Budget: some inputs (thousands of nested brackets or backticks, megabyte code
+fences) keep Python-Markdown busy for seconds to minutes, which would pin a
+gunicorn worker. render_document() refuses sources over MARKDOWN_MAX_CHARS
+and aborts renders running past MARKDOWN_RENDER_TIMEOUT with
+RenderBudgetExceeded; render_or_fallback() turns that into the last good
+render, or the escaped source in a <pre>, and logs the offending object.
+scripts/bench_render_budget.py holds a corpus of such inputs with timings.
+"""
+
+import contextlib
+import hashlib
+import json
+import logging
+import signal
+import threading
+from html import escape
+
+import markdown
+import pygments
+from django.conf import settings
+
+from blog import highlight, incremental
+from blog.manifest import ManifestExtension
+from blog.shortcodes import ShortcodeExtension
+
+highlight.install()
+
+logger = logging.getLogger(__name__)
+
+# Bump when the rendering code itself changes output (e.g. the shortcode
+# HTML, or what goes into the content manifest), so stored renders are
+# treated as stale even though the markdown source and settings are untouched.
+RENDERER_VERSION = 2
+
+
+_local = threading.local()
+
+
+class RenderBudgetExceeded(BaseException):
+    """A document exceeded MARKDOWN_MAX_CHARS or MARKDOWN_RENDER_TIMEOUT.
+
+    A BaseException, like KeyboardInterrupt: the timer can fire inside code
+    that survives its own failures with `except Exception` (a cache call in
+    blog.layered_cache, an extension), which must not swallow it.
+    """
+
+
+@contextlib.contextmanager
+def time_budget(seconds):
+    """Raise RenderBudgetExceeded inside the block once `seconds` have passed.
+
+    Uses a SIGALRM interval timer, which only the main thread can receive;
+    that is where gunicorn sync workers and render_content's pool workers
+    render. In other threads, or when a timer is already running, the block
+    runs unbounded and only the size budget applies.
+    """
+    if (
+        not seconds
+        or not hasattr(signal, "setitimer")
+        or threading.current_thread() is not threading.main_thread()
+        or signal.getitimer(signal.ITIMER_REAL)[0]
+    ):
+        yield
+        return
+
+    def expired(signum, frame):
+        raise RenderBudgetExceeded(f"render took longer than {seconds}s")
+
+    previous = signal.signal(signal.SIGALRM, expired)
+    signal.setitimer(signal.ITIMER_REAL, seconds)
+    try:
+        yield
+    finally:
+        signal.setitimer(signal.ITIMER_REAL, 0)
+        signal.signal(signal.SIGALRM, previous)
+
+
+def get_converter(extensions=None, output_format=None, shortcodes=False):
+    """This thread's Markdown instance for the given (or configured) settings."""
+    if extensions is None:
+        extensions = settings.MARKDOWN_EXTENSIONS
+    if output_format is None:
+        output_format = settings.MARKDOWN_OUTPUT_FORMAT
+    key = (tuple(extensions), output_format, shortcodes)
+    converters = getattr(_local, "converters", None)
+    if converters is None:
+        converters = _local.converters = {}
+    converter = converters.get(key)
+    if converter is None:
+        loaded = list(extensions)
+        if shortcodes:
+            loaded.extend(
+                [
+                    ShortcodeExtension(),
+                    ManifestExtension(),
+                    incremental.RawOutputExtension(),
+                ]
+            )
+        converter = converters[key] = markdown.Markdown(
+            extensions=loaded, output_format=output_format
+        )
+    return converter
+
+
+def convert(text, extensions=None, output_format=None, shortcodes=False):
+    """Markdown -> HTML through the pooled converter.
+
+    Shortcodes ({{img:...}}) are only expanded when `shortcodes` is set; image
+    captions and other short fields are plain markdown.
+    """
+    converter = get_converter(extensions, output_format, shortcodes)
+    try:
+        return converter.convert(text or "")
+    finally:
+        # Footnotes, abbreviations and reference links accumulate per
+        # document; clear them even if convert() raised halfway through.
+        converter.reset()
+
+
+def _convert_document(text, raw=False):
+    """(html, manifest) from the shortcode converter; `raw` skips the final
+    strip (see blog.incremental)."""
+    converter = get_converter(shortcodes=True)
+    try:
+        html = converter.convert(text or "")
+        if raw:
+            html = converter.raw_output
+        return html, converter.manifest_collector.manifest
+    finally:
+        converter.reset()
+
+
+def render_block(text):
+    """One block of a document, unstripped, and its manifest."""
+    return _convert_document(text, raw=True)
+
+
+def render_document(text, blocks=True):
+    """Render markdown (with {{img:...}} shortcodes): (html, content manifest).
+
+    The manifest (see blog.manifest) is collected during the same parse.
+    Long documents are rendered block by block through blog.incremental,
+    reusing cached blocks that have not changed; the output is identical to a
+    whole-document render. Pass blocks=False for bulk re-renders, where nearly
+    every block misses anyway.
+
+    Raises RenderBudgetExceeded if `text` is over MARKDOWN_MAX_CHARS or the
+    render runs past MARKDOWN_RENDER_TIMEOUT seconds.
+    """
+    if text and len(text) > settings.MARKDOWN_MAX_CHARS:
+        raise RenderBudgetExceeded(
+            f"{len(text)} characters is over MARKDOWN_MAX_CHARS "
+            f"({settings.MARKDOWN_MAX_CHARS})"
+        )
+    try:
+        with time_budget(settings.MARKDOWN_RENDER_TIMEOUT):
+            result = None
+            if blocks:
+                result = incremental.render(text, render_block, config_fingerprint())
+            if result is None:
+                result = _convert_document(text)
+    except RenderBudgetExceeded:
+        # The timer can fire anywhere inside an extension; don't reuse this
+        # thread's converters after that.
+        _local.converters = {}
+        raise
+    return result
+
+
+def render_markdown(text, blocks=True):
+    """render_document() without the manifest: just the HTML string."""
+    return render_document(text, blocks=blocks)[0]
+
+
+def fallback_html(text):
+    """Stand-in for a render that blew its budget: the source, escaped."""
+    return f'<pre class="markdown-fallback">{escape(text or "")}</pre>'
+
+
+def render_or_fallback(text, label, last_good=None, blocks=True):
+    """render_markdown(), degrading to `last_good` (or the escaped source).
+
+    `label` names the object and field in the warning that is logged, so the
+    offending content can be found and fixed.
+    """
+    try:
+        return render_markdown(text, blocks=blocks)
+    except RenderBudgetExceeded as exc:
+        return budget_fallback(text, label, exc, last_good)
+
+
+def budget_fallback(text, label, exc, last_good=None):
+    """Log an over-budget render and return what to serve instead."""
+    logger.warning(
+        "Markdown render budget exceeded for %s: %s; serving %s",
+        label,
+        exc,
+        "the last good render" if last_good else "escaped source",
+    )
+    return last_good or fallback_html(text)
+
+
+def config_fingerprint():
+    """Serialized rendering config; any change invalidates every stored render.
+
+    Includes the markdown and Pygments versions: an upgrade of either can
+    change the HTML (or the highlighting) for unchanged source.
+    """
+    return json.dumps(
+        {
+            "version": RENDERER_VERSION,
+            "markdown": markdown.__version__,
+            "pygments": pygments.__version__,
+            "extensions": list(settings.MARKDOWN_EXTENSIONS),
+            "output_format": settings.MARKDOWN_OUTPUT_FORMAT,
+        },
+        sort_keys=True,
+    )
+
+
+def content_hash(sources):
+    """sha256 over the rendering config and each source text, in order."""
+    digest = hashlib.sha256(config_fingerprint().encode())
+    for text in sources:
+        encoded = (text or "").encode()
+        # Length-prefix each source so ("ab", "c") and ("a", "bc") differ.
+        digest.update(len(encoded).to_bytes(8, "big"))
+        digest.update(encoded)
+    return digest.hexdigest()
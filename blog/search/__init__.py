@@ -0,0 +1,67 @@
+"""
+Full-text search for /search/.
+
+The work is done by a backend, chosen by the SEARCH_BACKEND setting (a
+dotted path; see blog.search.backends):
+
+- PostgresBackend: each searchable model keeps a weighted tsvector in its
+  `search_vector` column (SEARCH_WEIGHTS: title A, summary B, body C for
+  entries) with a GIN index; queries use websearch_to_tsquery, ts_rank and
+  ts_headline.
+- SQLiteBackend: an FTS5 external-content table per model, kept in step by
+  triggers; bm25() ranking and snippet().
+- SimpleBackend: every word must appear (icontains), ranked by the weight
+  of the fields it was found in. A scan; for databases with neither.
+
+Callers only use the functions here. search() returns the queryset filtered
+to the matches, best first, annotated with `rank` (higher is better);
+highlight() then gives each result on the page shown a `snippet`, an
+excerpt with the matches in <mark>.
+
+scripts/bench_search.py compares the backends on a 50k-post corpus.
+"""
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+
+def get_backend():
+    return import_string(settings.SEARCH_BACKEND)()
+
+
+def searchable_models():
+    # Imported lazily: blog.models is not ready when this module loads.
+    from blog.models import Blogmark, Entry
+
+    return (Entry, Blogmark)
+
+
+def search(queryset, q):
+    """Rows of `queryset` matching the query string `q`, best first."""
+    return get_backend().search(queryset, q)
+
+
+def highlight(results, q):
+    """Set `snippet` (safe HTML, "" if none) on each of a page of results."""
+    get_backend().highlight(results, q)
+
+
+def update(instance):
+    """Bring the index up to date with one saved row."""
+    get_backend().update(instance)
+
+
+def rebuild(model):
+    """Re-index every row of `model`; returns the number of rows indexed."""
+    return get_backend().rebuild(model)
+
+
+def install(using="default", **kwargs):
+    """Create whatever the backend keeps outside the migrations.
+
+    Connected to post_migrate (see BlogConfig.ready), so it also runs after
+    every migration that rebuilds a table.
+    """
+    backend = get_backend()
+    for model in searchable_models():
+        backend.install(model, using)
@@ -0,0 +1,299 @@
+"""
+Search backends. Select one with SEARCH_BACKEND; see blog.search.
+
+A backend searches any queryset of a model that declares SEARCH_WEIGHTS
+(field -> "A".."D", most to least important) and SEARCH_HEADLINE (the field
+excerpts are cut from).
+"""
+
+import abc
+import functools
+import operator
+import re
+from html import escape
+
+from django.conf import settings
+from django.contrib.postgres.search import (
+    SearchHeadline,
+    SearchQuery,
+    SearchRank,
+    SearchVector,
+)
+from django.db import connections
+from django.db.models import Case, F, FloatField, Q, Value, When
+from django.db.models.expressions import RawSQL
+from django.utils.safestring import mark_safe
+
+# Highlight markers around matches in a headline. Not HTML: excerpts come
+# from markdown source, so they are escaped first and the markers become
+# <mark> afterwards.
+START, STOP = "\x02", "\x03"
+ELLIPSIS = " … "
+# ts_rank's default weights for A, B, C, D; the other backends reuse them.
+WEIGHTS = {"A": 1.0, "B": 0.4, "C": 0.2, "D": 0.1}
+
+
+def mark(headline):
+    """A headline as safe HTML, the matches wrapped in <mark>."""
+    if not headline:
+        return ""
+    html = escape(headline).replace(START, "<mark>").replace(STOP, "</mark>")
+    return mark_safe(html)
+
+
+class SearchBackend(abc.ABC):
+    # False when there is no index to build (rebuild_search_index says so).
+    indexed = True
+
+    @abc.abstractmethod
+    def search(self, queryset, q):
+        """`queryset` filtered to matches for `q`, annotated with `rank` and
+        ordered best first."""
+
+    def update(self, instance):
+        """Called after `instance` is saved."""
+
+    @abc.abstractmethod
+    def rebuild(self, model):
+        """Re-index every row of `model`; returns how many there are."""
+
+    def install(self, model, using):
+        """Create tables, triggers, etc. the migrations do not."""
+
+    def headlines(self, model, pks, q):
+        """{pk: excerpt of SEARCH_HEADLINE with START/STOP around matches}."""
+        return {}
+
+    def highlight(self, results, q):
+        """Set `snippet` (safe HTML, "" if none) on results of one model.
+
+        Run on the page being shown, not the whole result set, so the
+        excerpts are cut for a handful of rows.
+        """
+        results = list(results)
+        if not results:
+            return
+        headlines = self.headlines(type(results[0]), [r.pk for r in results], q)
+        for result in results:
+            result.snippet = mark(headlines.get(result.pk))
+
+
+class SimpleBackend(SearchBackend):
+    """icontains on every field; no index."""
+
+    indexed = False
+
+    def search(self, queryset, q):
+        terms = q.split()
+        fields = queryset.model.SEARCH_WEIGHTS
+        if not terms:
+            return queryset.none()
+        rank = Value(0.0, output_field=FloatField())
+        for term in terms:
+            found = Q()
+            for field in fields:
+                found |= Q(**{f"{field}__icontains": term})
+            queryset = queryset.filter(found)
+            for field, weight in fields.items():
+                rank += Case(
+                    When(**{f"{field}__icontains": term}, then=Value(WEIGHTS[weight])),
+                    default=Value(0.0),
+                    output_field=FloatField(),
+                )
+        return queryset.annotate(rank=rank).order_by("-rank", "-published_at")
+
+    def rebuild(self, model):
+        return 0
+
+
+class PostgresBackend(SearchBackend):
+    """
+    The `search_vector` column and its GIN index (migration 0016).
+
+    The vector is computed in the database: update() after each save (see
+    blog.signals), rebuild() after writes that bypass save().
+    """
+
+    def document(self, model):
+        """The weighted tsvector expression stored in `model`.search_vector."""
+        return functools.reduce(
+            operator.add,
+            (
+                SearchVector(field, weight=weight, config=settings.SEARCH_CONFIG)
+                for field, weight in model.SEARCH_WEIGHTS.items()
+            ),
+        )
+
+    def query(self, q):
+        return SearchQuery(q, search_type="websearch", config=settings.SEARCH_CONFIG)
+
+    def search(self, queryset, q):
+        query = self.query(q)
+        return (
+            queryset.filter(search_vector=query)
+            .annotate(rank=SearchRank(F("search_vector"), query))
+            .order_by("-rank", "-published_at")
+        )
+
+    def headlines(self, model, pks, q):
+        headline = SearchHeadline(
+            model.SEARCH_HEADLINE,
+            self.query(q),
+            config=settings.SEARCH_CONFIG,
+            start_sel=START,
+            stop_sel=STOP,
+            max_fragments=2,
+            fragment_delimiter=ELLIPSIS,
+        )
+        rows = model._base_manager.filter(pk__in=pks).annotate(headline=headline)
+        return dict(rows.values_list("pk", "headline"))
+
+    def update(self, instance):
+        model = type(instance)
+        model._base_manager.filter(pk=instance.pk).update(
+            search_vector=self.document(model)
+        )
+
+    def rebuild(self, model):
+        return model._base_manager.update(search_vector=self.document(model))
+
+
+# A "quoted phrase", or a run of anything else; either may start with "-".
+_TOKEN = re.compile(r'(-?)(?:"([^"]*)"?|(\S+))')
+_WORD = re.compile(r"\w")
+
+
+def fts5_query(q):
+    """
+    A websearch-style query string as an FTS5 MATCH expression.
+
+    Words and "quoted phrases" are all required, `or` between two of them
+    makes either do, and -word excludes. Every term is passed as an FTS5
+    string, so user input cannot reach the query syntax. Terms without a
+    word character are dropped, as websearch_to_tsquery() drops them.
+    Returns "" when nothing is left to match.
+    """
+    expression = ""
+    operator_ = " AND "
+    for negate, phrase, word in _TOKEN.findall(q):
+        text = phrase if phrase else word
+        if not negate and not phrase and text.lower() == "or":
+            if expression:
+                operator_ = " OR "
+            continue
+        text = text.strip()
+        if not _WORD.search(text):
+            # Bare punctuation ("-", "!!!") tokenizes to nothing, and as a
+            # required phrase it would match no row at all.
+            continue
+        term = '"{}"'.format(text.replace('"', '""'))
+        if negate:
+            # FTS5 cannot match "everything except"; a leading exclusion
+            # has nothing to exclude from.
+            if expression:
+                expression += f" NOT {term}"
+        elif expression:
+            expression += operator_ + term
+        else:
+            expression = term
+        operator_ = " AND "
+    return expression
+
+
+class SQLiteBackend(SearchBackend):
+    """
+    SQLite FTS5: a `<table>_fts` external-content table per model.
+
+    The table stores only the index; the text stays in the model's table.
+    Triggers on the model's table keep it current, so update() has nothing
+    to do. install() creates both if missing; SQLite migrations that rebuild
+    the table drop its triggers, so it runs after every migrate.
+    """
+
+    def table(self, model):
+        return f"{model._meta.db_table}_fts"
+
+    def search(self, queryset, q):
+        expression = fts5_query(q)
+        if not expression:
+            return queryset.none()
+        model = queryset.model
+        table = self.table(model)
+        weights = ", ".join(str(WEIGHTS[w]) for w in model.SEARCH_WEIGHTS.values())
+        quote = connections[queryset.db].ops.quote_name
+        pk = f"{quote(model._meta.db_table)}.{quote(model._meta.pk.column)}"
+        matches = RawSQL(
+            f"SELECT rowid FROM {table} WHERE {table} MATCH %s", [expression]
+        )
+        # bm25() needs the MATCH in its own query: a subquery per matching
+        # row, which FTS5 answers from the rowid. It is lower for better
+        # matches.
+        rank = RawSQL(
+            f"SELECT -bm25({table}, {weights}) FROM {table} "
+            f"WHERE {table} MATCH %s AND rowid = {pk}",
+            [expression],
+            output_field=FloatField(),
+        )
+        return (
+            queryset.filter(pk__in=matches)
+            .annotate(rank=rank)
+            .order_by("-rank", "-published_at")
+        )
+
+    def headlines(self, model, pks, q):
+        expression = fts5_query(q)
+        if not expression:
+            return {}
+        table = self.table(model)
+        column = list(model.SEARCH_WEIGHTS).index(model.SEARCH_HEADLINE)
+        placeholders = ", ".join(["%s"] * len(pks))
+        with connections[model._base_manager.db].cursor() as cursor:
+            cursor.execute(
+                f"SELECT rowid, snippet({table}, %s, %s, %s, %s, 24) FROM {table} "
+                f"WHERE {table} MATCH %s AND rowid IN ({placeholders})",
+                [column, START, STOP, ELLIPSIS, expression, *pks],
+            )
+            return dict(cursor.fetchall())
+
+    def rebuild(self, model):
+        table = self.table(model)
+        with connections[model._base_manager.db].cursor() as cursor:
+            cursor.execute(f"INSERT INTO {table}({table}) VALUES ('rebuild')")
+        return model._base_manager.count()
+
+    def install(self, model, using):
+        connection = connections[using]
+        if connection.vendor != "sqlite":
+            return
+        source = model._meta.db_table
+        table = self.table(model)
+        columns = list(model.SEARCH_WEIGHTS)
+        names = ", ".join(columns)
+        new = ", ".join(f"new.{c}" for c in columns)
+        old = ", ".join(f"old.{c}" for c in columns)
+        pk = model._meta.pk.column
+        insert = f"INSERT INTO {table}(rowid, {names}) VALUES (new.{pk}, {new});"
+        delete = (
+            f"INSERT INTO {table}({table}, rowid, {names}) "
+            f"VALUES ('delete', old.{pk}, {old});"
+        )
+        with connection.cursor() as cursor:
+            existing = connection.introspection.table_names(cursor)
+            if source not in existing:
+                return  # Migrated backwards past the model's table.
+            cursor.execute(
+                f"CREATE VIRTUAL TABLE IF NOT EXISTS {table} USING fts5({names}, "
+                f"content='{source}', content_rowid='{pk}', "
+                "tokenize='porter unicode61')"
+            )
+            for name, when, body in (
+                ("insert", "AFTER INSERT", insert),
+                ("delete", "AFTER DELETE", delete),
+                ("update", f"AFTER UPDATE OF {names}", delete + " " + insert),
+            ):
+                cursor.execute(
+                    f"CREATE TRIGGER IF NOT EXISTS {table}_{name} {when} ON {source} "
+                    f"BEGIN {body} END"
+                )
+            if table not in existing:
+                cursor.execute(f"INSERT INTO {table}({table}) VALUES ('rebuild')")
@@ -0,0 +1,340 @@
+"""
+A static search index the browser queries itself (static/js/search-index.js).
+
+build() writes an inverted index of published entries and blogmarks to the
+default (media) storage under SEARCH_INDEX_PATH, as JSON files the browser
+fetches directly:
+
+- manifest.json: the shard count, the tokenizer's rules and the current
+  file of every shard.
+- terms-NN.<hash>.json: {term: [[doc, score], ...]} for the terms whose
+  shard_of() is NN, best score first.
+- docs-NN.<hash>.json: {doc: {"kind", "title", "url", "date", "version"}}
+  for the documents whose shard_of() is NN. A doc is "e12" for Entry 12,
+  "b7" for Blogmark 7.
+
+A query fetches the manifest, one term shard per word and the doc shards of
+the results shown, so once those are cached a search costs the server
+nothing; the /search/ view remains for everything else. Shard files are
+named by their content hash, so they can be cached indefinitely and an
+unchanged shard is never written twice; only manifest.json changes in place.
+
+Builds are incremental. The previous index is read back, and only documents
+that are new, gone, or whose `updated` differs from the indexed version
+(plus any passed in `changed`) are re-tokenized. Only the shards those
+touch are re-serialized, and only shards whose bytes differ are written.
+Publishing one post rewrites its doc shard, the term shards of its words
+and the manifest. Writes that bypass save() leave `updated` alone; use
+build(full=True) (build_search_index --full) after them.
+
+One build runs at a time: each deletes the shards the previous manifest
+listed, including those an overlapping build has just listed. build() takes
+a lock in the default cache, so with a shared cache this holds across
+processes. It never waits for it: a build finding it held leaves what it
+was asked for to the one running, which builds again once done. The
+signals queue builds with build_on_commit(), which runs one per
+transaction however many saves it made.
+"""
+
+import copy
+import hashlib
+import json
+import logging
+import re
+import threading
+from collections import Counter
+from dataclasses import dataclass
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.utils import timezone
+
+from blog.search import searchable_models
+from blog.search.backends import WEIGHTS
+
+logger = logging.getLogger(__name__)
+
+# Bump when the file layout changes; an index in another format is rebuilt.
+FORMAT = 1
+MIN_LENGTH = 2
+MAX_LENGTH = 32
+# Score per occurrence in a field of each SEARCH_WEIGHTS class; tag names
+# count as titles.
+POINTS = {weight: round(value * 10) for weight, value in WEIGHTS.items()}
+# Common words carry no signal and would be the largest postings lists.
+STOPWORDS = frozenset(
+    "a an and are as at be but by for from has have in is it its of on or "
+    "that the this to was were will with".split()
+)
+# Seconds a build holds the lock at most; a crashed one stops blocking after.
+LOCK_SECONDS = 300
+LOCK = "static-search-index:build"
+# What builds that found the lock held left to the running one:
+# {"changed": [doc keys], "full": bool}.
+AGAIN = "static-search-index:again"
+
+# Per thread: the objects to re-tokenize in the queued build, by doc_key();
+# None when no build is queued.
+_queued = threading.local()
+
+# Runs of letters and digits; the client uses /[\p{L}\p{N}]+/gu.
+_WORD = re.compile(r"[^\W_]+")
+KINDS = {"entry": "e", "blogmark": "b"}
+
+
+def tokenize(text):
+    """The indexable words of `text`, lowercased, in order."""
+    return [
+        word
+        for word in _WORD.findall(text.lower())
+        if MIN_LENGTH <= len(word) <= MAX_LENGTH and word not in STOPWORDS
+    ]
+
+
+def shard_of(key, shards):
+    """32-bit FNV-1a of the UTF-8 key, modulo `shards` (mirrored in JS)."""
+    value = 0x811C9DC5
+    for byte in key.encode():
+        value = ((value ^ byte) * 0x01000193) & 0xFFFFFFFF
+    return value % shards
+
+
+def doc_key(obj):
+    return f"{KINDS[obj._meta.model_name]}{obj.pk}"
+
+
+def version(updated):
+    return updated.isoformat()
+
+
+def scores(obj):
+    """{term: score} for one object: weighted occurrences in its fields."""
+    counts = Counter()
+    for field, weight in obj.SEARCH_WEIGHTS.items():
+        for word in tokenize(getattr(obj, field) or ""):
+            counts[word] += POINTS[weight]
+    for tag in obj.tags.all():
+        for word in tokenize(tag.name):
+            counts[word] += POINTS["A"]
+    return counts
+
+
+def document(obj):
+    return {
+        "kind": obj._meta.model_name,
+        "title": obj.title,
+        "url": obj.get_absolute_url(),
+        "date": timezone.localdate(obj.created).isoformat(),
+        "version": version(obj.updated),
+    }
+
+
+def get_storage():
+    return default_storage
+
+
+def _overwriting(storage):
+    """`storage`, saving over an existing name instead of picking a free one."""
+    storage = copy.copy(storage)
+    if hasattr(storage, "overwrite_files"):  # django-storages backends
+        storage.overwrite_files = True
+    else:  # FileSystemStorage(allow_overwrite=True)
+        storage._allow_overwrite = True
+    return storage
+
+
+def path(name):
+    return f"{settings.SEARCH_INDEX_PATH.strip('/')}/{name}"
+
+
+def manifest_url():
+    return get_storage().url(path("manifest.json"))
+
+
+def _read(storage, name):
+    try:
+        with storage.open(path(name)) as handle:
+            return json.loads(handle.read())
+    except (FileNotFoundError, ValueError):
+        return None
+
+
+def _dump(data):
+    return json.dumps(
+        data, ensure_ascii=False, separators=(",", ":"), sort_keys=True
+    ).encode()
+
+
+def _load(storage, shards, full):
+    """The previous manifest and shards, or empty ones to build from scratch."""
+    empty = None, [{} for _ in range(shards)], [{} for _ in range(shards)]
+    if full:
+        return empty
+    manifest = _read(storage, "manifest.json")
+    if not manifest or (manifest["format"], manifest["shards"]) != (FORMAT, shards):
+        return empty
+    terms = [_read(storage, name) for name in manifest["terms"]]
+    docs = [_read(storage, name) for name in manifest["docs"]]
+    if None in terms or None in docs:
+        logger.warning("Static search index is missing shards; rebuilding it")
+        return empty
+    return manifest, terms, docs
+
+
+@dataclass
+class BuildResult:
+    documents: int
+    reindexed: int
+    removed: int
+    written: int
+
+
+def build(changed=(), full=False):
+    """Bring the static index up to date; see the module docstring.
+
+    `changed` names saved objects to re-tokenize whatever their `updated`
+    says (a tag change does not touch it). Returns None at once if another
+    build is running; that one builds again for these changes when done.
+    """
+    forced = {doc_key(obj) for obj in changed if obj.pk is not None}
+    if not cache.add(LOCK, True, LOCK_SECONDS):
+        again = cache.get(AGAIN) or {"changed": [], "full": False}
+        cache.set(
+            AGAIN,
+            {"changed": [*again["changed"], *forced], "full": again["full"] or full},
+            LOCK_SECONDS,
+        )
+        return None
+    try:
+        while True:
+            result = _build(forced, full)
+            again = cache.get(AGAIN)
+            if again is None:
+                return result
+            cache.delete(AGAIN)
+            forced, full = set(again["changed"]), again["full"]
+    finally:
+        cache.delete(LOCK)
+
+
+def _build(forced, full):
+    storage = get_storage()
+    shards = settings.SEARCH_INDEX_SHARDS
+    manifest, terms, docs = _load(storage, shards, full)
+
+    indexed = {key: doc["version"] for shard in docs for key, doc in shard.items()}
+    current = {}
+    for model in searchable_models():
+        prefix = KINDS[model._meta.model_name]
+        for pk, updated in model.objects.published().values_list("pk", "updated"):
+            current[f"{prefix}{pk}"] = version(updated)
+    dirty = {
+        key
+        for key, value in current.items()
+        if indexed.get(key) != value or key in forced
+    }
+    gone = indexed.keys() - current.keys()
+    stale = gone | (dirty & indexed.keys())
+
+    touched_terms, touched_docs = set(), set()
+    for key in stale:
+        touched_docs.add(shard_of(key, shards))
+        del docs[shard_of(key, shards)][key]
+    if stale:
+        for number, shard in enumerate(terms):
+            for term, postings in list(shard.items()):
+                kept = [posting for posting in postings if posting[0] not in stale]
+                if len(kept) == len(postings):
+                    continue
+                touched_terms.add(number)
+                if kept:
+                    shard[term] = kept
+                else:
+                    del shard[term]
+
+    for model in searchable_models():
+        prefix = KINDS[model._meta.model_name]
+        pks = [int(key[1:]) for key in dirty if key[0] == prefix]
+        rows = model.objects.filter(pk__in=pks).prefetch_related("tags")
+        for obj in rows.iterator(chunk_size=500):
+            key = doc_key(obj)
+            number = shard_of(key, shards)
+            docs[number][key] = document(obj)
+            touched_docs.add(number)
+            for term, score in scores(obj).items():
+                number = shard_of(term, shards)
+                terms[number].setdefault(term, []).append([key, score])
+                touched_terms.add(number)
+    for number in touched_terms:
+        for postings in terms[number].values():
+            postings.sort(key=lambda posting: (-posting[1], posting[0]))
+
+    new = {
+        "format": FORMAT,
+        "shards": shards,
+        "min_length": MIN_LENGTH,
+        "max_length": MAX_LENGTH,
+        "stopwords": sorted(STOPWORDS),
+        "terms": list(manifest["terms"]) if manifest else [None] * shards,
+        "docs": list(manifest["docs"]) if manifest else [None] * shards,
+    }
+    written = 0
+    for kind, contents, touched in (
+        ("terms", terms, touched_terms),
+        ("docs", docs, touched_docs),
+    ):
+        for number, shard in enumerate(contents):
+            if new[kind][number] is not None and number not in touched:
+                continue
+            data = _dump(shard)
+            name = f"{kind}-{number:02d}.{hashlib.sha256(data).hexdigest()[:12]}.json"
+            if name != new[kind][number] and not storage.exists(path(name)):
+                storage.save(path(name), ContentFile(data))
+                written += 1
+            new[kind][number] = name
+
+    # The manifest goes last, so a client never sees a shard before it exists,
+    # and is written over in place, so it is never missing; shards it no
+    # longer lists are deleted after it.
+    if new != manifest:
+        _overwriting(storage).save(path("manifest.json"), ContentFile(_dump(new)))
+        written += 1
+        if manifest:
+            for name in {*manifest["terms"], *manifest["docs"]} - {
+                *new["terms"],
+                *new["docs"],
+            }:
+                storage.delete(path(name))
+    return BuildResult(len(current), len(dirty), len(gone), written)
+
+
+def build_on_commit(obj=None):
+    """After the current transaction commits, update the index for `obj`.
+
+    Every call in one transaction shares a single build. Does nothing unless
+    SEARCH_INDEX_ENABLED. A failure is logged, not raised: the content is
+    saved and /search/ still finds it.
+    """
+    if not settings.SEARCH_INDEX_ENABLED:
+        return
+    changed = getattr(_queued, "changed", None)
+    if changed is None:
+        changed = _queued.changed = {}
+    if obj is not None and obj.pk is not None:
+        changed[doc_key(obj)] = obj
+    # Queued on every call: a rollback discards the callbacks registered in
+    # it. The first to run takes the lot and the others find nothing.
+    transaction.on_commit(_build_queued)
+
+
+def _build_queued():
+    changed, _queued.changed = getattr(_queued, "changed", None), None
+    if changed is None:
+        return
+    try:
+        build(changed=list(changed.values()))
+    except Exception:
+        logger.exception("Could not update the static search index")
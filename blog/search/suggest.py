@@ -0,0 +1,95 @@
+"""
+Search-as-you-type suggestions for /search/suggest/.
+
+suggestions() returns a few published titles and tags containing the typed
+text, for a dropdown under the search box; the full ranked search stays
+behind /search/. Titles and tag names starting with the text come first.
+
+On PostgreSQL the containment test, UPPER(title) LIKE UPPER('%q%'), is
+served by pg_trgm GIN indexes on UPPER(title) and UPPER(name) (migration
+0017), so it does not scan the tables. Other databases scan, which is fine
+for a development copy.
+
+Results are cached per normalized query for SEARCH_SUGGEST_TIMEOUT seconds:
+a reader typing "djan" and the next reader typing "Djan " share an entry,
+and a new post shows up within that window.
+"""
+
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Case, IntegerField, Sum, Value, When
+from django.urls import reverse
+from taggit.models import Tag
+
+from blog.search import searchable_models
+
+MIN_LENGTH = 2
+MAX_LENGTH = 64
+MAX_TAGS = 3
+
+
+def normalize(q):
+    """Lowercased, whitespace-collapsed and capped query ("" if too short)."""
+    q = " ".join(q.lower().split())[:MAX_LENGTH]
+    return q if len(q) >= MIN_LENGTH else ""
+
+
+def _prefix_first(field, q):
+    return Case(
+        When(**{f"{field}__istartswith": q}, then=Value(0)),
+        default=Value(1),
+        output_field=IntegerField(),
+    )
+
+
+def _tags(q, limit):
+    tags = (
+        Tag.objects.filter(name__icontains=q)
+        .annotate(count=Sum("counts__count"))
+        .filter(count__gt=0)
+        .annotate(prefix=_prefix_first("name", q))
+        .order_by("prefix", "-count", "name")[:limit]
+    )
+    return [
+        {"kind": "tag", "title": tag.name, "url": reverse("blog:tag", args=[tag.slug])}
+        for tag in tags
+    ]
+
+
+def _titles(q, limit):
+    found = []
+    for model in searchable_models():
+        rows = (
+            model.objects.published()
+            .filter(title__icontains=q)
+            .annotate(prefix=_prefix_first("title", q))
+            .only("title", "slug", "created", "published_at")
+            .order_by("prefix", "-published_at")[:limit]
+        )
+        found.extend((row.prefix, -row.published_at.timestamp(), row) for row in rows)
+    found.sort(key=lambda item: item[:2])
+    return [
+        {
+            "kind": row._meta.model_name,
+            "title": row.title,
+            "url": row.get_absolute_url(),
+        }
+        for *_, row in found[:limit]
+    ]
+
+
+def suggestions(q):
+    """Up to SEARCH_SUGGEST_LIMIT tags and titles matching `q`, cached."""
+    q = normalize(q)
+    if not q:
+        return []
+    limit = settings.SEARCH_SUGGEST_LIMIT
+    key = f"suggest:{limit}:" + hashlib.sha256(q.encode()).hexdigest()
+    results = cache.get(key)
+    if results is None:
+        tags = _tags(q, min(MAX_TAGS, limit))
+        results = tags + _titles(q, limit - len(tags))
+        cache.set(key, results, settings.SEARCH_SUGGEST_TIMEOUT)
+    return results
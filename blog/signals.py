@@ -1,29 +1,53 @@
 import logging
 
-from django.db.models.signals import post_save, pre_save
+from django.contrib.contenttypes.models import ContentType
+from django.db.models.signals import (
+    m2m_changed,
+    post_delete,
+    post_save,
+    pre_delete,
+    pre_save,
+)
 from django.dispatch import receiver
+from django.utils import timezone
+from taggit.models import Tag, TaggedItem
 
-from .models import Entry
+from projects.models import Project
+
+from . import generations, page_cache, search
+from .models import (
+    Authorship,
+    Blogmark,
+    Entry,
+    RelatedContent,
+    SiteSettings,
+    TagCount,
+)
+from .search import static_index
 
 logger = logging.getLogger(__name__)
 
 
+# Connected before every other pre_save receiver, so they run after it.
+@receiver(pre_save, sender=Entry)
+@receiver(pre_save, sender=Blogmark)
+@receiver(pre_save, sender=Project)
+def load_pre_save_state(sender, instance, **kwargs):
+    """Load the row as stored, once, for the receivers comparing a save with
+    it: instance._pre_save_state, None for a new row."""
+    instance._pre_save_state = (
+        sender.objects.filter(pk=instance.pk).first() if instance.pk else None
+    )
+
+
 @receiver(pre_save, sender=Entry)
 def entry_pre_save(sender, instance, **kwargs):
     """
     Track status changes and log image upload operations for Azure storage debugging.
     """
-    if instance.pk:
-        try:
-            old_instance = Entry.objects.get(pk=instance.pk)
-            instance._old_status = old_instance.status
-            instance._old_publish_date = old_instance.publish_date
-        except Entry.DoesNotExist:
-            instance._old_status = None
-            instance._old_publish_date = None
-    else:
-        instance._old_status = None
-        instance._old_publish_date = None
+    old = instance._pre_save_state
+    instance._old_status = old.status if old else None
+    instance._old_publish_date = old.publish_date if old else None
 
     if instance.image:
         try:
@@ -67,3 +91,306 @@ def entry_post_save(sender, instance, created, **kwargs):
         except Exception as e:
             logger.error(f"Error checking storage: {e}", exc_info=True)
         logger.info("===========================================")
+
+
+def _tag_ids(instance):
+    return list(instance.tags.values_list("pk", flat=True))
+
+
+@receiver(m2m_changed, sender=TaggedItem)
+def tags_changed(sender, instance, action, pk_set, **kwargs):
+    """Recount the tags added to or removed from a published object."""
+    if not isinstance(instance, TagCount.TRACKED) or instance.status != "published":
+        return
+    if action in ("post_add", "post_remove", "post_clear") and instance.is_published:
+        # Tag names are indexed, and changing tags leaves `updated` alone.
+        static_index.build_on_commit(instance)
+    if action == "pre_clear":
+        instance._cleared_tag_ids = _tag_ids(instance)
+    elif action == "post_clear":
+        TagCount.refresh(type(instance), instance.__dict__.pop("_cleared_tag_ids", []))
+    elif action in ("post_add", "post_remove") and pk_set:
+        TagCount.refresh(type(instance), pk_set)
+
+
+@receiver(post_save, sender=Entry)
+@receiver(post_save, sender=Blogmark)
+def tagged_object_saved(sender, instance, created, **kwargs):
+    """A save can publish, unpublish or reschedule: recount the object's tags."""
+    if created:
+        return  # No tags until after the first save.
+    tag_ids = _tag_ids(instance)
+    if tag_ids:
+        TagCount.refresh(sender, tag_ids)
+
+
+@receiver(pre_delete, sender=Entry)
+@receiver(pre_delete, sender=Blogmark)
+def tagged_object_deleting(sender, instance, **kwargs):
+    # The TaggedItem rows are gone by post_delete; note which tags to recount.
+    instance._deleted_tag_ids = _tag_ids(instance)
+
+
+@receiver(post_delete, sender=Entry)
+@receiver(post_delete, sender=Blogmark)
+def tagged_object_deleted(sender, instance, **kwargs):
+    tag_ids = instance.__dict__.pop("_deleted_tag_ids", None)
+    if tag_ids:
+        TagCount.refresh(sender, tag_ids)
+
+
+@receiver(post_save, sender=Entry)
+@receiver(post_save, sender=Blogmark)
+def update_search_index(sender, instance, update_fields, **kwargs):
+    """Keep the search index in step with the searchable fields (blog.search)."""
+    if update_fields is not None and not set(update_fields) & set(
+        sender.SEARCH_WEIGHTS
+    ):
+        return
+    search.update(instance)
+
+
+@receiver(pre_save, sender=Entry)
+@receiver(pre_save, sender=Blogmark)
+def static_search_index_saving(sender, instance, **kwargs):
+    # An unpublish has to take the row out of the index.
+    old = instance._pre_save_state
+    instance._was_indexed = old is not None and old.is_published
+
+
+@receiver(post_save, sender=Entry)
+@receiver(post_save, sender=Blogmark)
+@receiver(post_delete, sender=Entry)
+@receiver(post_delete, sender=Blogmark)
+def update_static_search_index(sender, instance, **kwargs):
+    """Publishing, editing, unpublishing or deleting changes the static index.
+
+    A no-op unless SEARCH_INDEX_ENABLED. Drafts, before and after the save,
+    are not in the index and leave it alone.
+    """
+    was_indexed = instance.__dict__.pop("_was_indexed", False)
+    if was_indexed or instance.is_published:
+        static_index.build_on_commit()
+
+
+def _refresh_related(instance, tag_ids=()):
+    """Refresh what `instance` can affect; `tag_ids` adds tags it just lost
+    or stopped counting for."""
+    if instance.status == "published":
+        tag_ids = {*tag_ids, *_tag_ids(instance)}
+    RelatedContent.refresh(RelatedContent.affected_by(instance, tag_ids))
+
+
+@receiver(m2m_changed, sender=TaggedItem)
+def related_tags_changed(sender, instance, action, pk_set, **kwargs):
+    """Re-rank the items the changed object's tags relate it to (RelatedContent)."""
+    if not isinstance(instance, RelatedContent.tracked()):
+        return
+    if action == "pre_clear":
+        instance._related_tag_ids = _tag_ids(instance)
+    elif action in ("post_add", "post_remove", "post_clear"):
+        if action == "post_clear":
+            pk_set = instance.__dict__.pop("_related_tag_ids", ())
+        # A removed tag weighs more now that one fewer item carries it.
+        _refresh_related(instance, pk_set if instance.status == "published" else ())
+
+
+@receiver(pre_save, sender=Entry)
+@receiver(pre_save, sender=Blogmark)
+@receiver(pre_save, sender=Project)
+def related_object_saving(sender, instance, **kwargs):
+    # Unpublishing changes the weight of its tags for every item carrying
+    # them, though it keeps the tags.
+    old = instance._pre_save_state
+    if old is not None and old.status == "published" and instance.status != "published":
+        instance._unpublished_tag_ids = _tag_ids(instance)
+
+
+@receiver(post_save, sender=Entry)
+@receiver(post_save, sender=Blogmark)
+@receiver(post_save, sender=Project)
+def related_object_saved(sender, instance, **kwargs):
+    """A save can publish, unpublish or retitle an object others list."""
+    _refresh_related(instance, instance.__dict__.pop("_unpublished_tag_ids", ()))
+
+
+@receiver(pre_delete, sender=Entry)
+@receiver(pre_delete, sender=Blogmark)
+@receiver(pre_delete, sender=Project)
+def related_object_deleting(sender, instance, **kwargs):
+    # Its tags are gone by post_delete.
+    if instance.status == "published":
+        instance._deleted_related_tag_ids = _tag_ids(instance)
+
+
+@receiver(post_delete, sender=Entry)
+@receiver(post_delete, sender=Blogmark)
+@receiver(post_delete, sender=Project)
+def related_object_deleted(sender, instance, **kwargs):
+    # Its own rows, the items listing it and, if it was published, those
+    # whose shared tags it no longer weighs down.
+    RelatedContent.refresh(
+        RelatedContent.affected_by(
+            instance, instance.__dict__.pop("_deleted_related_tag_ids", ())
+        )
+    )
+
+
+# Generation counters (blog.generations) behind the cached fragments and
+# timelines. Each receiver bumps what the change can show up in.
+
+
+@receiver(post_save, sender=SiteSettings)
+@receiver(post_delete, sender=SiteSettings)
+def site_settings_changed(sender, **kwargs):
+    generations.bump_on_commit("site")
+
+
+@receiver(pre_save, sender=Entry)
+@receiver(pre_save, sender=Blogmark)
+def content_saving(sender, instance, **kwargs):
+    # Moving `created` to another year changes that year's listings too.
+    if instance._pre_save_state is not None:
+        instance._old_created = instance._pre_save_state.created
+
+
+def _tag_scopes(tag_ids):
+    return [f"tag:{pk}" for pk in tag_ids]
+
+
+@receiver(post_save, sender=Entry)
+@receiver(post_save, sender=Blogmark)
+def content_saved(sender, instance, **kwargs):
+    scopes = generations.content_scopes(instance)
+    old = instance.__dict__.pop("_old_created", None)
+    if old is not None:
+        scopes.append(f"year:{timezone.localtime(old).year}")
+    generations.bump_on_commit(*scopes, *_tag_scopes(_tag_ids(instance)))
+
+
+@receiver(pre_delete, sender=Entry)
+@receiver(pre_delete, sender=Blogmark)
+def content_deleting(sender, instance, **kwargs):
+    # Before the TaggedItem rows go; the bump after commit is the one that
+    # counts.
+    generations.bump_on_commit(
+        *generations.content_scopes(instance), *_tag_scopes(_tag_ids(instance))
+    )
+
+
+@receiver(m2m_changed, sender=TaggedItem)
+def content_tags_changed(sender, instance, action, pk_set, **kwargs):
+    if not isinstance(instance, (Entry, Blogmark)):
+        return
+    if action == "pre_clear":
+        instance._generation_tag_ids = _tag_ids(instance)
+    elif action in ("post_add", "post_remove", "post_clear"):
+        if action == "post_clear":
+            pk_set = instance.__dict__.pop("_generation_tag_ids", ())
+        generations.bump_on_commit(
+            *generations.content_scopes(instance), *_tag_scopes(pk_set or ())
+        )
+
+
+def _tagged_content_scopes(tag):
+    """The tag's members, their years and every tag page listing them."""
+    scopes = {f"tag:{tag.pk}"}
+    for model in (Entry, Blogmark):
+        content_type = ContentType.objects.get_for_model(model)
+        members = TaggedItem.objects.filter(tag=tag, content_type=content_type).values(
+            "object_id"
+        )
+        for obj in model.objects.filter(pk__in=members).only("created"):
+            scopes.update(generations.content_scopes(obj))
+        scopes.update(
+            _tag_scopes(
+                TaggedItem.objects.filter(
+                    content_type=content_type, object_id__in=members
+                ).values_list("tag_id", flat=True)
+            )
+        )
+    return scopes
+
+
+@receiver(post_save, sender=Tag)
+def tag_saved(sender, instance, created, **kwargs):
+    """A rename changes every page listing the tag's members."""
+    if not created:
+        generations.bump_on_commit(*_tagged_content_scopes(instance))
+
+
+@receiver(pre_delete, sender=Tag)
+def tag_deleting(sender, instance, **kwargs):
+    generations.bump_on_commit(*_tagged_content_scopes(instance))
+
+
+@receiver(post_save, sender=Authorship)
+@receiver(post_delete, sender=Authorship)
+def authorship_changed(sender, instance, **kwargs):
+    generations.bump_on_commit(f"entry:{instance.entry_id}")
+
+
+# The full-page cache (blog.page_cache): each receiver purges the paths the
+# change can show up on.
+
+PAGE_MODELS = (Entry, Blogmark, Project)
+
+
+@receiver(post_save, sender=SiteSettings)
+@receiver(post_delete, sender=SiteSettings)
+@receiver(post_save, sender=Tag)
+@receiver(pre_delete, sender=Tag)
+def site_wide_change(sender, **kwargs):
+    # Every page shows the settings; a tag's name is on too many to list.
+    if not kwargs.get("created"):
+        page_cache.purge_all()
+
+
+@receiver(pre_save, sender=Entry)
+@receiver(pre_save, sender=Blogmark)
+@receiver(pre_save, sender=Project)
+def page_saving(sender, instance, **kwargs):
+    # The pages of the saved row: those the save may move it off.
+    if instance._pre_save_state is not None:
+        instance._old_page_paths = page_cache.paths_for(instance._pre_save_state)
+
+
+@receiver(post_save, sender=Entry)
+@receiver(post_save, sender=Blogmark)
+@receiver(post_save, sender=Project)
+def page_saved(sender, instance, **kwargs):
+    page_cache.purge(
+        *page_cache.paths_for(instance),
+        *instance.__dict__.pop("_old_page_paths", ()),
+    )
+
+
+@receiver(pre_delete, sender=Entry)
+@receiver(pre_delete, sender=Blogmark)
+@receiver(pre_delete, sender=Project)
+def page_deleting(sender, instance, **kwargs):
+    page_cache.purge(*page_cache.paths_for(instance))
+
+
+@receiver(m2m_changed, sender=TaggedItem)
+def page_tags_changed(sender, instance, action, pk_set, **kwargs):
+    if not isinstance(instance, PAGE_MODELS):
+        return
+    if action == "pre_clear":
+        instance._page_tag_ids = _tag_ids(instance)
+    elif action in ("post_add", "post_remove", "post_clear"):
+        if action == "post_clear":
+            pk_set = instance.__dict__.pop("_page_tag_ids", ())
+        # paths_for() has the tags it still has; those it lost are added.
+        page_cache.purge(
+            *page_cache.paths_for(instance),
+            *page_cache.tag_paths(type(instance), pk_set or ()),
+        )
+
+
+@receiver(post_save, sender=Authorship)
+@receiver(post_delete, sender=Authorship)
+def page_authorship_changed(sender, instance, **kwargs):
+    entry = Entry.objects.filter(pk=instance.entry_id).first()
+    if entry is not None:  # gone with it: its own delete purged its pages
+        page_cache.purge(*page_cache.paths_for(entry))
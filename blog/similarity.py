@@ -0,0 +1,360 @@
+"""
+Offline TF-IDF similarity between published entries and blogmarks.
+
+`python manage.py build_similarity_index` tokenizes each published item's
+SEARCH_WEIGHTS fields and saves a sparse TF-IDF matrix under
+SIMILARITY_INDEX_DIR as plain .npy arrays. get_index() opens them with
+np.load(mmap_mode="r"): nothing is read until a query touches it, and every
+worker on the host shares the one copy in the page cache.
+
+Files (FORMAT 1):
+
+- meta.json: the doc keys ("e12" for Entry 12, "b7" for Blogmark 7), the
+  `updated` each was indexed at, and the vocabulary.
+- indptr.npy, indices.npy: the documents' terms, as a CSR matrix.
+- counts.npy: each term's occurrences weighted by field (title 1.0, summary
+  0.4, body 0.2: search.backends.WEIGHTS). The build's input.
+- weights.npy: the L2-normalized TF-IDF weights, tf = ln(1 + count) and
+  idf = ln((1 + N) / (1 + df)) + 1, so a dot product is a cosine.
+- postings.{indptr,docs,weights}.npy: the same matrix by term (CSC), which
+  queries walk.
+- idf.npy.
+
+Builds are incremental: only documents that are new or whose `updated`
+moved are re-tokenized; the stored counts of the rest are reused, and idf,
+norms and postings are recomputed from the counts with array operations,
+which costs a fraction of tokenizing. The new files are written beside the
+old ones and swapped in by rename; a worker holding the old maps keeps them
+until it notices.
+
+A query uses only its QUERY_TERMS highest-weighted terms, as "more like
+this" search does: the rare, specific words decide what is similar, and
+skipping the common ones keeps the postings walked short. See
+scripts/bench_similarity.py for timings at 50k documents.
+
+numpy is optional; without it, or without a built index, get_index() returns
+None and callers carry on without text similarity.
+"""
+
+import json
+import os
+import shutil
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.contrib.contenttypes.models import ContentType
+from taggit.models import TaggedItem
+
+from blog.search import searchable_models
+from blog.search.backends import WEIGHTS
+from blog.search.static_index import KINDS, doc_key, tokenize, version
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - numpy is an optional dependency
+    np = None
+
+FORMAT = 1
+QUERY_TERMS = 32
+ARRAYS = (
+    "indptr",
+    "indices",
+    "counts",
+    "weights",
+    "postings.indptr",
+    "postings.docs",
+    "postings.weights",
+    "idf",
+)
+# Dirty documents fetched by primary key below this; above it the build
+# streams every published row instead of sending a huge IN list.
+FETCH_BY_PK = 2000
+
+
+def _counts(obj):
+    """{term: weighted occurrences} over the object's SEARCH_WEIGHTS fields."""
+    counts = Counter()
+    for field, weight in obj.SEARCH_WEIGHTS.items():
+        for word in tokenize(getattr(obj, field) or ""):
+            counts[word] += WEIGHTS[weight]
+    return counts
+
+
+def _gather(indptr, positions):
+    """Indices into a CSR's indices/data covering rows `positions`, in order,
+    and each row's length."""
+    starts = indptr[positions]
+    lengths = indptr[positions + 1] - starts
+    offsets = np.repeat(starts - np.cumsum(lengths) + lengths, lengths)
+    return offsets + np.arange(lengths.sum(), dtype=np.int64), lengths
+
+
+class SimilarityIndex:
+    def __init__(self, directory):
+        self.directory = directory
+        with open(os.path.join(directory, "meta.json")) as handle:
+            meta = json.load(handle)
+        if meta["format"] != FORMAT:
+            raise ValueError(f"similarity index format {meta['format']}")
+        self.keys = meta["keys"]
+        self.versions = meta["versions"]
+        self.terms = meta["terms"]
+        self.position = {key: i for i, key in enumerate(self.keys)}
+        self._term_ids = None
+        for name in ARRAYS:
+            path = os.path.join(directory, f"{name}.npy")
+            setattr(self, name.replace(".", "_"), np.load(path, mmap_mode="r"))
+
+    def __len__(self):
+        return len(self.keys)
+
+    def __contains__(self, key):
+        return key in self.position
+
+    @property
+    def term_ids(self):
+        if self._term_ids is None:
+            self._term_ids = {term: i for i, term in enumerate(self.terms)}
+        return self._term_ids
+
+    def vector(self, key):
+        """(term ids, weights) of an indexed document."""
+        i = self.position[key]
+        start, end = self.indptr[i], self.indptr[i + 1]
+        return self.indices[start:end], self.weights[start:end]
+
+    def vectorize(self, obj):
+        """(term ids, weights) for an object, indexed or not, by this index's
+        vocabulary and idf; words the index has never seen are dropped."""
+        found = [
+            (self.term_ids[term], count)
+            for term, count in _counts(obj).items()
+            if term in self.term_ids
+        ]
+        if not found:
+            return np.empty(0, np.int32), np.empty(0, np.float32)
+        ids = np.array([i for i, _ in found], dtype=np.int32)
+        counts = np.array([c for _, c in found], dtype=np.float32)
+        weights = np.log1p(counts) * self.idf[ids]
+        return ids, weights / np.linalg.norm(weights)
+
+    def nearest(self, ids, weights, limit, exclude=()):
+        """[(key, cosine)] of the `limit` documents closest to a vector."""
+        if not len(ids):
+            return []
+        top = np.argsort(-weights, kind="stable")[:QUERY_TERMS]
+        ids, weights = ids[top], weights[top]
+        walk, lengths = _gather(self.postings_indptr, ids)
+        scores = np.bincount(
+            self.postings_docs[walk],
+            weights=self.postings_weights[walk] * np.repeat(weights, lengths),
+            minlength=len(self.keys),
+        )
+        for key in exclude:
+            if key in self.position:
+                scores[self.position[key]] = 0
+        count = min(limit, len(scores))
+        best = np.argpartition(-scores, count - 1)[:count]
+        best = best[np.argsort(-scores[best], kind="stable")]
+        return [(self.keys[i], float(scores[i])) for i in best if scores[i] > 0]
+
+    def similar(self, obj, limit):
+        """[(key, cosine)] of the documents most like `obj`, not itself."""
+        key = doc_key(obj)
+        if key in self.position:
+            ids, weights = self.vector(key)
+        else:
+            ids, weights = self.vectorize(obj)
+        return self.nearest(ids, weights, limit, exclude=[key])
+
+
+_loaded = {}
+
+
+def get_index():
+    """The index under SIMILARITY_INDEX_DIR, reopened after a rebuild, or
+    None without numpy or a built index."""
+    if np is None:
+        return None
+    directory = settings.SIMILARITY_INDEX_DIR
+    try:
+        stat = os.stat(os.path.join(directory, "meta.json"))
+    except OSError:
+        return None
+    stamp = (stat.st_ino, stat.st_mtime_ns)
+    cached = _loaded.get(directory)
+    if cached is None or cached[0] != stamp:
+        cached = _loaded[directory] = (stamp, SimilarityIndex(directory))
+    return cached[1]
+
+
+def _published():
+    """{key: version} of every published entry and blogmark."""
+    current = {}
+    for model in searchable_models():
+        prefix = KINDS[model._meta.model_name]
+        for pk, updated in model.objects.published().values_list("pk", "updated"):
+            current[f"{prefix}{pk}"] = version(updated)
+    return current
+
+
+def _tokenize(dirty):
+    """{key: Counter} for the documents in `dirty`."""
+    found = {}
+    for model in searchable_models():
+        prefix = KINDS[model._meta.model_name]
+        pks = {int(key[1:]) for key in dirty if key[0] == prefix}
+        if not pks:
+            continue
+        rows = model.objects.published().only("updated", *model.SEARCH_WEIGHTS)
+        if len(pks) < FETCH_BY_PK:
+            rows = rows.filter(pk__in=pks)
+        for obj in rows.iterator(chunk_size=2000):
+            if obj.pk in pks:
+                found[doc_key(obj)] = _counts(obj)
+    return found
+
+
+def _save(directory, meta, arrays):
+    """Write the index beside `directory` and swap it in."""
+    parent = os.path.dirname(os.path.abspath(directory))
+    os.makedirs(parent, exist_ok=True)
+    staging = f"{directory}.new"
+    shutil.rmtree(staging, ignore_errors=True)
+    os.makedirs(staging)
+    for name, array in arrays.items():
+        np.save(os.path.join(staging, f"{name}.npy"), array)
+    with open(os.path.join(staging, "meta.json"), "w") as handle:
+        json.dump(meta, handle, separators=(",", ":"))
+    retired = f"{directory}.old"
+    shutil.rmtree(retired, ignore_errors=True)
+    if os.path.exists(directory):
+        os.rename(directory, retired)
+    os.rename(staging, directory)
+    shutil.rmtree(retired, ignore_errors=True)
+
+
+def build(full=False):
+    """Bring the index up to date; returns (documents, re-tokenized)."""
+    if np is None:
+        raise RuntimeError("The similarity index needs numpy")
+    directory = settings.SIMILARITY_INDEX_DIR
+    old = None if full else get_index()
+    current = _published()
+
+    # Kept documents reuse their stored counts, in their old order.
+    kept = []
+    if old is not None:
+        kept = [
+            i for i, key in enumerate(old.keys) if current.get(key) == old.versions[i]
+        ]
+    kept_keys = {old.keys[i] for i in kept}
+    dirty = [key for key in current if key not in kept_keys]
+    fresh = _tokenize(dirty)
+
+    vocabulary = {term: i for i, term in enumerate(old.terms)} if old else {}
+    if kept:
+        positions = np.array(kept, dtype=np.int64)
+        walk, kept_lengths = _gather(old.indptr, positions)
+        kept_indices = np.asarray(old.indices[walk])
+        kept_data = np.asarray(old.counts[walk])
+    else:
+        kept_lengths = np.empty(0, np.int64)
+        kept_indices = np.empty(0, np.int32)
+        kept_data = np.empty(0, np.float32)
+    new_indices, new_data, new_lengths = [], [], []
+    for counts in fresh.values():
+        new_lengths.append(len(counts))
+        for term, count in counts.items():
+            new_indices.append(vocabulary.setdefault(term, len(vocabulary)))
+            new_data.append(count)
+    keys = [old.keys[i] for i in kept] + list(fresh)
+    lengths = np.concatenate([kept_lengths, np.array(new_lengths, np.int64)])
+    indices = np.concatenate([kept_indices, np.array(new_indices, np.int32)])
+    data = np.concatenate([kept_data, np.array(new_data, np.float32)])
+    indptr = np.concatenate([[0], np.cumsum(lengths)]).astype(np.int64)
+
+    # Drop terms no document uses any more, renumbering the rest in order.
+    df = np.bincount(indices, minlength=len(vocabulary))
+    used = df > 0
+    renumber = (np.cumsum(used) - 1).astype(np.int32)
+    indices = renumber[indices]
+    df = df[used]
+    terms = [term for term, keep in zip(vocabulary, used) if keep]
+
+    count = len(keys)
+    idf = (np.log((1 + count) / (1 + df)) + 1).astype(np.float32)
+    weights = np.log1p(data) * idf[indices]
+    row_of = np.repeat(np.arange(count, dtype=np.int32), lengths)
+    norms = np.sqrt(np.bincount(row_of, weights=weights**2, minlength=count))
+    weights = (weights / norms[row_of]).astype(np.float32)
+    by_term = np.argsort(indices, kind="stable")
+
+    _save(
+        directory,
+        {
+            "format": FORMAT,
+            "keys": keys,
+            "versions": [current[key] for key in keys],
+            "terms": terms,
+        },
+        {
+            "indptr": indptr,
+            "indices": indices,
+            "counts": data,
+            "weights": weights,
+            "postings.indptr": np.concatenate([[0], np.cumsum(df)]).astype(np.int64),
+            "postings.docs": row_of[by_term],
+            "postings.weights": weights[by_term],
+            "idf": idf,
+        },
+    )
+    return count, len(fresh)
+
+
+def _resolve(found):
+    models = {KINDS[model._meta.model_name]: model for model in searchable_models()}
+    return [(models[key[0]], int(key[1:]), score) for key, score in found]
+
+
+def neighbours(model, pk, limit):
+    """[(model, pk, cosine)] of the items most like an indexed one; [] when
+    it is not in the index (not published, or since the last build)."""
+    index = get_index()
+    key = f"{KINDS.get(model._meta.model_name)}{pk}"
+    if index is None or key not in index:
+        return []
+    ids, weights = index.vector(key)
+    return _resolve(index.nearest(ids, weights, limit, exclude=[key]))
+
+
+def related(obj, limit):
+    """[(model, pk, cosine)] of the items most like `obj`, indexed or not."""
+    index = get_index()
+    if index is None or obj._meta.model_name not in KINDS:
+        return []
+    return _resolve(index.similar(obj, limit))
+
+
+def suggest_tags(obj, limit=5, neighbours=20, include_own=False):
+    """Existing tag names for `obj`, voted for by its nearest neighbours'
+    tags weighted by similarity; unless `include_own`, without the tags it
+    already has."""
+    found = related(obj, neighbours)
+    if not found:
+        return []
+    scores = defaultdict(dict)
+    for model, pk, score in found:
+        scores[model][pk] = score
+    own = set(obj.tags.names()) if obj.pk and not include_own else set()
+    votes = Counter()
+    for model, by_pk in scores.items():
+        items = TaggedItem.objects.filter(
+            content_type=ContentType.objects.get_for_model(model),
+            object_id__in=by_pk,
+        ).values_list("object_id", "tag__name")
+        for object_id, name in items:
+            if name not in own:
+                votes[name] += by_pk[object_id]
+    ranked = sorted(votes.items(), key=lambda vote: (-vote[1], vote[0]))
+    return [name for name, _ in ranked[:limit]]
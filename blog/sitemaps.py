@@ -17,8 +17,8 @@ class EntrySitemap(Sitemap):
     priority = 0.9  # High priority for main content
 
     def items(self):
-        """Return only published entries."""
-        return Entry.objects.filter(status="published").order_by("-created")
+        """Return only published entries (scheduled ones once their time comes)."""
+        return Entry.objects.published().order_by("-published_at")
 
     def lastmod(self, obj):
         """Return the last modification date."""
@@ -36,8 +36,8 @@ class BlogmarkSitemap(Sitemap):
     priority = 0.7  # Slightly lower priority than full entries
 
     def items(self):
-        """Return only published blogmarks."""
-        return Blogmark.objects.filter(status="published").order_by("-created")
+        """Return only published blogmarks (scheduled ones once their time comes)."""
+        return Blogmark.objects.published().order_by("-published_at")
 
     def lastmod(self, obj):
         """Return the last modification date."""
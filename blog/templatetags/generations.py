@@ -0,0 +1,24 @@
+"""
+{% generation %}: a scope's generation counter (blog.generations), to vary
+{% cache %} fragments on so they change as soon as the content does.
+
+Example:
+    {% load cache generations %}
+    {% generation "entry" entry.pk as entry_generation %}
+    {% cache fragment_cache_timeout entry_body entry.pk entry_generation %}
+      ...
+    {% endcache %}
+
+The arguments are joined with ":" into the scope name ("entry:12").
+"""
+
+from django import template
+
+from blog import generations
+
+register = template.Library()
+
+
+@register.simple_tag
+def generation(*parts):
+    return generations.get(":".join(str(part) for part in parts))
@@ -0,0 +1,221 @@
+"""
+Merged timeline of entries, blogmarks and (optionally) projects.
+
+The year, month and tag pages used to run one query per content type and
+list every matching blogmark unpaginated. timeline_page() reads one page of
+all of them, newest first, with a single UNION ALL:
+
+    (SELECT 'entry', id, title, ... FROM blog_entry WHERE ... LIMIT n+1)
+    UNION ALL
+    (SELECT 'blogmark', id, title, ... FROM blog_blogmark WHERE ... LIMIT n+1)
+    ORDER BY published_at DESC, kind DESC, id DESC LIMIT n+1
+
+Each branch is already cut to the page (and to the keyset cursor, see
+blog.utils.pagination), so it is a top-N scan of an index in the page's
+order and the page costs O(page size) whatever the archive holds. That
+only holds if the order matches the filter: the year and month pages
+select on `created`, so they pass order="created" and scan the archive
+index from the start of their range, where ordering by published_at would
+walk that index back from today. SQLite does not allow LIMIT inside a
+compound query, so there only the outer LIMIT applies.
+
+Rows come back as TimelineItem objects carrying the stored HTML, not model
+instances; the tags of a whole page are read with one more query. The
+stored HTML is kept current by save() and the deploy-time render_content.
+"""
+
+from dataclasses import dataclass, field
+from datetime import datetime
+
+from django.contrib.contenttypes.models import ContentType
+from django.db import connection
+from django.db.models import CharField, F, IntegerField, Q, Value
+from django.urls import reverse
+from django.utils.safestring import mark_safe
+from taggit.models import TaggedItem
+
+from blog.models import Blogmark, Entry
+from blog.utils.dates import date_kwargs
+from blog.utils.pagination import (
+    NEXT,
+    PREVIOUS,
+    KeysetPage,
+    approximate_total,
+    decode_cursor,
+    encode_cursor,
+    keyset_filter,
+)
+
+ENTRY, BLOGMARK, PROJECT = "entry", "blogmark", "project"
+
+# Sort key of the merged rows after the timestamp (published_at or created);
+# `kind` breaks ties between types sharing an id.
+TIE_BREAKERS = ("kind", "id")
+_CONVERTERS = (datetime.fromisoformat, str, int)
+_NO_LINK = Value("", output_field=CharField())
+_NO_MINUTES = Value(0, output_field=IntegerField())
+
+
+def _sources():
+    # Imported lazily: projects.models imports blog.models.
+    from projects.models import Project
+
+    # kind -> (model, HTML column, outbound link, reading time)
+    return {
+        ENTRY: (Entry, F("summary_html"), _NO_LINK, F("reading_time")),
+        BLOGMARK: (Blogmark, F("commentary_html"), F("url"), _NO_MINUTES),
+        PROJECT: (Project, F("summary_html"), _NO_LINK, _NO_MINUTES),
+    }
+
+
+@dataclass
+class TimelineItem:
+    kind: str
+    id: int
+    title: str
+    slug: str
+    created: datetime
+    published_at: datetime
+    html: str
+    link: str
+    reading_time: int
+    tags: list = field(default_factory=list)
+
+    @property
+    def rendered(self):
+        return mark_safe(self.html)
+
+    def get_absolute_url(self):
+        if self.kind == PROJECT:
+            return reverse("projects:detail", kwargs={"slug": self.slug})
+        return reverse(
+            f"blog:{self.kind}",
+            kwargs={**date_kwargs(self.created), "slug": self.slug},
+        )
+
+
+def _branch(kind, queryset, html, link, minutes):
+    return (
+        queryset.order_by()
+        .annotate(
+            kind=Value(kind, output_field=CharField()),
+            html=html,
+            link=link,
+            minutes=minutes,
+        )
+        .values_list(
+            "kind",
+            "id",
+            "title",
+            "slug",
+            "created",
+            "published_at",
+            "html",
+            "link",
+            "minutes",
+        )
+    )
+
+
+def _attach_tags(items):
+    """Fill item.tags for every item on the page with one query."""
+    by_kind = {}
+    for item in items:
+        by_kind.setdefault(item.kind, {})[item.id] = item
+    if not by_kind:
+        return
+    models = {kind: _sources()[kind][0] for kind in by_kind}
+    content_types = ContentType.objects.get_for_models(*models.values())
+    kind_of = {content_types[model].pk: kind for kind, model in models.items()}
+    condition = Q()
+    for kind, model in models.items():
+        condition |= Q(
+            content_type=content_types[model], object_id__in=list(by_kind[kind])
+        )
+    tagged = (
+        TaggedItem.objects.filter(condition).select_related("tag").order_by("tag__name")
+    )
+    for tagged_item in tagged:
+        item = by_kind[kind_of[tagged_item.content_type_id]].get(tagged_item.object_id)
+        if item is not None:
+            item.tags.append(tagged_item.tag)
+
+
+def timeline_page(
+    request,
+    filter=None,
+    kinds=(ENTRY, BLOGMARK),
+    per_page=10,
+    count=None,
+    order="published_at",
+):
+    """
+    One newest-first page of published content of `kinds`, as TimelineItems.
+
+    `filter` (a Q) is applied to every kind, e.g. Q(tags__slug="python") or
+    Q(created__year=2025); `order` is the timestamp to sort and page on,
+    "published_at" or "created" (the one a date range filters). Returns a
+    KeysetPage linked by ?cursor=; with `count`, a name for the listing (see
+    approximate_total()), its total is the cached count over all kinds.
+    """
+    keys = (order, *TIE_BREAKERS)
+    sources = _sources()
+    querysets = {}
+    for kind in kinds:
+        queryset = sources[kind][0].objects.published()
+        if filter is not None:
+            queryset = queryset.filter(filter)
+        querysets[kind] = queryset
+
+    position = None
+    cursor = request.GET.get("cursor")
+    if cursor:
+        position = decode_cursor(cursor, _CONVERTERS)
+    backwards = position is not None and position[0] == PREVIOUS
+    sign = "" if backwards else "-"
+    ordering = [f"{sign}{key}" for key in keys]
+
+    branches = []
+    for kind, queryset in querysets.items():
+        branch = _branch(kind, queryset, *sources[kind][1:])
+        if position is not None:
+            branch = branch.filter(
+                keyset_filter(keys, position[1], older=not backwards)
+            )
+        if len(querysets) > 1 and (
+            connection.features.supports_slicing_ordering_in_compound
+        ):
+            branch = branch.order_by(*ordering)[: per_page + 1]
+        # SQLite cannot order or limit inside a UNION; there the outer
+        # ORDER BY/LIMIT alone cuts the page, as it does a single kind.
+        branches.append(branch)
+    merged = branches[0]
+    if len(branches) > 1:
+        merged = merged.union(*branches[1:], all=True)
+    rows = list(merged.order_by(*ordering)[: per_page + 1])
+
+    more = len(rows) > per_page
+    rows = rows[:per_page]
+    if backwards:
+        rows.reverse()
+        has_next, has_previous = True, more
+    else:
+        has_next, has_previous = more, position is not None
+    items = [TimelineItem(*row) for row in rows]
+    _attach_tags(items)
+
+    def key_of(item):
+        return [getattr(item, key) for key in keys]
+
+    next_cursor = previous_cursor = None
+    if items and has_next:
+        next_cursor = encode_cursor(NEXT, key_of(items[-1]))
+    if items and has_previous:
+        previous_cursor = encode_cursor(PREVIOUS, key_of(items[0]))
+    total = None
+    if count:
+        total = sum(
+            approximate_total(queryset, f"{count}:{kind}")
+            for kind, queryset in querysets.items()
+        )
+    return KeysetPage(items, next_cursor, previous_cursor, total)
@@ -6,10 +6,10 @@ app_name = "blog"
 
 urlpatterns = [
     path("", views.index, name="index"),
-    path("<int:year>/<str:month>/<int:day>/<slug:slug>/", views.entry, name="entry"),
+    path("<int:year>/<month:month>/<int:day>/<slug:slug>/", views.entry, name="entry"),
     path("preview/entry/<slug:slug>/", views.entry_preview, name="entry_preview"),
     path(
-        "blogmark/<int:year>/<str:month>/<int:day>/<slug:slug>/",
+        "blogmark/<int:year>/<month:month>/<int:day>/<slug:slug>/",
         views.blogmark,
         name="blogmark",
     ),
@@ -17,10 +17,11 @@ urlpatterns = [
         "preview/blogmark/<slug:slug>/", views.blogmark_preview, name="blogmark_preview"
     ),
     path("<int:year>/", views.year, name="year"),
-    path("<int:year>/<str:month>/", views.month, name="month"),
+    path("<int:year>/<month:month>/", views.month, name="month"),
     path("posts/", views.posts, name="posts"),
     path("archive/", views.archive, name="archive"),
     path("tag/<slug:slug>/", views.tag, name="tag"),
     path("search/", views.search, name="search"),
+    path("search/suggest/", views.search_suggest, name="search_suggest"),
     path("feed/", views.AtomFeed(), name="feed"),
 ]
@@ -1,8 +1,13 @@
 """Utility functions for blog app"""
 
+import math
+import re
+
 from django.core.paginator import EmptyPage, PageNotAnInteger, Paginator
 
+from .dates import created_within, date_kwargs, day_range, month_range, year_range
 from .image_processing import create_thumbnail, optimize_image
+from .pagination import KeysetPage
 
 
 def paginate_queryset(request, queryset, per_page=10):
@@ -24,4 +29,31 @@ def paginate_queryset(request, queryset, per_page=10):
     return items
 
 
-__all__ = ["optimize_image", "create_thumbnail", "paginate_queryset"]
+WORDS_PER_MINUTE = 200
+
+_HTML_TAG = re.compile(r"<[^>]+>")
+
+
+def count_words(text):
+    """Words in markdown/HTML source, ignoring any HTML tags."""
+    return len(_HTML_TAG.sub("", text or "").split())
+
+
+def reading_time(word_count):
+    """Estimated minutes to read `word_count` words (200 words per minute)."""
+    return math.ceil(word_count / WORDS_PER_MINUTE)
+
+
+__all__ = [
+    "optimize_image",
+    "create_thumbnail",
+    "paginate_queryset",
+    "KeysetPage",
+    "created_within",
+    "date_kwargs",
+    "day_range",
+    "month_range",
+    "year_range",
+    "count_words",
+    "reading_time",
+]
@@ -0,0 +1,48 @@
+"""
+Half-open datetime ranges for the date-based URLs.
+
+created__year=/__month=/__day= compile to EXTRACT(... AT TIME ZONE ...) on
+the column, which no index on `created` can serve. These helpers turn a
+date into [start, end) bounds in the current (site) timezone instead, so
+the same rows match with a plain range condition:
+
+    Entry.objects.filter(**created_within(month_range(2025, 7)))
+    -> WHERE created >= '2025-07-01 00:00+00' AND created < '2025-08-01 00:00+00'
+
+Invalid dates (Feb 30, year 0) raise ValueError.
+"""
+
+from datetime import date, datetime, time, timedelta
+
+from django.utils import timezone
+
+
+def _midnight(day):
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+def day_range(year, month, day):
+    start = date(year, month, day)
+    return _midnight(start), _midnight(start + timedelta(days=1))
+
+
+def month_range(year, month):
+    start = date(year, month, 1)
+    end = date(year + 1, 1, 1) if month == 12 else date(year, month + 1, 1)
+    return _midnight(start), _midnight(end)
+
+
+def year_range(year):
+    return _midnight(date(year, 1, 1)), _midnight(date(year + 1, 1, 1))
+
+
+def date_kwargs(value):
+    """year/month/day URL kwargs for a datetime, as seen in the site timezone."""
+    local = timezone.localtime(value)
+    return {"year": local.year, "month": local.month, "day": local.day}
+
+
+def created_within(bounds):
+    """Lookup kwargs matching `created` inside a (start, end) range."""
+    start, end = bounds
+    return {"created__gte": start, "created__lt": end}
@@ -1,65 +1,48 @@
-import math
-import re
+import hashlib
 
+from django.conf import settings
 from django.contrib.auth.decorators import login_required
 from django.contrib.syndication.views import Feed
+from django.core.cache import cache
 from django.db import models
+from django.http import Http404, JsonResponse
 from django.shortcuts import get_object_or_404, render
 from django.utils import timezone
+from django.utils.cache import patch_cache_control
 from django.utils.feedgenerator import Atom1Feed
 from taggit.models import Tag
 
-from .models import Blogmark, Entry, SiteSettings
+from . import generations
+from . import search as full_text
+from .models import Blogmark, Entry, SiteSettings, TagCount
 from .related import get_related_entries
-from .utils import paginate_queryset
+from .search.suggest import suggestions
+from .timeline import timeline_page
+from .utils import (
+    created_within,
+    day_range,
+    month_range,
+    paginate_queryset,
+    year_range,
+)
 
 ENTRIES_ON_HOMEPAGE = 5
 
 
-def reading_time(text):
-    """
-    Estimate reading time for a given text.
-    Average reading speed is about 200-250 words per minute.
-    """
-    # Strip HTML tags if present
-    text = re.sub(r"<[^>]+>", "", text)
-
-    # Count words
-    words = len(text.split())
-
-    # Calculate reading time in minutes (using 200 words per minute)
-    minutes = math.ceil(words / 200)
-
-    return minutes
-
-
 def index(request):
-    # Using the new status field to filter published content
     entries = list(
-        Entry.objects.filter(status="published")
-        .filter(
-            models.Q(publish_date__isnull=True)
-            | models.Q(publish_date__lte=timezone.now())
-        )
-        .order_by("-created")[: ENTRIES_ON_HOMEPAGE + 1]
+        Entry.objects.published()
+        .defer(*Entry.LIST_DEFERRED)
+        .order_by("-published_at")[: ENTRIES_ON_HOMEPAGE + 1]
     )
     blogmarks = list(
-        Blogmark.objects.filter(status="published")
-        .filter(
-            models.Q(publish_date__isnull=True)
-            | models.Q(publish_date__lte=timezone.now())
-        )
-        .order_by("-created")[:ENTRIES_ON_HOMEPAGE]
+        Blogmark.objects.published().order_by("-published_at")[:ENTRIES_ON_HOMEPAGE]
     )
     has_more = False
     if len(entries) > ENTRIES_ON_HOMEPAGE:
         has_more = True
         entries = entries[:ENTRIES_ON_HOMEPAGE]
 
-    # Add reading time to entries
-    for entry in entries:
-        entry.reading_time = reading_time(entry.body)
-
     return render(
         request,
         "blog/index.html",
@@ -68,45 +51,24 @@ def index(request):
 
 
 def posts(request):
-    published_filter = models.Q(publish_date__isnull=True) | models.Q(
-        publish_date__lte=timezone.now()
-    )
-
     entries = list(
-        Entry.objects.filter(status="published")
-        .filter(published_filter)
+        Entry.objects.published()
+        .defer(*Entry.LIST_DEFERRED)
         .prefetch_related("tags")
-        .order_by("-created")[: ENTRIES_ON_HOMEPAGE + 1]
+        .order_by("-published_at")[: ENTRIES_ON_HOMEPAGE + 1]
     )
     blogmarks = list(
-        Blogmark.objects.filter(status="published")
-        .filter(published_filter)
+        Blogmark.objects.published()
         .prefetch_related("tags")
-        .order_by("-created")[:ENTRIES_ON_HOMEPAGE]
+        .order_by("-published_at")[:ENTRIES_ON_HOMEPAGE]
     )
 
     has_more = len(entries) > ENTRIES_ON_HOMEPAGE
     if has_more:
         entries = entries[:ENTRIES_ON_HOMEPAGE]
 
-    for entry in entries:
-        entry.reading_time = reading_time(entry.body)
-
-    all_entries = (
-        Entry.objects.filter(status="published")
-        .filter(published_filter)
-        .prefetch_related("tags")
-    )
-    all_blogmarks = (
-        Blogmark.objects.filter(status="published")
-        .filter(published_filter)
-        .prefetch_related("tags")
-    )
-    tag_counts = {}
-    for obj in list(all_entries) + list(all_blogmarks):
-        for tag in obj.tags.all():
-            tag_counts[tag] = tag_counts.get(tag, 0) + 1
-    tags = sorted(tag_counts.items(), key=lambda x: x[1], reverse=True)
+    # Materialized per tag (see TagCount); one grouped query.
+    tags = TagCount.cloud()
 
     return render(
         request,
@@ -120,24 +82,11 @@ def posts(request):
     )
 
 
-def _publicly_visible(qs):
-    """Restrict a BaseEntry queryset to what the public may see: published and
-    not future-scheduled. The canonical detail views use this so a draft 404s at
-    its real URL instead of leaking. Logged-in authors preview drafts through the
-    separate @login_required *_preview views.
-    """
-    return qs.filter(status="published").filter(
-        models.Q(publish_date__isnull=True) | models.Q(publish_date__lte=timezone.now())
-    )
-
-
 def entry(request, year, month, day, slug):
     entry = get_object_or_404(
-        _publicly_visible(Entry.objects),
-        created__year=year,
-        created__month=get_month_number(month),
-        created__day=day,
+        Entry.objects.published(),
         slug=slug,
+        **created_within(_day_range_or_404(year, month, day)),
     )
 
     # Get related entries
@@ -170,11 +119,9 @@ def entry_preview(request, slug):
 
 def blogmark(request, year, month, day, slug):
     blogmark = get_object_or_404(
-        _publicly_visible(Blogmark.objects),
-        created__year=year,
-        created__month=get_month_number(month),
-        created__day=day,
+        Blogmark.objects.published(),
         slug=slug,
+        **created_within(_day_range_or_404(year, month, day)),
     )
     return render(
         request,
@@ -199,178 +146,113 @@ def blogmark_preview(request, slug):
 
 
 def year(request, year):
-    entries = (
-        Entry.objects.filter(created__year=year, status="published")
-        .filter(
-            models.Q(publish_date__isnull=True)
-            | models.Q(publish_date__lte=timezone.now())
-        )
-        .order_by("-created")
-    )
-
-    blogmarks = (
-        Blogmark.objects.filter(created__year=year, status="published")
-        .filter(
-            models.Q(publish_date__isnull=True)
-            | models.Q(publish_date__lte=timezone.now())
-        )
-        .order_by("-created")
+    try:
+        bounds = year_range(year)
+    except ValueError:
+        raise Http404("No such year")
+    page = _timeline(
+        request,
+        models.Q(**created_within(bounds)),
+        f"year:{year}",
+        f"year:{year}",
+        order="created",
     )
-
-    # Paginate entries
-    paginated_entries = paginate_queryset(request, entries)
-
     return render(
         request,
         "blog/year.html",
-        {
-            "entries": paginated_entries,
-            "blogmarks": blogmarks,
-            "year": year,
-            "page_obj": paginated_entries,
-        },
+        {"items": page, "page_obj": page, "year": year},
     )
 
 
 def month(request, year, month):
-    month_number = get_month_number(month)
-    entries = (
-        Entry.objects.filter(
-            created__year=year, created__month=month_number, status="published"
-        )
-        .filter(
-            models.Q(publish_date__isnull=True)
-            | models.Q(publish_date__lte=timezone.now())
-        )
-        .order_by("-created")
-    )
-
-    blogmarks = (
-        Blogmark.objects.filter(
-            created__year=year, created__month=month_number, status="published"
-        )
-        .filter(
-            models.Q(publish_date__isnull=True)
-            | models.Q(publish_date__lte=timezone.now())
-        )
-        .order_by("-created")
+    # `month` is already a number: the <month:...> converter rejects names
+    # it does not know.
+    try:
+        bounds = month_range(year, month)
+    except ValueError:
+        raise Http404("No such month")
+    page = _timeline(
+        request,
+        models.Q(**created_within(bounds)),
+        f"month:{year}-{month}",
+        f"year:{year}",
+        order="created",
     )
-
-    # Paginate entries
-    paginated_entries = paginate_queryset(request, entries)
-
     return render(
         request,
         "blog/month.html",
         {
-            "entries": paginated_entries,
-            "blogmarks": blogmarks,
+            "items": page,
+            "page_obj": page,
             "year": year,
             "month": month,
-            "month_name": get_month_name(month_number),
-            "page_obj": paginated_entries,
+            "month_name": get_month_name(month),
         },
     )
 
 
 def archive(request):
-    entries = (
-        Entry.objects.filter(status="published")
-        .filter(
-            models.Q(publish_date__isnull=True)
-            | models.Q(publish_date__lte=timezone.now())
-        )
-        .order_by("-created")
-    )
+    entries = Entry.objects.published().defer(*Entry.LIST_DEFERRED).order_by("-created")
 
-    blogmarks = (
-        Blogmark.objects.filter(status="published")
-        .filter(
-            models.Q(publish_date__isnull=True)
-            | models.Q(publish_date__lte=timezone.now())
-        )
-        .order_by("-created")
-    )
+    blogmarks = Blogmark.objects.published().order_by("-created")
 
     # The archive is a complete chronological index (title + link + date,
     # grouped by year/month in the template), so list every entry rather than
     # a single page. The template has no pagination controls, so paginating
     # here would strand everything past the first page.
-    return render(
-        request,
-        "blog/archive.html",
+    #
+    # Each year is a {% cache %} fragment keyed on that year's generation,
+    # and its querysets are only evaluated when the fragment is rendered, so
+    # a publish re-renders one year and the rest cost a cache read.
+    numbers = [date.year for date in entries.dates("created", "year", order="DESC")]
+    current = generations.get_many([f"year:{number}" for number in numbers])
+    years = [
         {
-            "entries": entries,
-            "blogmarks": blogmarks,
-        },
-    )
+            "year": number,
+            "generation": current[f"year:{number}"],
+            "entries": entries.filter(**created_within(year_range(number))),
+            "blogmarks": blogmarks.filter(**created_within(year_range(number))),
+        }
+        for number in numbers
+    ]
+    return render(request, "blog/archive.html", {"years": years})
 
 
 def tag(request, slug):
     tag = get_object_or_404(Tag, slug=slug)
-    entries = (
-        Entry.objects.filter(tags__slug=slug, status="published")
-        .filter(
-            models.Q(publish_date__isnull=True)
-            | models.Q(publish_date__lte=timezone.now())
-        )
-        .order_by("-created")
+    page = _timeline(
+        request, models.Q(tags__slug=slug), f"tag:{tag.pk}", f"tag:{tag.pk}"
     )
-
-    blogmarks = (
-        Blogmark.objects.filter(tags__slug=slug, status="published")
-        .filter(
-            models.Q(publish_date__isnull=True)
-            | models.Q(publish_date__lte=timezone.now())
-        )
-        .order_by("-created")
-    )
-
-    # Paginate entries
-    paginated_entries = paginate_queryset(request, entries)
-
     return render(
         request,
         "blog/tag.html",
-        {
-            "tag": tag,
-            "entries": paginated_entries,
-            "blogmarks": blogmarks,
-            "page_obj": paginated_entries,
-        },
+        {"tag": tag, "items": page, "page_obj": page},
     )
 
 
 def search(request):
     q = request.GET.get("q", "").strip()
     if q:
-        # Simple search implementation - can be enhanced later
-        entries = (
-            Entry.objects.filter(status="published")
-            .filter(
-                models.Q(publish_date__isnull=True)
-                | models.Q(publish_date__lte=timezone.now())
-            )
-            .filter(
-                models.Q(title__icontains=q)
-                | models.Q(summary__icontains=q)
-                | models.Q(body__icontains=q)
-            )
-            .order_by("-created")
+        # Ranked by whichever SEARCH_BACKEND is configured; see blog.search.
+        entries = full_text.search(
+            Entry.objects.published()
+            .defer(*Entry.LIST_DEFERRED)
+            .prefetch_related("tags"),
+            q,
         )
-
-        blogmarks = (
-            Blogmark.objects.filter(status="published")
-            .filter(
-                models.Q(publish_date__isnull=True)
-                | models.Q(publish_date__lte=timezone.now())
+        blogmarks = list(
+            full_text.search(
+                Blogmark.objects.published()
+                .defer("search_vector")
+                .prefetch_related("tags"),
+                q,
             )
-            .filter(models.Q(title__icontains=q) | models.Q(commentary__icontains=q))
-            .order_by("-created")
         )
 
         # Paginate entries
         paginated_entries = paginate_queryset(request, entries)
+        full_text.highlight(paginated_entries, q)
+        full_text.highlight(blogmarks, q)
     else:
         entries = []
         blogmarks = []
@@ -388,9 +270,19 @@ def search(request):
     )
 
 
+def search_suggest(request):
+    """Titles and tags matching ?q=, as JSON, for search-as-you-type."""
+    response = JsonResponse(
+        {"results": suggestions(request.GET.get("q", ""))},
+        json_dumps_params={"ensure_ascii": False},
+    )
+    patch_cache_control(response, public=True, max_age=settings.SEARCH_SUGGEST_TIMEOUT)
+    return response
+
+
 class AtomFeed(Feed):
     def title(self):
-        return SiteSettings.get_settings().site_title
+        return SiteSettings.get_cached().site_title
 
     link = "/blog/"
     subtitle = "Latest blog posts"
@@ -398,12 +290,9 @@ class AtomFeed(Feed):
 
     def items(self):
         return (
-            Entry.objects.filter(status="published")
-            .filter(
-                models.Q(publish_date__isnull=True)
-                | models.Q(publish_date__lte=timezone.now())
-            )
-            .order_by("-created")[:15]
+            Entry.objects.published()
+            .defer(*Entry.LIST_DEFERRED)
+            .order_by("-published_at")[:15]
         )
 
     def item_title(self, item):
@@ -413,26 +302,31 @@ class AtomFeed(Feed):
         return item.summary_rendered
 
     def item_pubdate(self, item):
-        return item.created
+        # As items() orders them: a scheduled post dates from going live.
+        return item.published_at
 
 
-def get_month_number(month_name):
-    """Convert month name to number (1-12)"""
-    months = {
-        "jan": 1,
-        "feb": 2,
-        "mar": 3,
-        "apr": 4,
-        "may": 5,
-        "jun": 6,
-        "jul": 7,
-        "aug": 8,
-        "sep": 9,
-        "oct": 10,
-        "nov": 11,
-        "dec": 12,
-    }
-    return months.get(month_name.lower()[:3], 1)
+def _timeline(request, filter, name, scope, order="published_at"):
+    """timeline_page() with its count, for the page `name` at ?cursor=,
+    cached until the generation of `scope` moves (blog.generations).
+
+    Keyed on the time zone too: it decides which posts a year or month holds.
+    """
+    cursor = hashlib.sha256(request.GET.get("cursor", "").encode()).hexdigest()
+    zone = timezone.get_current_timezone_name()
+    key = f"timeline:{name}:{zone}:{generations.get(scope)}:{cursor}"
+    page = cache.get(key)
+    if page is None:
+        page = timeline_page(request, filter, count=f"{name}:{zone}", order=order)
+        cache.set(key, page, settings.FRAGMENT_CACHE_TIMEOUT)
+    return page
+
+
+def _day_range_or_404(year, month, day):
+    try:
+        return day_range(year, month, day)
+    except ValueError:
+        raise Http404("No such date")
 
 
 def get_month_name(month_number):
@@ -24,6 +24,21 @@ python manage.py migrate --check && {
     exit 1
 }
 
+# Backfill stored HTML for rows whose markdown or render config changed
+echo "Refreshing stored content renders..."
+python manage.py render_content --all
+python manage.py backfill_word_counts
+python manage.py rebuild_tag_counts
+
+# The similarity index lives on the container's disk; this also refreshes
+# the related items drawing on it
+echo "Building the similarity index..."
+python manage.py build_similarity_index
+
+# Cached pages were rendered with the previous release's templates
+echo "Purging the page cache..."
+python manage.py purge_page_cache --all
+
 # Configure site domain for development environment
 if [[ "$DJANGO_SETTINGS_MODULE" == *"development"* ]]; then
     echo "Configuring site for development environment..."
@@ -46,8 +61,8 @@ if [[ "$DJANGO_SETTINGS_MODULE" == *"production"* ]]; then
 
     # Create the crontab file
     cat > /etc/cron.d/publish-scheduled << EOF
-# Run the publish_scheduled command every hour
-0 * * * * root cd /app && python manage.py publish_scheduled >> /app/logs/scheduled_publishing.log 2>&1
+# Run the publish_scheduled command every hour, then index what went live
+0 * * * * root cd /app && python manage.py publish_scheduled >> /app/logs/scheduled_publishing.log 2>&1 && python manage.py build_similarity_index >> /app/logs/scheduled_publishing.log 2>&1
 EOF
 
     # Give proper permissions to the cron job
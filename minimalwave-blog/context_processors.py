@@ -3,7 +3,9 @@ import datetime
 from django.conf import settings
 from django.utils import timezone
 
+from blog import generations
 from blog.models import SiteSettings
+from blog.search import static_index
 
 
 def common_context(request):
@@ -13,8 +15,9 @@ def common_context(request):
     # Runs on every request. Never let a settings-row lookup failure (DB down,
     # pre-migrate, read replica) raise here and 500 every page — including the
     # error pages, which also render base.html. Degrade to safe defaults.
+    # The settings row is cached until it is saved.
     try:
-        site_settings = SiteSettings.get_settings()
+        site_settings = SiteSettings.get_cached(generations.get("site"))
         site_name = site_settings.site_title
         site_description = site_settings.site_description
     except Exception:
@@ -38,4 +41,7 @@ def common_context(request):
         "plausible_enabled": settings.PLAUSIBLE_ENABLED,
         "plausible_domain": settings.PLAUSIBLE_DOMAIN,
         "plausible_script_url": settings.PLAUSIBLE_SCRIPT_URL,
+        "search_index_url": settings.SEARCH_INDEX_ENABLED
+        and static_index.manifest_url(),
+        "fragment_cache_timeout": settings.FRAGMENT_CACHE_TIMEOUT,
     }
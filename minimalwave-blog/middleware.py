@@ -1,3 +1,4 @@
+from django.conf import settings
 from django.utils.cache import patch_response_headers
 
 
@@ -12,12 +13,18 @@ class CacheControlMiddleware:
         if not request.path.startswith("/admin/") and not request.path.startswith(
             "/static/"
         ):
-            if request.method == "GET":
+            # A view that set its own Cache-Control (search suggestions)
+            # keeps it.
+            if request.method == "GET" and not response.has_header("Cache-Control"):
                 # Cache public pages for 10 minutes
                 patch_response_headers(response, cache_timeout=600)
 
-                # Add cache control headers
-                response["Cache-Control"] = "public, max-age=600"
+                # Add cache control headers; past max-age, caches may serve
+                # the copy they have while fetching a new one
+                response["Cache-Control"] = (
+                    "public, max-age=600, "
+                    f"stale-while-revalidate={settings.PAGE_CACHE_STALE_SECONDS}"
+                )
 
                 # Add Vary header to respect mobile/desktop differences
                 if "Vary" in response:
@@ -136,6 +136,56 @@ MARKDOWN_EXTENSION_CONFIGS = {
 
 MARKDOWN_OUTPUT_FORMAT = "html5"
 
+# Highlighted code blocks are cached by (lexer, options, sha256 of the code) in
+# process and in the default cache; see blog.highlight.
+HIGHLIGHT_CACHE_TIMEOUT = 60 * 60 * 24 * 30  # 30 days
+
+# Markdown longer than this is rendered block by block, each block's HTML
+# cached by content hash, so editing a long post only re-renders the blocks
+# that changed; see blog.incremental.
+INCREMENTAL_MIN_CHARS = 8000
+MARKDOWN_BLOCK_CACHE_TIMEOUT = 60 * 60 * 24 * 7  # 7 days
+
+# Render budget: larger sources, or renders running longer (seconds), fall
+# back to the last good render or escaped source; see blog.rendering.
+MARKDOWN_MAX_CHARS = 200_000
+MARKDOWN_RENDER_TIMEOUT = 2.0
+
+# Seconds the year/month/tag listings cache their total count; the keyset
+# paginator itself never counts. See blog.utils.pagination.
+PAGINATION_COUNT_TIMEOUT = 60 * 5
+
+# Seconds {% cache %} fragments and the year/month/tag timelines are kept.
+# They are keyed on generation counters that saves bump (blog.generations),
+# so this only bounds how long unused copies occupy the cache.
+FRAGMENT_CACHE_TIMEOUT = 60 * 60 * 24  # 1 day
+
+# Seconds past CACHE_MIDDLEWARE_SECONDS a cached page is still served while
+# a background render replaces it (blog.page_cache), and the
+# stale-while-revalidate clients and CDNs are sent.
+PAGE_CACHE_STALE_SECONDS = 60 * 60 * 24  # 1 day
+
+# Engine behind /search/ (see blog.search.backends): PostgresBackend,
+# SQLiteBackend (FTS5) or SimpleBackend (icontains, any database).
+SEARCH_BACKEND = "blog.search.backends.PostgresBackend"
+# Text search configuration (stemming, stop words) for PostgresBackend.
+SEARCH_CONFIG = "english"
+# /search/suggest/: most results returned, and seconds each query's results
+# are cached. See blog.search.suggest.
+SEARCH_SUGGEST_LIMIT = 8
+SEARCH_SUGGEST_TIMEOUT = 60
+# Static search index the browser queries itself, kept in the default storage
+# under SEARCH_INDEX_PATH (see blog.search.static_index). build_search_index
+# builds it; when enabled it is also updated on every publish and the header
+# search box uses it, falling back to /search/.
+SEARCH_INDEX_ENABLED = os.getenv("SEARCH_INDEX_ENABLED", "False").lower() == "true"
+SEARCH_INDEX_PATH = "search-index"
+SEARCH_INDEX_SHARDS = 32
+
+# TF-IDF index behind text-based related posts and offline tag suggestions,
+# built by build_similarity_index (see blog.similarity). Needs numpy.
+SIMILARITY_INDEX_DIR = os.path.join(BASE_DIR, "data", "similarity")
+
 # Ensure logs directory exists
 log_dir = os.path.join(BASE_DIR, "logs")
 os.makedirs(log_dir, exist_ok=True)
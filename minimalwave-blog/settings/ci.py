@@ -12,6 +12,9 @@ DATABASES = {
     }
 }
 
+# FTS5 search on SQLite; see blog.search.backends
+SEARCH_BACKEND = "blog.search.backends.SQLiteBackend"
+
 # Disable debug for CI
 DEBUG = False
 
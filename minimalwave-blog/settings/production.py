@@ -26,7 +26,9 @@ CACHES = {
 
 # Cache configuration
 CACHE_MIDDLEWARE_ALIAS = "default"
-CACHE_MIDDLEWARE_SECONDS = 600  # 10 minutes
+# Saves purge the pages they change (blog.page_cache), so cached pages can
+# live for hours; browsers are still told max-age=600 (CacheControlMiddleware).
+CACHE_MIDDLEWARE_SECONDS = 60 * 60 * 6  # 6 hours
 CACHE_MIDDLEWARE_KEY_PREFIX = "minimalwave"
 
 # Static files
@@ -200,6 +202,15 @@ else:
         "same-origin path; it would render a <script src> that CSP then blocks."
     )
 
+# The static search index is fetched from the media storage, which is another
+# origin when it is Azure.
+_parsed_media = urlparse(MEDIA_URL)
+_search_index_src = (
+    [f"{_parsed_media.scheme}://{_parsed_media.netloc}"]
+    if SEARCH_INDEX_ENABLED and _parsed_media.netloc
+    else []
+)
+
 # self + data: + any https origin. Published posts can embed externally hosted
 # images via the {{img:https://...}} shortcode, so image sources are intentionally
 # open over HTTPS (the Azure media host is already a subset of https:).
@@ -221,7 +232,7 @@ CONTENT_SECURITY_POLICY = {
         "script-src": [SELF, _THEME_INIT_HASH, _THEME_TOGGLE_HASH, *_plausible_src],
         "style-src": [SELF, "'unsafe-inline'"],
         "img-src": _img_src,
-        "connect-src": [SELF, *_plausible_src],
+        "connect-src": [SELF, *_plausible_src, *_search_index_src],
         "font-src": [SELF],
         "frame-src": _frame_src,
         "base-uri": [SELF],
@@ -235,10 +246,10 @@ MIDDLEWARE = [
     "django.middleware.security.SecurityMiddleware",
     "csp.middleware.CSPMiddleware",
     "whitenoise.middleware.WhiteNoiseMiddleware",
-    "django.middleware.cache.UpdateCacheMiddleware",
+    "blog.page_cache.UpdateCacheMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
-    "django.middleware.cache.FetchFromCacheMiddleware",
+    "blog.page_cache.FetchFromCacheMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
     "django.contrib.auth.middleware.AuthenticationMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
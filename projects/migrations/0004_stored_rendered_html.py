@@ -0,0 +1,33 @@
+# Generated by Django 5.2 on 2026-10-16 22:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0003_project_updated'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='project',
+            name='body_html',
+            field=models.TextField(blank=True, editable=False),
+        ),
+        migrations.AddField(
+            model_name='project',
+            name='rendered_hash',
+            field=models.CharField(blank=True, editable=False, help_text='Fingerprint of the markdown sources and config behind the stored HTML', max_length=64),
+        ),
+        migrations.AddField(
+            model_name='project',
+            name='summary_html',
+            field=models.TextField(blank=True, editable=False),
+        ),
+        migrations.AddField(
+            model_name='project',
+            name='summary_plain',
+            field=models.TextField(blank=True, editable=False),
+        ),
+    ]
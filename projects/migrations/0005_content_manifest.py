@@ -0,0 +1,18 @@
+# Generated by Django 5.2 on 2026-10-16 23:25
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0004_stored_rendered_html'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='project',
+            name='content_manifest',
+            field=models.JSONField(blank=True, default=dict, editable=False, help_text='Links, images, media, headings and code languages found when the markdown was last rendered (see blog.manifest)'),
+        ),
+    ]
@@ -0,0 +1,43 @@
+"""Add published_at = COALESCE(publish_date, created) to Project.
+
+Added nullable, filled for existing rows, then made NOT NULL; save() keeps
+it current from then on.
+"""
+
+from django.db import migrations, models
+from django.db.models.functions import Coalesce
+
+
+def fill_published_at(apps, schema_editor):
+    Project = apps.get_model("projects", "Project")
+    Project.objects.update(published_at=Coalesce("publish_date", "created"))
+
+
+def published_at_field(null=False):
+    return models.DateTimeField(
+        editable=False,
+        null=null,
+        help_text="When this content goes public: publish_date if set, else "
+        "created. Kept in step by save()",
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("projects", "0005_content_manifest"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="project",
+            name="published_at",
+            field=published_at_field(null=True),
+        ),
+        migrations.RunPython(fill_published_at, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name="project",
+            name="published_at",
+            field=published_at_field(),
+        ),
+    ]
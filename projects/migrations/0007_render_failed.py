@@ -0,0 +1,18 @@
+# Generated by Django 5.2 on 2026-10-17 01:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0006_project_published_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='project',
+            name='render_failed',
+            field=models.BooleanField(default=False, editable=False, help_text='The last render went over budget; the stored HTML is its fallback, retried on the next save or render_content run'),
+        ),
+    ]
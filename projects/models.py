@@ -1,12 +1,9 @@
-import markdown
-from django.conf import settings
 from django.db import models
 from django.urls import reverse
 from django.utils import timezone
-from django.utils.html import mark_safe, strip_tags
+from django.utils.html import mark_safe
 
-from blog.models import BaseEntry
-from blog.templatetags.markdown_extras import preprocess_image_shortcodes
+from blog.models import BaseEntry, derived_from
 
 
 class ProjectQuerySet(models.QuerySet):
@@ -16,10 +13,7 @@ class ProjectQuerySet(models.QuerySet):
         Single source of truth for "publicly visible" — used by the views,
         the Atom feed, and the sitemap so they cannot drift apart.
         """
-        return self.filter(status="published").filter(
-            models.Q(publish_date__isnull=True)
-            | models.Q(publish_date__lte=timezone.now())
-        )
+        return self.filter(status="published", published_at__lte=timezone.now())
 
 
 class Project(BaseEntry):
@@ -82,6 +76,12 @@ class Project(BaseEntry):
         null=True,
         help_text="Screenshot or thumbnail for the card and social cards",
     )
+    summary_html = models.TextField(blank=True, editable=False)
+    summary_plain = models.TextField(blank=True, editable=False)
+    body_html = models.TextField(blank=True, editable=False)
+
+    RENDERED_FIELDS = {"summary": "summary_html", "body": "body_html"}
+    PLAIN_TEXT_FIELDS = {"summary": "summary_plain"}
 
     objects = ProjectQuerySet.as_manager()
 
@@ -106,40 +106,19 @@ class Project(BaseEntry):
         """Split the comma-separated tech_stack into a list for chip rendering."""
         return [t.strip() for t in self.tech_stack.split(",") if t.strip()]
 
-    @property
+    @derived_from("summary")
     def summary_rendered(self):
-        processed = preprocess_image_shortcodes(self.summary)
-        return mark_safe(
-            markdown.markdown(
-                processed,
-                extensions=settings.MARKDOWN_EXTENSIONS,
-                output_format=settings.MARKDOWN_OUTPUT_FORMAT,
-            )
-        )
+        return mark_safe(self._stored_render("summary"))
 
-    @property
+    @derived_from("summary")
     def summary_text(self):
-        processed = preprocess_image_shortcodes(self.summary)
-        return strip_tags(
-            markdown.markdown(
-                processed,
-                extensions=settings.MARKDOWN_EXTENSIONS,
-                output_format=settings.MARKDOWN_OUTPUT_FORMAT,
-            )
-        )
+        return self._stored_render("summary", plain=True)
 
-    @property
+    @derived_from("body")
     def body_rendered(self):
-        processed = preprocess_image_shortcodes(self.body)
-        return mark_safe(
-            markdown.markdown(
-                processed,
-                extensions=settings.MARKDOWN_EXTENSIONS,
-                output_format=settings.MARKDOWN_OUTPUT_FORMAT,
-            )
-        )
+        return mark_safe(self._stored_render("body"))
 
-    @property
+    @derived_from("screenshot")
     def get_image_url(self):
         """Effective image URL for the card and social/OpenGraph tags."""
         if self.screenshot:
@@ -0,0 +1,128 @@
+#!/usr/bin/env python
+"""
+Benchmark: OFFSET pagination (Paginator) vs keyset cursors across page depth.
+
+Fills a throwaway test database with published entries, then times fetching
+one page of the archive listing at increasing depths through
+paginate_queryset() (COUNT(*) + LIMIT/OFFSET) and blog.timeline's
+timeline_page() ordered by created, as the year and month pages use it (seek
+past the cursor; total from the cached count).
+
+Usage:
+    python scripts/bench_pagination.py [rows]
+    DJANGO_SETTINGS_MODULE=minimalwave-blog.settings.development \\
+        python scripts/bench_pagination.py 100000   # against Postgres
+
+Sample run (Python 3.11, Postgres 16, 100,000 entries, 10 per page):
+    page      offset      keyset
+    1       21.93 ms     2.73 ms
+    10      24.84 ms     3.78 ms
+    100     28.23 ms     3.93 ms
+    1000    35.16 ms     3.87 ms
+    5000    68.68 ms     4.00 ms
+    9999    93.11 ms     3.25 ms
+
+The offset column pays for COUNT(*) on every page. The keyset column's total
+comes from the cache; under the ci settings (DummyCache) it is recounted on
+each call too.
+"""
+
+import os
+import sys
+import time
+from datetime import timedelta
+
+import django
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "minimalwave-blog.settings.ci")
+django.setup()
+
+from django.db import connection
+from django.test import RequestFactory
+from django.test.utils import setup_test_environment
+from django.utils import timezone
+
+from blog.models import Entry
+from blog.timeline import ENTRY, timeline_page
+from blog.utils import paginate_queryset
+from blog.utils.pagination import NEXT, encode_cursor
+
+PER_PAGE = 10
+DEPTHS = (1, 10, 100, 1000, 5000)
+REPEAT = 20
+
+
+def fill(rows):
+    now = timezone.now()
+    batch = []
+    for i in range(rows):
+        created = now - timedelta(minutes=i)
+        batch.append(
+            Entry(
+                title=f"Post {i}",
+                slug=f"post-{i}",
+                summary="Summary.",
+                body="Body.",
+                status="published",
+                created=created,
+                published_at=created,
+            )
+        )
+        if len(batch) == 5000:
+            Entry.objects.bulk_create(batch)
+            batch = []
+    Entry.objects.bulk_create(batch)
+    if connection.vendor == "postgresql":
+        with connection.cursor() as cursor:
+            cursor.execute("ANALYZE blog_entry")
+
+
+def timed(fn):
+    fn()  # warm up (and fill the cached total)
+    start = time.perf_counter()
+    for _ in range(REPEAT):
+        fn()
+    return (time.perf_counter() - start) / REPEAT * 1000
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    setup_test_environment()
+    old_name = connection.creation.create_test_db(verbosity=0)
+    try:
+        fill(rows)
+        listing = Entry.objects.published().defer(*Entry.LIST_DEFERRED)
+        ordered = listing.order_by("-created", "-id")
+        factory = RequestFactory()
+        print(f"{'page':<6} {'offset':>9} {'keyset':>11}")
+        for depth in (*DEPTHS, rows // PER_PAGE - 1):
+            # The cursor a reader would hold after following "Older" depth-1
+            # times: the key of the last row on the previous page.
+            cursor = None
+            if depth > 1:
+                last = ordered[(depth - 1) * PER_PAGE - 1]
+                cursor = encode_cursor(NEXT, [last.created, ENTRY, last.id])
+            offset_request = factory.get("/", {"page": depth})
+            keyset_request = factory.get("/", {"cursor": cursor} if cursor else {})
+            offset_ms = timed(
+                lambda: list(paginate_queryset(offset_request, ordered, PER_PAGE))
+            )
+            keyset_ms = timed(
+                lambda: list(
+                    timeline_page(
+                        keyset_request,
+                        kinds=(ENTRY,),
+                        per_page=PER_PAGE,
+                        count="bench",
+                        order="created",
+                    )
+                )
+            )
+            print(f"{depth:<6} {offset_ms:>6.2f} ms {keyset_ms:>8.2f} ms")
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+
+
+if __name__ == "__main__":
+    main()
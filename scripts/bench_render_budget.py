@@ -0,0 +1,101 @@
+#!/usr/bin/env python
+"""
+Worst-case markdown corpus: how long each input takes to render, unguarded
+and through the render budget (MARKDOWN_MAX_CHARS / MARKDOWN_RENDER_TIMEOUT).
+
+Each case is rendered once unguarded, cut off at --cap seconds so a
+pathological case doesn't hang the run, then once through
+render_or_fallback() with the configured budget.
+
+Usage:
+    python scripts/bench_render_budget.py [--cap SECONDS] [case ...]
+
+Sample run (Python 3.11, Markdown 3.8):
+    budget 200,000 chars / 2.0s, cap 30s
+    case                     chars   unguarded      guarded  result
+    nested_list_50            5250     32.9 ms      17.2 ms  html
+    nested_list_200          81000    417.2 ms     406.8 ms  html
+    blockquote_500             506     51.5 ms      50.5 ms  html
+    table_5k_rows            90028   1036.3 ms    1000.4 ms  html
+    fence_1mb              1000014   7539.0 ms       3.9 ms  fallback
+    fence_150k              150014   1069.6 ms      29.1 ms  html
+    underscore_mix           30000   2154.9 ms    2000.6 ms  fallback
+    brackets_10k             20001      > 30 s    2000.5 ms  fallback
+    backticks_20k            20000      > 30 s    2000.5 ms  fallback
+    emphasis_20k             20000      2.7 ms       2.1 ms  html
+    list_items_20k          140000   1158.6 ms    1204.2 ms  html
+
+Uncapped, brackets_10k takes about 31 s and backticks_20k was still running
+after seven minutes. The guarded fence_150k render is fast only because the
+unguarded run warmed the highlight cache.
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import django
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "minimalwave-blog.settings.ci")
+django.setup()
+
+from django.conf import settings
+
+from blog.rendering import (
+    RenderBudgetExceeded,
+    convert,
+    fallback_html,
+    render_or_fallback,
+    time_budget,
+)
+
+CORPUS = {
+    "nested_list_50": "".join("    " * i + "- item\n" for i in range(50)),
+    "nested_list_200": "".join("    " * i + "- item\n" for i in range(200)),
+    "blockquote_500": ">" * 500 + " deep\n",
+    "table_5k_rows": "| a | b | c |\n|---|---|---|\n" + "| 1 | *2* | `3` |\n" * 5000,
+    "fence_1mb": "```python\n" + "x = [1, 2, 3]  # comment\n" * 40000 + "```\n",
+    "fence_150k": "```python\n" + "x = [1, 2, 3]  # comment\n" * 6000 + "```\n",
+    "underscore_mix": "_a *b " * 5000,
+    "brackets_10k": "[" * 10000 + "x" + "]" * 10000,
+    "backticks_20k": "`" * 20000,
+    "emphasis_20k": "*" * 20000,
+    "list_items_20k": "- item\n" * 20000,
+}
+
+
+def unguarded(text, cap):
+    start = time.perf_counter()
+    try:
+        with time_budget(cap):
+            convert(text, shortcodes=True)
+    except RenderBudgetExceeded:
+        return f"> {cap:g} s"
+    return f"{(time.perf_counter() - start) * 1000:.1f} ms"
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--cap", type=float, default=30.0)
+    parser.add_argument("cases", nargs="*", default=list(CORPUS))
+    args = parser.parse_args()
+
+    print(
+        f"budget {settings.MARKDOWN_MAX_CHARS:,} chars / "
+        f"{settings.MARKDOWN_RENDER_TIMEOUT}s, cap {args.cap:g}s"
+    )
+    print(f"{'case':<20} {'chars':>9} {'unguarded':>11} {'guarded':>12}  result")
+    for name in args.cases:
+        text = CORPUS[name]
+        raw = unguarded(text, args.cap)
+        start = time.perf_counter()
+        html = render_or_fallback(text, f"corpus {name}", blocks=False)
+        guarded = (time.perf_counter() - start) * 1000
+        result = "fallback" if html == fallback_html(text) else "html"
+        print(f"{name:<20} {len(text):>9} {raw:>11} {guarded:>9.1f} ms  {result}")
+
+
+if __name__ == "__main__":
+    main()
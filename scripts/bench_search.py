@@ -0,0 +1,141 @@
+#!/usr/bin/env python
+"""
+Benchmark: the old icontains search vs the configured SEARCH_BACKEND.
+
+Fills a throwaway test database with synthetic published entries (random
+words from a fixed vocabulary, a few paragraphs of body each), then times
+what /search/ does for one page of results: COUNT(*) for the paginator, the
+first 10 rows and (for the backend) their highlighted snippets, for a
+common word, a rare word and a two-word query.
+
+Usage:
+    python scripts/bench_search.py [rows]
+    DJANGO_SETTINGS_MODULE=minimalwave-blog.settings.development \\
+        python scripts/bench_search.py 50000   # against Postgres
+
+Sample runs (Python 3.11, 50,000 entries):
+    PostgreSQL 16, PostgresBackend      SQLite 3.40, SQLiteBackend (FTS5)
+    query       icontains  full-text    query       icontains  full-text
+    python      807.07 ms  175.81 ms    python       68.45 ms  175.01 ms
+    zeppelin   2611.77 ms    6.27 ms    zeppelin    133.79 ms    2.95 ms
+    django orm 1491.63 ms  213.56 ms    django orm  178.43 ms  147.33 ms
+
+icontains scans every body on each query (twice: the count and the page).
+The indexes answer a rare word almost at once; a word found in nearly every
+post still ranks every match, which on SQLite costs more than its LIKE scan
+of an in-memory database.
+"""
+
+import os
+import random
+import sys
+import time
+
+import django
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "minimalwave-blog.settings.ci")
+django.setup()
+
+from django.db import connection
+from django.db.models import Q
+from django.test.utils import setup_test_environment
+from django.utils import timezone
+
+from blog import search
+from blog.models import Entry
+
+PER_PAGE = 10
+REPEAT = 10
+QUERIES = ("python", "zeppelin", "django orm")
+# "zeppelin" appears in one post in 5,000; the rest of the vocabulary is common.
+VOCABULARY = (
+    "python django orm query index database cache template view model "
+    "server request response deploy docker test migration field postgres "
+    "search render markdown feed tag archive page cursor signal worker queue "
+    "the a of and to in is it for on with as at by from this that"
+).split()
+
+
+def sentence(rng, words):
+    return " ".join(rng.choice(VOCABULARY) for _ in range(words)).capitalize() + "."
+
+
+def fill(rows):
+    rng = random.Random(0)
+    now = timezone.now()
+    batch = []
+    for i in range(rows):
+        body = "\n\n".join(
+            " ".join(sentence(rng, rng.randint(8, 20)) for _ in range(5))
+            for _ in range(4)
+        )
+        if i % 5000 == 0:
+            body += " Zeppelin."
+        batch.append(
+            Entry(
+                title=sentence(rng, 5),
+                slug=f"post-{i}",
+                summary=sentence(rng, 25),
+                body=body,
+                status="published",
+                created=now,
+                published_at=now,
+            )
+        )
+        if len(batch) == 5000:
+            Entry.objects.bulk_create(batch)
+            batch = []
+    Entry.objects.bulk_create(batch)
+    # bulk_create skips post_save, which maintains PostgresBackend's vectors.
+    search.rebuild(Entry)
+    if connection.vendor == "postgresql":
+        with connection.cursor() as cursor:
+            cursor.execute("ANALYZE blog_entry")
+
+
+def icontains(q):
+    """The search view's query before blog.search."""
+    return (
+        Entry.objects.published()
+        .filter(Q(title__icontains=q) | Q(summary__icontains=q) | Q(body__icontains=q))
+        .defer(*Entry.LIST_DEFERRED)
+        .order_by("-published_at")
+    )
+
+
+def full_text(q):
+    return search.search(Entry.objects.published().defer(*Entry.LIST_DEFERRED), q)
+
+
+def timed(queryset, q=None):
+    def page():
+        queryset.count()
+        rows = list(queryset[:PER_PAGE])
+        if q is not None:
+            search.highlight(rows, q)
+
+    page()  # warm up
+    start = time.perf_counter()
+    for _ in range(REPEAT):
+        page()
+    return (time.perf_counter() - start) / REPEAT * 1000
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 50_000
+    setup_test_environment()
+    old_name = connection.creation.create_test_db(verbosity=0)
+    try:
+        fill(rows)
+        print(f"{'query':<18} {'icontains':>11} {'full-text':>11}")
+        for q in QUERIES:
+            print(
+                f"{q:<18} {timed(icontains(q)):>8.2f} ms {timed(full_text(q), q):>8.2f} ms"
+            )
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+#!/usr/bin/env python
+"""
+Benchmark: shortcode expansion as a separate pre-pass vs inside the parse.
+
+"legacy" is the former preprocess_image_shortcodes() (uncompiled pattern, a
+position map rebuilt per match, always a full-text re.sub) followed by a
+render; "engine" is blog.rendering.render_markdown(), where ShortcodeExtension
+expands shortcodes within the same parse. The synthetic corpus mixes posts
+with and without {{img:...}} shortcodes, and every document is checked to
+render byte-identically both ways before timing.
+
+Usage:
+    python scripts/bench_shortcodes.py [documents]
+
+Sample runs (Python 3.11, markdown 3.8, 300 documents, best of 5):
+    expansion step: legacy 21.2 ms, engine 21.0 ms
+    expansion step: legacy 22.5 ms, engine 22.4 ms
+The end-to-end difference stays inside run-to-run noise (+/-10%): the re
+module already caches the legacy pattern, and block parsing plus Pygments
+dominate a render. The gain is removing the extra pass, not wall time.
+"""
+
+import os
+import re
+import sys
+import time
+from html import escape
+
+import django
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "minimalwave-blog.settings.ci")
+django.setup()
+
+from blog.rendering import convert, get_converter, render_markdown
+
+
+def legacy_preprocess(text):
+    pattern = r"\{\{img:([^|]+)\|([^|]+)\|(\d+)(?:\|([^}]*))?\}\}"
+
+    def replace_shortcode(match):
+        path, position, width, caption = match.groups()
+        caption = caption.strip() if caption else ""
+        caption_escaped = escape(caption) if caption else ""
+        if not (path.startswith("http://") or path.startswith("https://")):
+            path = f"/media/{path.lstrip('/')}"
+        path_escaped = escape(path)
+        position_class_map = {
+            "left": "float-left",
+            "right": "float-right",
+            "center": "center",
+            "full": "full",
+        }
+        position_class = position_class_map.get(position, "center")
+        if caption_escaped:
+            return f"""<figure class="markdown-image {position_class}" style="max-width: {width}px;">
+    <img src="{path_escaped}" alt="{caption_escaped}" loading="lazy">
+    <figcaption>{caption_escaped}</figcaption>
+</figure>"""
+        return f'<figure class="markdown-image {position_class}" style="max-width: {width}px;"><img src="{path_escaped}" alt="" loading="lazy"></figure>'
+
+    return re.sub(pattern, replace_shortcode, text)
+
+
+def legacy_render(text):
+    return convert(legacy_preprocess(text))
+
+
+def corpus(documents):
+    paragraph = (
+        "Lorem ipsum dolor sit amet, *consectetur* adipiscing elit, sed do "
+        "eiusmod tempor incididunt ut labore et dolore magna aliqua."
+    )
+    docs = []
+    for i in range(documents):
+        blocks = [f"## Post {i}"] + [paragraph] * 20
+        if i % 2:
+            blocks.insert(5, f"{{{{img:uploads/{i}.jpg|right|300|Caption <{i}>}}}}")
+            blocks.insert(
+                12, f"Inline {{{{img:https://x.test/{i}.png|left|200}}}} here."
+            )
+        docs.append("\n\n".join(blocks))
+    return docs
+
+
+def timed(fn, docs, repeat=5):
+    """Best-of-`repeat` wall time for running fn over the corpus."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for doc in docs:
+            fn(doc)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    documents = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    docs = corpus(documents)
+    for doc in docs:
+        assert legacy_render(doc) == render_markdown(doc), "output differs"
+    size_mb = sum(len(d) for d in docs) / 1e6
+    preprocessor = get_converter(shortcodes=True).preprocessors["normalize_whitespace"]
+    normalizer = get_converter().preprocessors["normalize_whitespace"]
+    legacy_step = timed(
+        lambda doc: normalizer.run(legacy_preprocess(doc).split("\n")), docs
+    )
+    engine_step = timed(lambda doc: preprocessor.run(doc.split("\n")), docs)
+    legacy = timed(legacy_render, docs)
+    engine = timed(render_markdown, docs)
+    print(f"{documents} documents, {size_mb:.1f} MB, byte-identical output")
+    print(
+        f"expansion step: legacy {legacy_step * 1000:.1f} ms, engine {engine_step * 1000:.1f} ms"
+    )
+    print(f"legacy pre-pass + render  {legacy * 1000:8.1f} ms")
+    print(f"in-parse shortcode engine {engine * 1000:8.1f} ms")
+    print(f"saved {(legacy - engine) * 1000:.1f} ms ({legacy / engine:.2f}x)")
+
+
+if __name__ == "__main__":
+    main()
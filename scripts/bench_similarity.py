@@ -0,0 +1,148 @@
+#!/usr/bin/env python
+"""
+Benchmark: building and querying the TF-IDF similarity index (blog.similarity).
+
+Fills a throwaway test database with synthetic published entries whose
+words follow a Zipf-like distribution over a large vocabulary (a few very
+common words, a long tail of rare ones, as in real prose), then times a full
+build, an incremental build after editing 1% of the entries, one similar()
+query per entry for a sample of entries, and reports the size of the index
+on disk.
+
+Usage:
+    python scripts/bench_similarity.py [rows]
+    DJANGO_SETTINGS_MODULE=minimalwave-blog.settings.development \\
+        python scripts/bench_similarity.py 50000   # against Postgres
+
+Sample run (Python 3.11, numpy 2.4, SQLite, 50,000 entries):
+    full build             25.69 s
+    incremental (500)       3.64 s
+    similar() median        1.32 ms
+    similar() p99           2.72 ms
+    index size             224.7 MB
+
+The full build is almost all tokenizing; an incremental build tokenizes
+only the edited entries and redoes idf, norms and postings as array
+operations over the stored counts. A query walks the postings of at most
+QUERY_TERMS words. Synthetic posts of 330 words from a 30,000-word
+vocabulary have far more distinct terms each than real ones, so the index
+is larger than a real blog's of the same size would be.
+"""
+
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+import django
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "minimalwave-blog.settings.ci")
+django.setup()
+
+from django.db import connection
+from django.test.utils import override_settings, setup_test_environment
+from django.utils import timezone
+
+from blog import similarity
+from blog.models import Entry
+
+VOCABULARY = 30_000
+QUERIES = 500
+EDITED = 0.01
+
+
+def word(rng):
+    # Rank r is drawn with probability ~1/r: word 0 is everywhere, word
+    # 29,999 is in a handful of posts.
+    return f"w{int(VOCABULARY ** rng.random()) - 1}"
+
+
+def text(rng, words):
+    return " ".join(word(rng) for _ in range(words))
+
+
+def fill(rows):
+    rng = random.Random(0)
+    now = timezone.now()
+    batch = []
+    for i in range(rows):
+        batch.append(
+            Entry(
+                title=text(rng, 6),
+                slug=f"post-{i}",
+                summary=text(rng, 25),
+                body=text(rng, 300),
+                status="published",
+                created=now,
+                published_at=now,
+            )
+        )
+        if len(batch) == 5000:
+            Entry.objects.bulk_create(batch)
+            batch = []
+    Entry.objects.bulk_create(batch)
+
+
+def timed(function, *args, **kwargs):
+    start = time.perf_counter()
+    function(*args, **kwargs)
+    return time.perf_counter() - start
+
+
+def size(directory):
+    return sum(
+        os.path.getsize(os.path.join(directory, name)) for name in os.listdir(directory)
+    )
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 50_000
+    if similarity.np is None:
+        sys.exit("bench_similarity needs numpy")
+    setup_test_environment()
+    old_name = connection.creation.create_test_db(verbosity=0)
+    try:
+        with (
+            tempfile.TemporaryDirectory() as root,
+            override_settings(SIMILARITY_INDEX_DIR=os.path.join(root, "similarity")),
+        ):
+            fill(rows)
+            full = timed(similarity.build, full=True)
+
+            rng = random.Random(1)
+            edited = rng.sample(
+                list(Entry.objects.values_list("pk", flat=True)), int(rows * EDITED)
+            )
+            for pk in edited:
+                entry = Entry.objects.get(pk=pk)
+                entry.body += " " + text(rng, 20)
+                entry.save()
+            incremental = timed(similarity.build)
+
+            index = similarity.get_index()
+            sample = Entry.objects.filter(
+                pk__in=rng.sample(
+                    list(Entry.objects.values_list("pk", flat=True)), QUERIES
+                )
+            )
+            sample = list(sample)
+            index.similar(sample[0], 6)  # warm up
+            latencies = sorted(
+                timed(index.similar, entry, 6) * 1000 for entry in sample
+            )
+
+            print(f"{'full build':<20} {full:>8.2f} s")
+            print(f"{f'incremental ({len(edited)})':<20} {incremental:>8.2f} s")
+            print(f"{'similar() median':<20} {statistics.median(latencies):>8.2f} ms")
+            p99 = latencies[int(len(latencies) * 0.99) - 1]
+            print(f"{'similar() p99':<20} {p99:>8.2f} ms")
+            print(f"{'index size':<20} {size(index.directory) / 2**20:>8.1f} MB")
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,171 @@
+/*
+ * Client-side search over the static index (blog.search.static_index).
+ *
+ * Takes over search forms carrying data-index (the manifest URL): fetches the
+ * manifest, one term shard per query word and the doc shards of the hits,
+ * and renders the results in place of the page content. Shard files are
+ * named by content hash, so repeat searches come from the HTTP cache.
+ * Progressive enhancement: if anything fails (no index built yet, offline
+ * with nothing cached, a query of only stop words) the form submits to
+ * /search/ as it would without JS.
+ */
+(function () {
+  "use strict";
+
+  var forms = document.querySelectorAll("form.search-form[data-index]");
+  if (!forms.length || !window.fetch || !window.TextEncoder) return;
+
+  var MAX_RESULTS = 50;
+  var WORD = /[\p{L}\p{N}]+/gu;
+  var manifestUrl = forms[0].getAttribute("data-index");
+  var base = manifestUrl.slice(0, manifestUrl.lastIndexOf("/") + 1);
+  var files = {};
+
+  function fetchJSON(url) {
+    if (!files[url]) {
+      files[url] = fetch(url).then(function (response) {
+        if (!response.ok) throw new Error(url + ": " + response.status);
+        return response.json();
+      });
+      files[url].catch(function () {
+        delete files[url]; // retry next time
+      });
+    }
+    return files[url];
+  }
+
+  // 32-bit FNV-1a of the UTF-8 key, as shard_of() in Python.
+  function shardOf(key, shards) {
+    var hash = 0x811c9dc5;
+    new TextEncoder().encode(key).forEach(function (byte) {
+      hash = Math.imul(hash ^ byte, 0x01000193) >>> 0;
+    });
+    return hash % shards;
+  }
+
+  function tokenize(text, manifest) {
+    var stop = new Set(manifest.stopwords);
+    return (text.toLowerCase().match(WORD) || []).filter(function (word) {
+      return (
+        word.length >= manifest.min_length &&
+        word.length <= manifest.max_length &&
+        !stop.has(word)
+      );
+    });
+  }
+
+  function shard(manifest, kind, key) {
+    return fetchJSON(base + manifest[kind][shardOf(key, manifest.shards)]);
+  }
+
+  // Every word is required, as on /search/; scores add up across words.
+  function search(q) {
+    return fetchJSON(manifestUrl).then(function (manifest) {
+      var words = Array.from(new Set(tokenize(q, manifest)));
+      if (!words.length) throw new Error("nothing to search for");
+      return Promise.all(
+        words.map(function (word) {
+          return shard(manifest, "terms", word).then(function (terms) {
+            return terms[word] || [];
+          });
+        })
+      ).then(function (lists) {
+        var scores = new Map();
+        lists[0].forEach(function (posting) {
+          scores.set(posting[0], posting[1]);
+        });
+        lists.slice(1).forEach(function (postings) {
+          var next = new Map();
+          postings.forEach(function (posting) {
+            if (scores.has(posting[0])) {
+              next.set(posting[0], scores.get(posting[0]) + posting[1]);
+            }
+          });
+          scores = next;
+        });
+        // Only the best MAX_RESULTS need their doc shards.
+        var keys = Array.from(scores.keys()).sort(function (a, b) {
+          return scores.get(b) - scores.get(a);
+        });
+        return Promise.all(
+          keys.slice(0, MAX_RESULTS).map(function (key) {
+            return shard(manifest, "docs", key).then(function (docs) {
+              return Object.assign({ score: scores.get(key) }, docs[key]);
+            });
+          })
+        );
+      });
+    });
+  }
+
+  function formatDate(iso) {
+    return new Date(iso + "T00:00:00Z").toLocaleDateString("en-US", {
+      year: "numeric",
+      month: "long",
+      day: "numeric",
+      timeZone: "UTC",
+    });
+  }
+
+  function element(tag, attrs, text) {
+    var node = document.createElement(tag);
+    Object.keys(attrs).forEach(function (name) {
+      node.setAttribute(name, attrs[name]);
+    });
+    if (text !== undefined) node.textContent = text;
+    return node;
+  }
+
+  function render(q, results) {
+    results.sort(function (a, b) {
+      return b.score - a.score || (a.date < b.date ? 1 : a.date > b.date ? -1 : 0);
+    });
+    var section = element("section", { class: "search-results" });
+    section.appendChild(element("h1", {}, "Search Results"));
+    if (!results.length) {
+      section.appendChild(element("p", {}, 'No results found for "' + q + '".'));
+    } else {
+      section.appendChild(element("p", {}, 'Results for "' + q + '":'));
+    }
+    results.forEach(function (result) {
+      var article = element("article", {});
+      var heading = element("h3", {});
+      heading.appendChild(element("a", { href: result.url }, result.title));
+      article.appendChild(heading);
+      article.appendChild(
+        element("div", { class: "post-meta" }, formatDate(result.date))
+      );
+      section.appendChild(article);
+    });
+    document.getElementById("main-content").replaceChildren(section);
+  }
+
+  var searched = false;
+
+  function onSubmit(event) {
+    var form = event.currentTarget;
+    var q = form.elements.q.value.trim();
+    if (!q) return;
+    event.preventDefault();
+    search(q).then(
+      function (results) {
+        var url = form.action + "?" + new URLSearchParams({ q: q });
+        history.pushState({ q: q }, "", url);
+        searched = true;
+        render(q, results);
+      },
+      function () {
+        form.submit(); // does not fire "submit" again
+      }
+    );
+  }
+
+  forms.forEach(function (form) {
+    form.addEventListener("submit", onSubmit);
+  });
+  // Results are not kept in the history; going back or forward after a
+  // search reloads the page at that URL.
+  window.addEventListener("popstate", function () {
+    if (searched) location.reload();
+  });
+})();
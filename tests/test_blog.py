@@ -1,15 +1,40 @@
 import glob
+import json
 import os
+import tempfile
+import time
+from datetime import datetime, timedelta
+from datetime import timezone as dt_timezone
+from io import StringIO
+from unittest import mock, skipUnless
+from xml.etree import ElementTree
 
 from django.apps import apps
 from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.handlers.wsgi import WSGIRequest
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.db.models import Q
 from django.template import engines
 from django.template.loader import get_template
-from django.test import Client, TestCase
+from django.test import Client, RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from django.utils import timezone
 
-from blog.models import Blogmark, Entry
+from blog import generations, similarity
+from blog import search as full_text
+from blog.models import Blogmark, Entry, RelatedContent, SiteSettings, TagCount
+from blog.related import get_related_entries
+from blog.search import static_index
+from blog.search.backends import SearchBackend, fts5_query
+from blog.search.suggest import suggestions
+from blog.sitemaps import EntrySitemap
+from blog.timeline import timeline_page
+from blog.utils import created_within, day_range, year_range
+from blog.utils.pagination import NEXT, encode_cursor
+from projects.models import Project
 
 
 class BlogTestCase(TestCase):
@@ -165,7 +190,7 @@ class BlogTestCase(TestCase):
 
     def test_month_archive_returns_200(self):
         """Month archive renders. Regression guard for the same 500, and for
-        the month-slug resolution (numeric months resolve to January)."""
+        the month-slug resolution (numeric months are not month slugs)."""
         created = self.entry.created
         response = self.client.get(
             reverse(
@@ -193,7 +218,7 @@ class BlogTestCase(TestCase):
     def test_entry_breadcrumb_uses_alphabetic_month_slug(self):
         """The BreadcrumbList month item must use the alphabetic slug
         (e.g. /jul/) that the blog:month view expects, not a numeric month
-        (which get_month_number silently resolves to January). Guards the
+        (which the <month:...> converter rejects). Guards the
         breadcrumb template directly, not just the view's resolver."""
         created = self.entry.created
         month_slug = created.strftime("%b").lower()
@@ -204,6 +229,1569 @@ class BlogTestCase(TestCase):
         self.assertContains(response, f'/{created.year}/{month_slug}/"')
 
 
+class DateUrlTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        # 23:30 on 31 July in New York is already 1 August in UTC.
+        cls.created = datetime(2025, 8, 1, 3, 30, tzinfo=dt_timezone.utc)
+        cls.entry = Entry.objects.create(
+            title="Late Night",
+            slug="late-night",
+            summary="S",
+            body="B",
+            status="published",
+            created=cls.created,
+        )
+
+    def test_month_converter(self):
+        self.assertEqual(reverse("blog:month", args=[2025, 7]), "/2025/jul/")
+        self.assertEqual(reverse("blog:month", args=[2025, "Jul"]), "/2025/jul/")
+        for month in ("jul", "July", "JUL"):
+            response = self.client.get(f"/2025/{month}/")
+            self.assertEqual(response.status_code, 200, month)
+            self.assertEqual(response.context["month_name"], "July")
+        # Previously resolved to January.
+        self.assertEqual(self.client.get("/2025/foo/").status_code, 404)
+        self.assertEqual(self.client.get("/2025/feb/30/x/").status_code, 404)
+
+    def test_dates_follow_site_timezone(self):
+        with self.settings(TIME_ZONE="America/New_York"):
+            url = self.entry.get_absolute_url()
+            self.assertEqual(url, "/2025/jul/31/late-night/")
+            self.assertEqual(self.client.get(url).status_code, 200)
+            self.assertEqual(
+                self.client.get("/2025/aug/1/late-night/").status_code, 404
+            )
+            response = self.client.get("/2025/jul/")
+            self.assertEqual(
+                [item.id for item in response.context["items"]], [self.entry.id]
+            )
+        with self.settings(TIME_ZONE="UTC"):
+            self.assertEqual(
+                self.client.get("/2025/aug/1/late-night/").status_code, 200
+            )
+            self.assertEqual(len(self.client.get("/2025/jul/").context["items"]), 0)
+
+    def test_permalink_skips_extract(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get("/2025/aug/1/late-night/")
+        sql = queries.captured_queries[0]["sql"]
+        self.assertIn('"blog_entry"."slug" =', sql)
+        self.assertNotIn("EXTRACT", sql.upper())
+
+
+class SearchTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        def entry(title, summary, body, status="published", **kwargs):
+            return Entry.objects.create(
+                title=title,
+                slug=title.lower().replace(" ", "-"),
+                summary=summary,
+                body=body,
+                status=status,
+                **kwargs,
+            )
+
+        cls.in_title = entry("Postgres Indexing", "Notes.", "Nothing else here.")
+        cls.in_body = entry(
+            "Weekly notes",
+            "Odds and ends.",
+            "A long aside about <b>postgres</b> indexing at AT&T in the middle.",
+            created=timezone.now() + timedelta(minutes=-1),
+        )
+        cls.other = entry("Gardening", "Tomatoes.", "Postgres is not a plant.")
+        entry("Draft postgres indexing", "S", "B", status="draft")
+        cls.blogmark = Blogmark.objects.create(
+            title="Indexing talk",
+            slug="indexing-talk",
+            url="https://example.com/talk",
+            commentary="A talk about postgres indexing.",
+            status="published",
+        )
+
+    def results(self, q, model=Entry):
+        return list(full_text.search(model.objects.published(), q))
+
+    def test_every_word_required_and_title_ranks_first(self):
+        self.assertEqual(
+            self.results("postgres indexing"), [self.in_title, self.in_body]
+        )
+        self.assertEqual(self.results("postgres indexing", Blogmark), [self.blogmark])
+        self.assertEqual(self.results("tomatoes"), [self.other])
+        self.assertEqual(self.results("   "), [])
+
+    def test_view_ranks_and_lists_both_kinds(self):
+        response = self.client.get(reverse("blog:search"), {"q": "postgres indexing"})
+        self.assertEqual(
+            list(response.context["entries"]), [self.in_title, self.in_body]
+        )
+        self.assertEqual(response.context["blogmarks"], [self.blogmark])
+        self.assertNotContains(response, "Draft postgres")
+
+    @skipUnless(full_text.get_backend().indexed, "needs a full-text backend")
+    def test_stemming_and_maintained_index(self):
+        self.assertEqual(self.results("indexes"), [self.in_title, self.in_body])
+        self.in_title.title = "Renamed"
+        self.in_title.body = "Only about sourdough."
+        self.in_title.save()
+        self.assertEqual(self.results("sourdough"), [self.in_title])
+        self.assertEqual(self.results("postgres indexing"), [self.in_body])
+
+    @skipUnless(full_text.get_backend().indexed, "needs a full-text backend")
+    def test_snippet_escapes_source_and_marks_matches(self):
+        response = self.client.get(reverse("blog:search"), {"q": "postgres"})
+        snippets = {e.pk: str(e.snippet) for e in response.context["entries"]}
+        snippet = snippets[self.in_body.pk]
+        self.assertIn("<mark>postgres</mark>", snippet)
+        self.assertIn("AT&amp;T", snippet)
+        self.assertNotIn("<b>", snippet)
+
+    def test_exclusion_and_or(self):
+        self.assertEqual(
+            self.results("postgres -tomatoes -plant"), [self.in_title, self.in_body]
+        )
+        self.assertEqual(self.results("sourdough or tomatoes"), [self.other])
+        self.assertEqual(self.results("tomatoes - !!!"), [self.other])
+
+    def test_backend_without_search_fails_when_created(self):
+        class Incomplete(SearchBackend):
+            def rebuild(self, model):
+                return 0
+
+        with self.assertRaises(TypeError):
+            Incomplete()
+
+    def test_fts5_query_quotes_every_term(self):
+        self.assertEqual(fts5_query('django "orm query"'), '"django" AND "orm query"')
+        self.assertEqual(fts5_query("a or b -c"), '"a" OR "b" NOT "c"')
+        self.assertEqual(
+            fts5_query('-x NEAR(y) "un"closed'), '"NEAR(y)" AND "un" AND "closed"'
+        )
+        self.assertEqual(fts5_query('a"b'), '"a""b"')
+        self.assertEqual(fts5_query("or -x"), "")
+        # Bare punctuation is not a term to require.
+        self.assertEqual(fts5_query("hello -"), '"hello"')
+        self.assertEqual(fts5_query("hello !!!"), '"hello"')
+        self.assertEqual(fts5_query("c++ - tips"), '"c++" AND "tips"')
+        self.assertEqual(fts5_query('"..." -!'), "")
+
+    @skipUnless(connection.vendor == "postgresql", "PostgreSQL full-text search")
+    def test_match_uses_gin_index(self):
+        with connection.cursor() as cursor:
+            cursor.execute("SET LOCAL enable_seqscan = off")
+        plan = full_text.search(Entry.objects.all(), "postgres").explain()
+        self.assertIn("blog_entry_search_idx", plan)
+
+
+class SuggestTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        now = timezone.now()
+        for i, (title, status) in enumerate(
+            (
+                ("Using Django signals", "published"),
+                ("Why I still like Django", "published"),
+                ("Django draft", "draft"),
+                ("Gardening", "published"),
+            )
+        ):
+            entry = Entry.objects.create(
+                title=title,
+                slug=f"post-{i}",
+                summary="S",
+                body="B",
+                status=status,
+                created=now - timedelta(days=i),
+            )
+            entry.tags.add("django-orm" if i == 1 else "gardening")
+        cls.blogmark = Blogmark.objects.create(
+            title="Django 5.2 released",
+            slug="django-52",
+            url="https://example.com/",
+            commentary="C",
+            status="published",
+            created=now - timedelta(days=5),
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def get(self, q):
+        response = self.client.get(reverse("blog:search_suggest"), {"q": q})
+        self.assertEqual(response["Content-Type"], "application/json")
+        self.assertIn("max-age=60", response["Cache-Control"])
+        return response.json()["results"]
+
+    def test_tags_then_prefix_titles_then_newest(self):
+        results = self.get("  DJANGO ")
+        self.assertEqual(
+            [(r["kind"], r["title"]) for r in results],
+            [
+                ("tag", "django-orm"),
+                ("blogmark", "Django 5.2 released"),
+                ("entry", "Using Django signals"),
+                ("entry", "Why I still like Django"),
+            ],
+        )
+        self.assertEqual(results[0]["url"], reverse("blog:tag", args=["django-orm"]))
+        self.assertEqual(results[1]["url"], self.blogmark.get_absolute_url())
+
+    def test_drafts_short_queries_and_limit(self):
+        self.assertEqual(self.get("draft"), [])
+        self.assertEqual(self.get("d"), [])
+        self.assertEqual(self.get(""), [])
+        with self.settings(SEARCH_SUGGEST_LIMIT=2):
+            self.assertEqual(
+                [r["title"] for r in self.get("django")],
+                ["django-orm", "Django 5.2 released"],
+            )
+
+    @override_settings(
+        CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
+    )
+    def test_cached_per_normalized_query(self):
+        first = suggestions("Gardening")
+        with self.assertNumQueries(0):
+            self.assertEqual(suggestions("  gardening"), first)
+
+    @skipUnless(connection.vendor == "postgresql", "pg_trgm indexes")
+    def test_title_lookup_uses_trigram_index(self):
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'")
+            if cursor.fetchone() is None:
+                self.skipTest("pg_trgm is not installed")
+            cursor.execute("SET LOCAL enable_seqscan = off")
+        plan = Entry.objects.filter(title__icontains="jang").explain()
+        self.assertIn("blog_entry_title_trgm_idx", plan)
+
+
+class StaticIndexTests(TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.root = directory.name
+        storages = override_settings(
+            STORAGES={
+                "default": {
+                    "BACKEND": "django.core.files.storage.FileSystemStorage",
+                    "OPTIONS": {"location": self.root},
+                },
+                "staticfiles": {
+                    "BACKEND": "django.contrib.staticfiles.storage.StaticFilesStorage"
+                },
+            },
+            SEARCH_INDEX_SHARDS=8,
+        )
+        storages.enable()
+        self.addCleanup(storages.disable)
+        self.entry = Entry.objects.create(
+            title="Postgres indexing",
+            slug="postgres-indexing",
+            summary="Notes.",
+            body="Covering indexes and the planner.",
+            status="published",
+        )
+        self.entry.tags.add("databases")
+        self.other = Entry.objects.create(
+            title="Weekly notes",
+            slug="weekly-notes",
+            summary="Odds and ends.",
+            body="An aside about postgres.",
+            status="published",
+        )
+        Entry.objects.create(
+            title="Draft postgres", slug="draft", summary="S", body="B"
+        )
+        self.blogmark = Blogmark.objects.create(
+            title="Planner talk",
+            slug="planner-talk",
+            url="https://example.com/",
+            commentary="About the postgres planner.",
+            status="published",
+        )
+
+    def read(self, name):
+        with open(os.path.join(self.root, "search-index", name)) as handle:
+            return json.load(handle)
+
+    def files(self):
+        return set(os.listdir(os.path.join(self.root, "search-index")))
+
+    def lookup(self, word):
+        """What the browser does for one word: [(title, score)], best first."""
+        manifest = self.read("manifest.json")
+        shards = manifest["shards"]
+        terms = self.read(manifest["terms"][static_index.shard_of(word, shards)])
+        found = []
+        for key, score in terms.get(word, []):
+            docs = self.read(manifest["docs"][static_index.shard_of(key, shards)])
+            found.append((docs[key]["title"], score))
+        return found
+
+    def test_builds_sharded_index_of_published_content(self):
+        result = static_index.build()
+        self.assertEqual((result.documents, result.reindexed), (3, 3))
+        manifest = self.read("manifest.json")
+        self.assertEqual(len(manifest["terms"]), 8)
+        self.assertEqual(
+            self.files(), {"manifest.json", *manifest["terms"], *manifest["docs"]}
+        )
+        self.assertEqual(
+            self.lookup("postgres"),
+            [("Postgres indexing", 10), ("Planner talk", 4), ("Weekly notes", 2)],
+        )
+        self.assertEqual(self.lookup("databases"), [("Postgres indexing", 10)])
+        self.assertEqual(self.lookup("the"), [])
+        doc = self.read(
+            manifest["docs"][static_index.shard_of(f"b{self.blogmark.pk}", 8)]
+        )[f"b{self.blogmark.pk}"]
+        self.assertEqual(doc["url"], self.blogmark.get_absolute_url())
+        self.assertEqual(
+            doc["date"], timezone.localdate(self.blogmark.created).isoformat()
+        )
+        self.assertEqual(doc["kind"], "blogmark")
+
+    def test_incremental_build_rewrites_only_touched_shards(self):
+        static_index.build()
+        before = self.read("manifest.json")
+        self.assertEqual(static_index.build().written, 0)
+
+        self.other.title = "Weekly zeppelin notes"
+        self.other.save()
+        result = static_index.build()
+        self.assertEqual((result.reindexed, result.removed), (1, 0))
+        after = self.read("manifest.json")
+        changed = {
+            name
+            for name in after["terms"] + after["docs"]
+            if name not in before["terms"] + before["docs"]
+        }
+        # The entry's doc shard, the shard holding "zeppelin" and the manifest;
+        # the shards of "weekly" and "notes" serialize as before.
+        self.assertEqual(len(changed), 2)
+        self.assertEqual(result.written, 3)
+        self.assertEqual(
+            self.files(), {"manifest.json", *after["terms"], *after["docs"]}
+        )
+        self.assertEqual(self.lookup("zeppelin"), [("Weekly zeppelin notes", 10)])
+
+        self.other.status = "draft"
+        self.other.save()
+        self.assertEqual(static_index.build().removed, 1)
+        self.assertEqual(self.lookup("zeppelin"), [])
+        self.assertNotIn("Weekly zeppelin notes", dict(self.lookup("postgres")))
+
+    @override_settings(SEARCH_INDEX_ENABLED=True)
+    def test_updated_on_publish_and_tag_change(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.entry.tags.add("sql")
+        self.assertEqual(self.lookup("sql"), [("Postgres indexing", 10)])
+        with self.captureOnCommitCallbacks(execute=True):
+            Entry.objects.create(
+                title="Sourdough",
+                slug="bread",
+                summary="S",
+                body="B",
+                status="published",
+            )
+        self.assertEqual(self.lookup("sourdough"), [("Sourdough", 10)])
+        response = self.client.get(reverse("blog:index"))
+        self.assertContains(response, 'data-index="/media/search-index/manifest.json"')
+        self.assertContains(response, "js/search-index.js")
+
+    def test_disabled_by_default(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.entry.tags.add("sql")
+        self.assertFalse(os.path.exists(os.path.join(self.root, "search-index")))
+        self.assertNotContains(self.client.get(reverse("blog:index")), "data-index")
+
+    @override_settings(SEARCH_INDEX_ENABLED=True)
+    def test_one_build_per_transaction_and_none_for_drafts(self):
+        with mock.patch.object(static_index, "build") as build:
+            with self.captureOnCommitCallbacks(execute=True):
+                self.entry.title = "Postgres indexes"
+                self.entry.save()
+                self.entry.tags.add("sql")
+                self.other.tags.add("sql")
+            self.assertEqual(build.call_count, 1)
+            self.assertCountEqual(
+                build.call_args.kwargs["changed"], [self.entry, self.other]
+            )
+
+            build.reset_mock()
+            draft = Entry.objects.get(slug="draft")
+            with self.captureOnCommitCallbacks(execute=True):
+                draft.title = "Draft mysql"
+                draft.save()
+                draft.tags.add("sql")
+            with self.captureOnCommitCallbacks(execute=True):
+                draft.delete()
+            build.assert_not_called()
+
+            with self.captureOnCommitCallbacks(execute=True):
+                self.other.status = "draft"
+                self.other.save()
+            build.assert_called_once()
+
+    @override_settings(
+        CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
+    )
+    def test_build_leaves_its_changes_to_the_one_running(self):
+        cache.add(static_index.LOCK, True)
+        with self.assertNumQueries(0):
+            self.assertIsNone(static_index.build(changed=[self.other]))
+        self.assertFalse(os.path.exists(os.path.join(self.root, "search-index")))
+
+        # The running build finishes, then builds again for the skipped one.
+        cache.delete(static_index.LOCK)
+        with mock.patch.object(
+            static_index, "_build", wraps=static_index._build
+        ) as build:
+            static_index.build()
+        self.assertEqual(
+            [call.args for call in build.call_args_list],
+            [(set(), False), ({f"e{self.other.pk}"}, False)],
+        )
+        self.assertIn("manifest.json", self.files())
+        self.assertIsNone(cache.get(static_index.LOCK))
+        self.assertIsNone(cache.get(static_index.AGAIN))
+
+    def test_tokenizer_and_shards_match_the_client(self):
+        # Values from static/js/search-index.js's shardOf() and WORD.
+        self.assertEqual(
+            [static_index.shard_of(k, 32) for k in ("django", "café", "e12", "日本語")],
+            [30, 9, 3, 7],
+        )
+        self.assertEqual(
+            static_index.tokenize("Ünïcode_x the y2k ÉTÉ"), ["ünïcode", "y2k", "été"]
+        )
+
+
+@override_settings(
+    CACHES={
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+            "LOCATION": "generation-tests",
+        }
+    }
+)
+class GenerationTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+
+        def entry(title, created, **kwargs):
+            return Entry.objects.create(
+                title=title,
+                slug=title.lower().replace(" ", "-"),
+                summary="S",
+                body="B",
+                status="published",
+                created=created,
+                **kwargs,
+            )
+
+        self.old = entry("Old post", datetime(2023, 5, 1, tzinfo=dt_timezone.utc))
+        self.new = entry("New post", datetime(2024, 5, 1, tzinfo=dt_timezone.utc))
+        self.new.tags.add("python")
+
+    def rename_quietly(self, obj, title):
+        """Change the row without signals, as a stale cache would see it."""
+        type(obj).objects.filter(pk=obj.pk).update(title=title)
+
+    def test_counters(self):
+        first = generations.get("entry:1")
+        self.assertEqual(generations.get("entry:1"), first)
+        generations.bump("entry:1")
+        self.assertEqual(generations.get("entry:1"), first + 1)
+        self.assertEqual(generations.get_many(["entry:1"]), {"entry:1": first + 1})
+        # A lost counter restarts from the clock, past any value keys carry.
+        cache.delete(f"{generations.PREFIX}entry:1")
+        self.assertGreater(generations.get("entry:1"), first + 1)
+
+    def test_entry_body_fragment(self):
+        url = self.new.get_absolute_url()
+        self.assertContains(self.client.get(url), "<h1>New post</h1>")
+        self.rename_quietly(self.new, "Quiet")
+        self.assertContains(self.client.get(url), "<h1>New post</h1>")
+        self.new.refresh_from_db()
+        self.new.title = "Edited"
+        self.new.save()
+        self.assertContains(self.client.get(url), "<h1>Edited</h1>")
+        # Renaming a tag reaches the pages listing it.
+        tag = self.new.tags.get()
+        tag.name = "Python 3"
+        tag.save()
+        self.assertContains(self.client.get(url), "Python 3</a>")
+
+    def test_archive_invalidates_one_year(self):
+        SiteSettings.get_settings()  # created once; its save bumps "site"
+        self.client.get("/archive/")
+        with CaptureQueriesContext(connection) as cold:
+            self.client.get("/archive/")
+        self.rename_quietly(self.old, "Old quiet")
+        self.new.title = "New edit"
+        self.new.save()
+        with CaptureQueriesContext(connection) as warm:
+            response = self.client.get("/archive/")
+        self.assertContains(response, "New edit")
+        self.assertContains(response, "Old post")  # 2023 was not bumped
+        # Re-rendering 2024 reads its entries and blogmarks.
+        self.assertEqual(len(warm), len(cold) + 2)
+
+    def test_timelines_follow_tags_and_saves(self):
+        self.assertContains(self.client.get("/tag/python/"), "New post")
+        self.old.tags.add("python")
+        self.assertContains(self.client.get("/tag/python/"), "Old post")
+        self.assertContains(self.client.get("/2023/"), "Old post")
+        self.rename_quietly(self.old, "Old quiet")
+        self.assertContains(self.client.get("/2023/"), "Old post")
+        self.old.refresh_from_db()
+        self.old.created = datetime(2024, 6, 1, tzinfo=dt_timezone.utc)
+        self.old.save()
+        self.assertNotContains(self.client.get("/2023/"), "Old quiet")
+        self.assertContains(self.client.get("/2024/jun/"), "Old quiet")
+
+    def test_site_settings(self):
+        site = SiteSettings.get_settings()
+        self.client.get("/")
+        site.site_title = "Renamed blog"
+        site.save()
+        response = self.client.get("/")
+        self.assertEqual(response.context["site_name"], "Renamed blog")
+        self.assertContains(response, "Renamed blog. Built with Django.")
+
+    def test_scheduled_content_shows_up_once_live(self):
+        scheduled = Entry.objects.create(
+            title="Scheduled",
+            slug="scheduled",
+            summary="S",
+            body="B",
+            status="published",
+            created=datetime(2024, 7, 1, tzinfo=dt_timezone.utc),
+            publish_date=timezone.now() + timedelta(hours=1),
+        )
+        call_command("publish_scheduled", stdout=StringIO())
+        self.assertNotContains(self.client.get("/2024/"), "Scheduled")
+        # The clock passes publish_date, after that run, without a save.
+        Entry.objects.filter(pk=scheduled.pk).update(published_at=timezone.now())
+        self.assertNotContains(self.client.get("/2024/"), "Scheduled")
+        call_command("publish_scheduled", stdout=StringIO())
+        self.assertContains(self.client.get("/2024/"), "Scheduled")
+
+    def test_render_content_bumps(self):
+        url = self.new.get_absolute_url()
+        self.client.get(url)
+        Entry.objects.filter(pk=self.new.pk).update(body="Fresh *words*")
+        call_command(
+            "render_content", "--type", "entry", "--jobs", "1", stdout=StringIO()
+        )
+        self.assertContains(self.client.get(url), "<em>words</em>")
+
+
+PAGE_CACHE_MIDDLEWARE = [
+    "blog.page_cache.UpdateCacheMiddleware",
+    "django.contrib.sessions.middleware.SessionMiddleware",
+    "django.middleware.common.CommonMiddleware",
+    "blog.page_cache.FetchFromCacheMiddleware",
+    "django.contrib.auth.middleware.AuthenticationMiddleware",
+    "django.contrib.messages.middleware.MessageMiddleware",
+    "minimalwave-blog.middleware.CacheControlMiddleware",
+]
+
+
+@override_settings(
+    CACHES={
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+            "LOCATION": "page-cache-tests",
+        }
+    },
+    MIDDLEWARE=PAGE_CACHE_MIDDLEWARE,
+    CACHE_MIDDLEWARE_SECONDS=3600,
+    CACHE_MIDDLEWARE_KEY_PREFIX="test",
+)
+class PageCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        SiteSettings.get_settings()
+        self.entry = Entry.objects.create(
+            title="Cached post",
+            slug="cached-post",
+            summary="S",
+            body="B",
+            status="published",
+            created=datetime(2024, 5, 1, tzinfo=dt_timezone.utc),
+        )
+        self.entry.tags.add("python")
+        self.other = Entry.objects.create(
+            title="Other post",
+            slug="other-post",
+            summary="S",
+            body="B",
+            status="published",
+            created=datetime(2023, 5, 1, tzinfo=dt_timezone.utc),
+        )
+
+    def assertCached(self, path, **headers):
+        with self.assertNumQueries(0):
+            return self.client.get(path, headers=headers)
+
+    def test_pages_are_cached_past_max_age(self):
+        url = self.entry.get_absolute_url()
+        self.client.get(url)
+        response = self.assertCached(url)
+        self.assertContains(response, "Cached post")
+        self.assertNotIn("Age", response)
+
+    def test_save_purges_dependent_pages_only(self):
+        paths = [
+            self.entry.get_absolute_url(),
+            "/posts/",
+            "/2024/",
+            "/2024/may/",
+            "/tag/python/",
+            "/feed/",
+        ]
+        untouched = [self.other.get_absolute_url(), "/2023/"]
+        for path in paths + untouched:
+            self.client.get(path)
+            self.client.get(path, headers={"user-agent": "Mobile"})
+        self.entry.title = "Edited post"
+        self.entry.save()
+        for path in paths:
+            for headers in ({}, {"user-agent": "Mobile"}):
+                response = self.client.get(path, headers=headers)
+                self.assertContains(response, "Edited post", msg_prefix=path)
+        for path in untouched:
+            self.assertCached(path)
+
+    def test_moving_a_post_purges_its_old_pages(self):
+        old_url = self.entry.get_absolute_url()
+        for path in (old_url, "/2024/", "/tag/python/"):
+            self.client.get(path)
+        self.entry.created = datetime(2023, 6, 1, tzinfo=dt_timezone.utc)
+        self.entry.save()
+        self.entry.tags.remove("python")
+        self.assertEqual(self.client.get(old_url).status_code, 404)
+        self.assertNotContains(self.client.get("/2024/"), "Cached post")
+        self.assertNotContains(self.client.get("/tag/python/"), "Cached post")
+
+    def test_site_wide_changes_purge_everything(self):
+        url = self.other.get_absolute_url()
+        self.client.get(url)
+        Entry.objects.filter(pk=self.other.pk).update(title="Quietly edited")
+        tag = self.entry.tags.get()
+        tag.name = "Python 3"
+        tag.save()
+        self.assertContains(self.client.get(url), "Quietly edited")
+        site = SiteSettings.get_settings()
+        site.site_title = "Renamed blog"
+        site.save()
+        self.assertContains(self.client.get(url), "Renamed blog")
+
+    def test_stale_pages_are_served_while_they_refresh(self):
+        url = self.other.get_absolute_url()
+        self.client.get(url)
+        Entry.objects.filter(pk=self.other.pk).update(title="Quietly edited")
+        past_soft_expiry = time.time() + 3601
+        with (
+            mock.patch("blog.page_cache.time.time", return_value=past_soft_expiry),
+            mock.patch(
+                "blog.page_cache._in_background",
+                side_effect=lambda function, *args: function(*args),
+            ) as background,
+        ):
+            response = self.client.get(url)
+            self.assertContains(response, "Other post")
+            self.assertIn("stale-while-revalidate", response["Cache-Control"])
+            # The refresh stored the new render.
+            self.assertContains(self.assertCached(url), "Quietly edited")
+        background.assert_called_once()
+
+    def test_refresh_renders_as_an_anonymous_visitor(self):
+        url = self.other.get_absolute_url()
+        self.client.get(url, headers={"user-agent": "Mobile"})
+        self.client.cookies["sessionid"] = "visitor-session"
+        with (
+            mock.patch("blog.page_cache.time.time", return_value=time.time() + 3601),
+            mock.patch("blog.page_cache._in_background") as background,
+        ):
+            self.client.get(
+                url, headers={"authorization": "Basic eA==", "user-agent": "Mobile"}
+            )
+        function, environ, lock = background.call_args.args
+        self.assertNotIn("HTTP_COOKIE", environ)
+        self.assertNotIn("HTTP_AUTHORIZATION", environ)
+        self.assertEqual(environ["HTTP_USER_AGENT"], "Mobile")  # in Vary
+        self.assertEqual(environ["PATH_INFO"], url)
+
+        rendered = []
+
+        def request_for(environ):
+            rendered.append(WSGIRequest(environ))
+            return rendered[-1]
+
+        Entry.objects.filter(pk=self.other.pk).update(title="Quietly edited")
+        with mock.patch("blog.page_cache.WSGIRequest", side_effect=request_for):
+            function(environ, lock)
+        self.assertEqual(rendered[0].COOKIES, {})
+        # Stored as the variant it was for.
+        self.assertContains(
+            self.assertCached(url, user_agent="Mobile"), "Quietly edited"
+        )
+
+    def test_search_is_not_cached_whole(self):
+        with mock.patch("blog.views.suggestions", side_effect=[["a"], ["b"]]):
+            first = self.client.get(reverse("blog:search_suggest"), {"q": "py"})
+            second = self.client.get(reverse("blog:search_suggest"), {"q": "py"})
+        self.assertEqual(second.json(), {"results": ["b"]})
+        # The view's max-age, not the site-wide one.
+        self.assertEqual(first["Cache-Control"], "public, max-age=60")
+        self.client.get(reverse("blog:search"), {"q": "post"})
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(reverse("blog:search"), {"q": "post"})
+        self.assertTrue(queries)  # rendered again
+
+    def test_purge_command(self):
+        url = self.other.get_absolute_url()
+        self.client.get(url)
+        self.client.get("/posts/")
+        call_command("purge_page_cache", url, stdout=StringIO())
+        Entry.objects.filter(pk=self.other.pk).update(title="Quietly edited")
+        self.assertContains(self.client.get(url), "Quietly edited")
+        self.assertCached("/posts/")
+        call_command("purge_page_cache", "--all", stdout=StringIO())
+        self.assertContains(self.client.get("/posts/"), "Quietly edited")
+        with self.assertRaises(CommandError):
+            call_command("purge_page_cache", stdout=StringIO())
+
+
+class WordCountTests(TestCase):
+    def setUp(self):
+        self.entry = Entry.objects.create(
+            title="Counted",
+            slug="counted",
+            summary="Summary.",
+            body="word " * 450 + "<span>tagged</span>",
+            status="published",
+        )
+
+    def test_save_stores_word_count_and_reading_time(self):
+        self.assertEqual(self.entry.word_count, 451)
+        self.assertEqual(self.entry.reading_time, 3)
+
+        self.entry.body = "Just four words here."
+        self.entry.save(update_fields=["body"])
+        self.entry.refresh_from_db()
+        self.assertEqual((self.entry.word_count, self.entry.reading_time), (4, 1))
+
+    def test_backfill_command_fixes_stale_rows(self):
+        Entry.objects.update(word_count=0, reading_time=0)
+        out = StringIO()
+        call_command("backfill_word_counts", "--dry-run", stdout=out)
+        self.assertIn("Would update 1 of 1", out.getvalue())
+        self.assertEqual(Entry.objects.get().word_count, 0)
+
+        call_command("backfill_word_counts", stdout=StringIO())
+        self.entry.refresh_from_db()
+        self.assertEqual((self.entry.word_count, self.entry.reading_time), (451, 3))
+
+    def test_structured_data_counts_words_without_tags(self):
+        # wordCount is the stored count, which ignores HTML tags, rather than
+        # the wordcount filter over raw source, which counted "<br>" as a word.
+        self.entry.body = "Some <em>emphasis</em> here <br> and more."
+        self.entry.save()
+        response = self.client.get(self.entry.get_absolute_url())
+        article = json.loads(
+            response.content.decode()
+            .split('<script type="application/ld+json">')[1]
+            .split("</script>")[0]
+        )
+        self.assertEqual(article["wordCount"], "5")
+        self.assertEqual(article["timeRequired"], "PT1M")
+
+    def test_list_views_read_stored_counts_without_loading_body(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse("blog:posts"))
+        self.assertContains(response, "3 min read")
+        self.assertContains(response, "Summary.")
+        entry_selects = [
+            q["sql"] for q in queries.captured_queries if '"blog_entry"' in q["sql"]
+        ]
+        self.assertTrue(entry_selects)
+        for sql in entry_selects:
+            self.assertNotIn('"blog_entry"."body"', sql)
+
+    def test_edited_summary_renders_live_with_body_deferred(self):
+        entry = Entry.objects.defer(*Entry.LIST_DEFERRED).get()
+        self.assertEqual(str(entry.summary_rendered), "<p>Summary.</p>")
+        entry.summary = "Edited."
+        self.assertEqual(str(entry.summary_rendered), "<p>Edited.</p>")
+        self.assertIn("body", entry.get_deferred_fields())
+
+
+class PublishedQuerySetTests(TestCase):
+    def setUp(self):
+        now = timezone.now()
+        self.live = Entry.objects.create(
+            title="Live",
+            slug="live",
+            summary="S",
+            body="B",
+            status="published",
+            created=now - timedelta(days=1),
+        )
+        self.scheduled = Entry.objects.create(
+            title="Scheduled",
+            slug="scheduled",
+            summary="S",
+            body="B",
+            status="published",
+            publish_date=now + timedelta(days=1),
+        )
+        self.draft = Entry.objects.create(
+            title="Draft", slug="draft", summary="S", body="B", status="draft"
+        )
+        for entry in (self.live, self.scheduled, self.draft):
+            entry.tags.add("shared")
+
+    def test_published_scope(self):
+        self.assertEqual(list(Entry.objects.published()), [self.live])
+        self.scheduled.publish_date = timezone.now() - timedelta(minutes=1)
+        self.scheduled.save(update_fields=["publish_date"])
+        self.scheduled.refresh_from_db()
+        self.assertEqual(self.scheduled.published_at, self.scheduled.publish_date)
+        # Published a minute ago, so it now leads the listings.
+        self.assertEqual(Entry.objects.published().count(), 2)
+        self.assertEqual(
+            list(Entry.objects.published().order_by("-published_at")),
+            [self.scheduled, self.live],
+        )
+
+    def test_save_loads_the_stored_row_once(self):
+        self.live.title = "Live, edited"
+        with CaptureQueriesContext(connection) as queries:
+            self.live.save()
+        quote = connection.ops.quote_name
+        by_pk = f"WHERE {quote('blog_entry')}.{quote('id')} = "
+        loads = [
+            q["sql"]
+            for q in queries
+            if q["sql"].startswith("SELECT") and by_pk in q["sql"]
+        ]
+        self.assertEqual(len(loads), 1, loads)
+
+    def test_publish_scheduled_moves_published_at(self):
+        self.draft.publish_date = timezone.now() - timedelta(minutes=1)
+        self.draft.save()
+        self.assertEqual(self.draft.published_at, self.draft.publish_date)
+        call_command("publish_scheduled", stdout=StringIO())
+        self.assertIn(self.draft, Entry.objects.published())
+        self.draft.publish_date = None
+        self.draft.save()
+        self.draft.refresh_from_db()
+        self.assertEqual(self.draft.published_at, self.draft.created)
+
+    @override_settings(
+        CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
+    )
+    def test_publish_scheduled_refreshes_only_what_went_live(self):
+        call_command("publish_scheduled", stdout=StringIO())
+        with (
+            mock.patch.object(TagCount, "refresh") as tag_counts,
+            mock.patch.object(RelatedContent, "refresh") as related,
+        ):
+            call_command("publish_scheduled", stdout=StringIO())
+            tag_counts.assert_not_called()
+            related.assert_not_called()
+
+            # The clock passes publish_date without a save.
+            Entry.objects.filter(pk=self.scheduled.pk).update(
+                published_at=timezone.now()
+            )
+            call_command("publish_scheduled", stdout=StringIO())
+        tag = self.scheduled.tags.get()
+        tag_counts.assert_called_once_with(Entry, {tag.pk})
+        related.assert_called_once_with(
+            RelatedContent.affected_by(self.scheduled, [tag.pk])
+        )
+
+    def test_feed_dates_scheduled_entries_from_going_live(self):
+        self.scheduled.publish_date = timezone.now() - timedelta(minutes=1)
+        self.scheduled.save()
+        feed = ElementTree.fromstring(self.client.get(reverse("blog:feed")).content)
+        atom = "{http://www.w3.org/2005/Atom}"
+        first = feed.find(f"{atom}entry")
+        self.assertEqual(first.findtext(f"{atom}title"), "Scheduled")
+        went_live = self.scheduled.publish_date
+        published = first.findtext(f"{atom}published")
+        self.assertEqual(datetime.fromisoformat(published), went_live)
+        # The feed's <updated> is its latest item's date.
+        updated = feed.findtext(f"{atom}updated")
+        self.assertEqual(datetime.fromisoformat(updated), went_live)
+
+    def test_feed_sitemap_and_related_hide_unpublished(self):
+        feed = self.client.get(reverse("blog:feed")).content.decode()
+        self.assertIn("Live", feed)
+        self.assertNotIn("Scheduled", feed)
+        self.assertEqual(list(EntrySitemap().items()), [self.live])
+        other = Entry.objects.create(
+            title="Other", slug="other", summary="S", body="B", status="published"
+        )
+        other.tags.add("shared")
+        self.assertEqual(
+            [r.get_absolute_url() for r in get_related_entries(other)],
+            [self.live.get_absolute_url()],
+        )
+
+
+class KeysetPaginationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        start = timezone.now().replace(month=6, day=15) - timedelta(days=365)
+        for i in range(23):
+            Entry.objects.create(
+                title=f"Post {i}",
+                slug=f"post-{i}",
+                summary="S",
+                body="B",
+                status="published",
+                # Pairs share a timestamp, so the id tie-breaker matters.
+                created=start - timedelta(hours=i // 2),
+            )
+        cls.expected = list(Entry.objects.order_by("-created", "-id"))
+        cls.year = start.year
+
+    def page(self, cursor=None, **kwargs):
+        """A page of the year listing, as the year view pages it."""
+        params = {"cursor": cursor} if cursor else {}
+        request = RequestFactory().get("/", params)
+        page = timeline_page(
+            request,
+            Q(**created_within(year_range(self.year))),
+            kinds=("entry",),
+            per_page=5,
+            order="created",
+            **kwargs,
+        )
+        return page, [item.id for item in page]
+
+    def test_walks_forward_and_back(self):
+        pages = [self.page(count="all")]
+        self.assertFalse(pages[0][0].has_previous())
+        self.assertEqual(pages[0][0].total, 23)
+        while pages[-1][0].has_next():
+            pages.append(self.page(pages[-1][0].next_cursor))
+        self.assertEqual([len(ids) for _, ids in pages], [5, 5, 5, 5, 3])
+        self.assertEqual(
+            [pk for _, ids in pages for pk in ids], [e.id for e in self.expected]
+        )
+
+        back, ids = self.page(pages[2][0].previous_cursor)
+        self.assertEqual(ids, pages[1][1])
+        self.assertTrue(back.has_next() and back.has_previous())
+        first, ids = self.page(pages[1][0].previous_cursor)
+        self.assertEqual(ids, pages[0][1])
+        self.assertFalse(first.has_previous())
+
+    def test_bad_cursor_gives_first_page(self):
+        first = [e.id for e in self.expected[:5]]
+        for cursor in ("garbage", "WyJuIl0", "WyJ4IiwxLDJd", "WyJuIiwieCIsMV0"):
+            self.assertEqual(self.page(cursor)[1], first)
+
+    def test_year_view_links_by_cursor(self):
+        url = reverse("blog:year", args=[self.year])
+        response = self.client.get(url)
+        page = response.context["page_obj"]
+        self.assertContains(response, f'href="?cursor={page.next_cursor}"')
+        self.assertContains(response, "23 items")
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, {"cursor": page.next_cursor})
+        self.assertEqual(
+            [item.id for item in response.context["items"]],
+            [entry.id for entry in self.expected[10:20]],
+        )
+        sql = " ".join(q["sql"] for q in queries.captured_queries)
+        self.assertNotIn("OFFSET", sql)
+
+
+class TimelineTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        start = timezone.now() - timedelta(days=1)
+        cls.rows = []
+        for i in range(12):
+            created = start - timedelta(hours=i // 2)
+            if i % 2:
+                obj = Blogmark.objects.create(
+                    title=f"Link {i}",
+                    slug=f"link-{i}",
+                    url=f"https://example.com/{i}",
+                    commentary="C",
+                    status="published",
+                    created=created,
+                )
+                kind = "blogmark"
+            else:
+                obj = Entry.objects.create(
+                    title=f"Post {i}",
+                    slug=f"post-{i}",
+                    summary="S",
+                    body="B",
+                    status="published",
+                    created=created,
+                )
+                kind = "entry"
+            obj.tags.add("even" if i % 4 < 2 else "odd")
+            cls.rows.append((obj.published_at, kind, obj.id))
+        Entry.objects.create(
+            title="Draft", slug="draft", summary="S", body="B", status="draft"
+        )
+        cls.rows.sort(reverse=True)
+        cls.expected = [(kind, pk) for _, kind, pk in cls.rows]
+
+    def page(self, cursor=None, **kwargs):
+        params = {"cursor": cursor} if cursor else {}
+        request = RequestFactory().get("/", params)
+        return timeline_page(request, per_page=5, **kwargs)
+
+    @staticmethod
+    def keys(page):
+        return [(item.kind, item.id) for item in page]
+
+    def test_merges_kinds_newest_first_and_walks_back(self):
+        pages = [self.page(count="all")]
+        self.assertEqual(pages[0].total, 12)
+        while pages[-1].has_next():
+            pages.append(self.page(pages[-1].next_cursor))
+        self.assertEqual([len(p) for p in pages], [5, 5, 2])
+        self.assertEqual([key for p in pages for key in self.keys(p)], self.expected)
+
+        back = self.page(pages[2].previous_cursor)
+        self.assertEqual(self.keys(back), self.keys(pages[1]))
+        first = self.page(pages[1].previous_cursor)
+        self.assertEqual(self.keys(first), self.keys(pages[0]))
+        self.assertFalse(first.has_previous())
+
+    @override_settings(
+        CACHES={
+            "default": {
+                "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+                "LOCATION": "timeline-count-tests",
+            }
+        }
+    )
+    def test_total_is_cached_across_requests(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.page(count="all")
+        # published() puts the current time into the SQL; the count is
+        # keyed on the listing's name, so the next request still hits.
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.page(count="all").total, 12)
+        sql = " ".join(q["sql"] for q in queries.captured_queries)
+        self.assertNotIn("COUNT(", sql.upper())
+
+    def test_page_is_one_union_query_plus_tags(self):
+        page = self.page()
+        cursor = page.next_cursor
+        with CaptureQueriesContext(connection) as queries:
+            page = self.page(cursor)
+        selects = [q["sql"] for q in queries.captured_queries]
+        self.assertEqual(len(selects), 2, selects)
+        self.assertIn("UNION ALL", selects[0])
+        self.assertNotIn("OFFSET", selects[0])
+        for item in page:
+            self.assertEqual(len(item.tags), 1)
+
+    def test_filter_applies_to_every_kind(self):
+        page = timeline_page(
+            RequestFactory().get("/"), Q(tags__slug="odd"), per_page=20
+        )
+        self.assertEqual(
+            self.keys(page), [key for i, key in enumerate(self.expected) if i % 4 >= 2]
+        )
+        self.assertEqual({item.kind for item in page}, {"entry", "blogmark"})
+
+    def test_tag_view_renders_both_kinds(self):
+        response = self.client.get(reverse("blog:tag", args=["even"]))
+        self.assertContains(response, "Post 0")
+        self.assertContains(response, "Link 1")
+        self.assertContains(response, 'href="https://example.com/1"')
+        self.assertNotContains(response, "Post 2")
+
+
+class TagCountTests(TestCase):
+    def setUp(self):
+        self.entry = Entry.objects.create(
+            title="Tagged", slug="tagged", summary="S", body="B", status="published"
+        )
+        self.entry.tags.add("python", "django")
+        self.blogmark = Blogmark.objects.create(
+            title="Link",
+            slug="link",
+            url="https://example.com/",
+            commentary="C",
+            status="published",
+        )
+        self.blogmark.tags.add("python")
+
+    def cloud(self):
+        return {tag.name: tag.count for tag in TagCount.cloud()}
+
+    def test_counts_follow_tag_changes(self):
+        self.assertEqual(self.cloud(), {"python": 2, "django": 1})
+        self.entry.tags.remove("django")
+        self.blogmark.tags.add("links")
+        self.assertEqual(self.cloud(), {"python": 2, "links": 1})
+        self.blogmark.tags.clear()
+        self.assertEqual(self.cloud(), {"python": 1})
+
+    def test_counts_follow_status_and_deletes(self):
+        self.entry.status = "draft"
+        self.entry.save()
+        self.assertEqual(self.cloud(), {"python": 1})
+        # Tagging a draft leaves the counts alone.
+        self.entry.tags.add("rust")
+        self.assertEqual(self.cloud(), {"python": 1})
+        self.entry.status = "published"
+        self.entry.save()
+        self.assertEqual(self.cloud(), {"python": 2, "django": 1, "rust": 1})
+        self.blogmark.delete()
+        self.assertEqual(self.cloud(), {"python": 1, "django": 1, "rust": 1})
+
+    def test_scheduled_content_counted_once_live(self):
+        self.entry.publish_date = timezone.now() + timedelta(hours=1)
+        self.entry.save()
+        self.assertEqual(self.cloud(), {"python": 1})
+        # The clock passes publish_date without a save; publish_scheduled's
+        # rebuild picks it up.
+        Entry.objects.update(published_at=timezone.now() - timedelta(minutes=1))
+        call_command("publish_scheduled", stdout=StringIO())
+        self.assertEqual(self.cloud(), {"python": 2, "django": 1})
+
+    def test_rebuild_command_repairs_drift(self):
+        TagCount.objects.update(count=99)
+        TagCount.objects.filter(tag__name="django").delete()
+        out = StringIO()
+        call_command("rebuild_tag_counts", stdout=out)
+        self.assertIn("Rebuilt 3 tag counts", out.getvalue())
+        self.assertEqual(self.cloud(), {"python": 2, "django": 1})
+
+    def test_posts_reads_cloud_in_one_query(self):
+        for i in range(5):
+            entry = Entry.objects.create(
+                title=f"More {i}",
+                slug=f"more-{i}",
+                summary="S",
+                body="B",
+                status="published",
+            )
+            entry.tags.add("python")
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse("blog:posts"))
+        self.assertContains(response, "python 7")
+        self.assertContains(response, "django 1")
+        self.assertEqual(
+            sum('"blog_tagcount"' in q["sql"] for q in queries.captured_queries), 1
+        )
+        # Only the displayed page of entries is loaded, not all of them.
+        self.assertEqual(
+            sum(
+                q["sql"].startswith('SELECT "blog_entry"."id"')
+                for q in queries.captured_queries
+            ),
+            1,
+        )
+
+
+class RelatedContentTests(TestCase):
+    def setUp(self):
+        # No similarity index: related items come from shared tags alone.
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        index_dir = override_settings(SIMILARITY_INDEX_DIR=directory.name)
+        index_dir.enable()
+        self.addCleanup(index_dir.disable)
+        now = timezone.now()
+
+        def entry(title, tags, days, status="published"):
+            obj = Entry.objects.create(
+                title=title,
+                slug=title.lower().replace(" ", "-"),
+                summary="S",
+                body="B",
+                status=status,
+                created=now - timedelta(days=days),
+            )
+            obj.tags.add(*tags)
+            return obj
+
+        self.source = entry("Source", ["python", "postgres", "fts"], 0)
+        self.rare = entry("Rare", ["fts"], 5)
+        self.common = entry("Common", ["python"], 1)
+        self.both = entry("Both", ["python", "postgres"], 9)
+        for i in range(4):
+            entry(f"Filler {i}", ["python"], 20 + i)
+        self.draft = entry("Draft", ["python", "postgres", "fts"], 2, status="draft")
+        self.blogmark = Blogmark.objects.create(
+            title="FTS link",
+            slug="fts-link",
+            url="https://example.com/",
+            commentary="C",
+            status="published",
+            created=now - timedelta(days=3),
+        )
+        self.blogmark.tags.add("fts")
+        self.project = Project.objects.create(
+            title="Search engine",
+            slug="search-engine",
+            summary="S",
+            status="published",
+            start_date=now.date(),
+        )
+        self.project.tags.add("postgres")
+
+    def titles(self, obj):
+        return [row.title for row in RelatedContent.for_object(obj)]
+
+    def test_rare_shared_tags_rank_first_across_kinds(self):
+        # fts: 3 published items, postgres: 3, python: 7. Ties go to the newest.
+        self.assertEqual(
+            self.titles(self.source),
+            ["Both", "Search engine", "FTS link", "Rare", "Common", "Filler 0"],
+        )
+        row = RelatedContent.for_object(self.source).get(title="Search engine")
+        self.assertEqual(row.get_absolute_url(), self.project.get_absolute_url())
+        self.assertEqual(self.titles(self.project), ["Source", "Both"])
+
+    def test_kept_current_incrementally(self):
+        self.rare.title = "Renamed"
+        self.rare.save()
+        self.assertIn("Renamed", self.titles(self.source))
+        self.assertIn("Renamed", self.titles(self.blogmark))
+
+        self.blogmark.status = "draft"
+        self.blogmark.save()
+        self.assertNotIn("FTS link", self.titles(self.source))
+        self.draft.status = "published"
+        self.draft.save()
+        self.assertEqual(self.titles(self.source)[0], "Draft")
+
+        self.rare.tags.remove("fts")
+        self.assertNotIn("Renamed", self.titles(self.source))
+        self.assertEqual(self.titles(self.rare), [])
+        self.both.delete()
+        self.assertNotIn("Both", self.titles(self.source))
+
+        def rows():
+            return sorted(
+                RelatedContent.objects.values_list(
+                    "source_type", "source_id", "rank", "target_id", "title"
+                )
+            )
+
+        incremental = rows()
+        call_command("rebuild_related_content", stdout=StringIO())
+        self.assertEqual(rows(), incremental)
+
+    def test_unpublish_reweighs_items_not_listing_it(self):
+        now = timezone.now()
+        for i in range(8):
+            entry = Entry.objects.create(
+                title=f"Go {i}",
+                slug=f"go-{i}",
+                summary="S",
+                body="B",
+                status="published",
+                created=now - timedelta(days=40 + i),
+            )
+            entry.tags.add("golang")
+        # The oldest of eight equals: listed by none of the others.
+        oldest = entry
+        go = Entry.objects.get(slug="go-0")
+        self.assertNotIn("Go 7", self.titles(go))
+
+        def assert_matches_rebuild():
+            def scores():
+                return sorted(RelatedContent.objects.values_list("source_id", "score"))
+
+            incremental = scores()
+            call_command("rebuild_related_content", stdout=StringIO())
+            self.assertEqual(scores(), incremental)
+
+        oldest.status = "draft"
+        oldest.save()
+        assert_matches_rebuild()
+        Entry.objects.get(slug="go-6").tags.remove("golang")
+        assert_matches_rebuild()
+        Entry.objects.get(slug="go-5").delete()
+        assert_matches_rebuild()
+
+    def test_entry_page_reads_related_in_one_query(self):
+        get_related_entries(self.source)  # warm the ContentType cache
+        with self.assertNumQueries(1):
+            related = get_related_entries(self.source)
+        self.assertEqual(
+            [r.title for r in related], ["Both", "Search engine", "FTS link"]
+        )
+        response = self.client.get(self.source.get_absolute_url())
+        self.assertContains(response, f'href="{self.blogmark.get_absolute_url()}"')
+
+    def test_untagged_entry_falls_back_to_recent(self):
+        lonely = Entry.objects.create(
+            title="Lonely", slug="lonely", summary="S", body="B", status="published"
+        )
+        self.assertEqual(
+            [r.title for r in get_related_entries(lonely)], ["Source", "Common", "Rare"]
+        )
+
+
+@skipUnless(similarity.np is not None, "needs numpy")
+class SimilarityTests(TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = os.path.join(directory.name, "similarity")
+        index_dir = override_settings(SIMILARITY_INDEX_DIR=self.directory)
+        index_dir.enable()
+        self.addCleanup(index_dir.disable)
+
+        def entry(title, body, tags=()):
+            obj = Entry.objects.create(
+                title=title,
+                slug=title.lower().replace(" ", "-"),
+                summary=title,
+                body=body,
+                status="published",
+            )
+            obj.tags.add(*tags)
+            return obj
+
+        self.vacuum = entry(
+            "Postgres vacuum tuning",
+            "Autovacuum thresholds, dead tuples and table bloat.",
+        )
+        self.bloat = entry(
+            "Table bloat in Postgres",
+            "Dead tuples pile up when autovacuum falls behind.",
+            ["postgres", "performance"],
+        )
+        self.indexes = entry(
+            "Postgres partial indexes",
+            "Smaller indexes for the rows queries touch.",
+            ["postgres"],
+        )
+        self.sourdough = entry(
+            "Sourdough starter", "Flour, water and patience.", ["baking"]
+        )
+        self.blogmark = Blogmark.objects.create(
+            title="Autovacuum explained",
+            slug="autovacuum-explained",
+            url="https://example.com/",
+            commentary="How autovacuum decides to clean dead tuples.",
+            status="published",
+        )
+        self.blogmark.tags.add("postgres")
+
+    def similar(self, obj, limit=3):
+        return [
+            model.objects.get(pk=pk).title
+            for model, pk, _ in similarity.related(obj, limit)
+        ]
+
+    def test_build_ranks_shared_rare_words_first(self):
+        self.assertIsNone(similarity.get_index())
+        self.assertEqual(similarity.build(), (5, 5))
+        self.assertTrue(os.path.exists(os.path.join(self.directory, "meta.json")))
+        self.assertEqual(len(similarity.get_index()), 5)
+        found = self.similar(self.vacuum)
+        self.assertEqual(found[0], "Table bloat in Postgres")
+        self.assertIn("Autovacuum explained", found)
+        self.assertNotIn("Sourdough starter", found)
+        self.assertNotIn("Postgres vacuum tuning", found)
+        # An unsaved draft is vectorized on the fly.
+        draft = Entry(title="Bread", summary="Sourdough flour", body="", status="draft")
+        self.assertEqual(self.similar(draft), ["Sourdough starter"])
+
+    def test_incremental_build_matches_full_build(self):
+        similarity.build()
+        self.indexes.body = "Autovacuum skips nothing: dead tuples again."
+        self.indexes.save()
+        self.sourdough.status = "draft"
+        self.sourdough.save()
+        Entry.objects.create(
+            title="Rye", slug="rye", summary="Rye flour", body="", status="published"
+        )
+        self.assertEqual(similarity.build(), (5, 2))
+        incremental = {
+            (model, pk): round(score, 5)
+            for model, pk, score in similarity.related(self.vacuum, 10)
+        }
+        self.assertIn((Entry, self.indexes.pk), incremental)
+        self.assertNotIn((Entry, self.sourdough.pk), incremental)
+        self.assertNotIn("sourdough", similarity.get_index().terms)
+
+        self.assertEqual(similarity.build(full=True), (5, 5))
+        full = {
+            (model, pk): round(score, 5)
+            for model, pk, score in similarity.related(self.vacuum, 10)
+        }
+        self.assertEqual(incremental, full)
+
+    def test_untagged_posts_get_related_by_text(self):
+        self.assertEqual(list(RelatedContent.for_object(self.vacuum)), [])
+        out = StringIO()
+        call_command("build_similarity_index", stdout=out)
+        self.assertIn("Indexed 5 documents", out.getvalue())
+        titles = [row.title for row in RelatedContent.for_object(self.vacuum)]
+        self.assertEqual(titles[0], "Table bloat in Postgres")
+        self.assertIn("Autovacuum explained", titles)
+        # Tag neighbours still come before text neighbours.
+        titles = [row.title for row in RelatedContent.for_object(self.indexes)]
+        self.assertEqual(
+            titles[:2], ["Autovacuum explained", "Table bloat in Postgres"]
+        )
+
+    def test_suggest_tags_from_neighbours(self):
+        similarity.build()
+        self.assertEqual(
+            similarity.suggest_tags(self.vacuum, limit=2), ["postgres", "performance"]
+        )
+        self.assertEqual(similarity.suggest_tags(self.bloat), [])
+        self.assertEqual(
+            similarity.suggest_tags(self.bloat, limit=1, include_own=True), ["postgres"]
+        )
+
+    def test_auto_tag_offline(self):
+        with self.assertRaisesMessage(CommandError, "build_similarity_index"):
+            call_command("auto_tag_content", "--offline", stdout=StringIO())
+        similarity.build()
+        out = StringIO()
+        call_command("auto_tag_content", "--offline", "--max-tags", "1", stdout=out)
+        self.assertIn("Applying: postgres", out.getvalue())
+        self.assertEqual(list(self.vacuum.tags.names()), ["postgres"])
+        self.assertEqual(list(self.sourdough.tags.names()), ["baking"])
+
+
+@skipUnless(connection.vendor == "postgresql", "partial indexes checked on Postgres")
+class PublishedIndexPlanTests(TestCase):
+    """EXPLAIN the published() listings over 100k rows of each model."""
+
+    ROWS = 100_000
+
+    @classmethod
+    def setUpTestData(cls):
+        entry = Entry.objects.create(
+            title="Seed", slug="seed", summary="S", body="B", status="published"
+        )
+        blogmark = Blogmark.objects.create(
+            title="Seed",
+            slug="seed",
+            url="https://example.com/",
+            commentary="C",
+            status="published",
+        )
+        for obj in (entry, blogmark):
+            cls._fill(obj)
+
+    @classmethod
+    def _fill(cls, seed):
+        # Copy the seed row ROWS times in SQL: an hour apart, 1 in 10 a draft,
+        # 1 in 50 scheduled for tomorrow.
+        overrides = {
+            "slug": "t.slug || '-' || g",
+            "created": "t.created - g * interval '1 hour'",
+            "status": "CASE WHEN g %% 10 = 0 THEN 'draft' ELSE 'published' END",
+            "is_draft": "g %% 10 = 0",
+            "publish_date": "CASE WHEN g %% 50 = 1 THEN now() + interval '1 day' END",
+        }
+        overrides["published_at"] = (
+            f"COALESCE({overrides['publish_date']}, {overrides['created']})"
+        )
+        columns = [f.column for f in seed._meta.concrete_fields if not f.primary_key]
+        table = seed._meta.db_table
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"INSERT INTO {table} ({', '.join(columns)}) "
+                f"SELECT {', '.join(overrides.get(c, f't.{c}') for c in columns)} "
+                f"FROM {table} t, generate_series(1, %s) g WHERE t.id = %s",
+                [cls.ROWS, seed.pk],
+            )
+            cursor.execute(f"ANALYZE {table}")
+
+    def assertUsesIndex(self, queryset, index):
+        plan = queryset.explain()
+        self.assertIn(index, plan)
+        self.assertNotIn("Seq Scan", plan)
+
+    def test_latest_listings(self):
+        self.assertUsesIndex(
+            Entry.objects.published().order_by("-published_at")[:6],
+            "blog_entry_published_idx",
+        )
+        self.assertUsesIndex(
+            Blogmark.objects.published().order_by("-published_at")[:5],
+            "blog_blogmark_published_idx",
+        )
+        # Visibility is a bound on the index, not a filter on fetched rows.
+        plan = Entry.objects.published().order_by("-published_at")[:6].explain()
+        self.assertIn("Index Cond: (published_at <=", plan)
+        self.assertNotIn("Filter", plan)
+
+    def test_year_listing(self):
+        year = (timezone.now() - timedelta(days=800)).year
+        self.assertUsesIndex(
+            Entry.objects.published().filter(created__year=year).order_by("-created"),
+            "blog_entry_archive_idx",
+        )
+
+    def test_old_year_page_seeks_from_cursor(self):
+        # Years back, deep into the year: the scan starts at the cursor in
+        # the archive index, not at today's end of the published_at one.
+        last = Entry.objects.published().order_by("-created", "-id")[80_000]
+        year = timezone.localtime(last.created).year
+        request = RequestFactory().get(
+            "/", {"cursor": encode_cursor(NEXT, [last.created, "entry", last.id])}
+        )
+        with CaptureQueriesContext(connection) as queries:
+            timeline_page(
+                request, Q(**created_within(year_range(year))), order="created"
+            )
+        with connection.cursor() as cursor:
+            cursor.execute("EXPLAIN " + queries.captured_queries[0]["sql"])
+            plan = "\n".join(row[0] for row in cursor.fetchall())
+        self.assertIn("blog_entry_archive_idx", plan)
+        self.assertIn("blog_blogmark_archive_idx", plan)
+        self.assertIn("AND (created <= '", plan)
+        self.assertNotIn("published_idx", plan)
+        self.assertNotIn("Seq Scan", plan)
+
+    def test_permalink_is_one_index_probe(self):
+        entry = Entry.objects.published().order_by("created")[40_000]
+        local = timezone.localtime(entry.created)
+        queryset = Entry.objects.published().filter(
+            slug=entry.slug,
+            **created_within(day_range(local.year, local.month, local.day)),
+        )
+        self.assertEqual(list(queryset), [entry])
+        plan = queryset.explain()
+        self.assertIn("blog_entry_permalink_idx", plan)
+        self.assertIn("Index Cond: (((slug)::text =", plan)
+        self.assertNotIn("EXTRACT", plan.upper())
+
+    def test_scheduled_lookup(self):
+        self.assertUsesIndex(
+            Entry.objects.filter(
+                ~Q(status="published"), publish_date__lte=timezone.now()
+            ),
+            "blog_entry_scheduled_idx",
+        )
+
+
 class TemplateValidationTests(TestCase):
     """Test that all templates can be compiled without syntax errors."""
 
@@ -0,0 +1,495 @@
+import datetime
+import threading
+import time
+from io import StringIO
+from unittest import mock
+
+import markdown
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from blog import highlight, incremental, rendering
+from blog.models import Blogmark, Entry, derived_from
+from blog.rendering import (
+    RenderBudgetExceeded,
+    convert,
+    fallback_html,
+    get_converter,
+    render_document,
+    render_markdown,
+    render_or_fallback,
+)
+from blog.shortcodes import SHORTCODES, register
+from blog.templatetags.markdown_extras import preprocess_image_shortcodes
+from projects.models import Project
+
+
+class StoredRenderTests(TestCase):
+    def setUp(self):
+        self.entry = Entry.objects.create(
+            title="Stored",
+            slug="stored",
+            summary="A *summary*.",
+            body="# Heading\n\nBody {{img:a.jpg|right|300|Cap}} text.",
+            status="published",
+        )
+
+    def test_save_stores_html_and_hash(self):
+        self.entry.refresh_from_db()
+        self.assertIn("<h1>Heading</h1>", self.entry.body_html)
+        self.assertIn(
+            '<figure class="markdown-image float-right"', self.entry.body_html
+        )
+        self.assertEqual(self.entry.summary_html, "<p>A <em>summary</em>.</p>")
+        self.assertEqual(self.entry.summary_plain, "A summary.")
+        self.assertEqual(len(self.entry.rendered_hash), 64)
+
+    def test_properties_serve_stored_html_without_rendering(self):
+        entry = Entry.objects.get(pk=self.entry.pk)
+        with mock.patch("blog.models.render_document") as render:
+            self.assertEqual(entry.body_rendered, entry.body_html)
+            self.assertEqual(entry.summary_text, "A summary.")
+        render.assert_not_called()
+
+    def test_unsaved_edit_renders_live(self):
+        self.entry.body = "Changed"
+        self.assertEqual(self.entry.body_rendered, "<p>Changed</p>")
+
+    def test_save_only_rerenders_when_source_changes(self):
+        with mock.patch("blog.models.render_document") as render:
+            self.entry.title = "Retitled"
+            self.entry.save()
+        render.assert_not_called()
+
+        self.entry.body = "New body"
+        self.entry.save(update_fields=["body"])
+        self.entry.refresh_from_db()
+        self.assertEqual(self.entry.body_html, "<p>New body</p>")
+
+    def test_config_change_invalidates_stored_render(self):
+        with override_settings(MARKDOWN_OUTPUT_FORMAT="xhtml"):
+            self.assertNotEqual(
+                self.entry.compute_rendered_hash(), self.entry.rendered_hash
+            )
+
+    def test_blogmark_and_project_store_renders(self):
+        blogmark = Blogmark.objects.create(
+            title="Link", slug="link", url="https://example.com", commentary="**Hi**"
+        )
+        project = Project.objects.create(
+            title="Proj",
+            slug="proj",
+            summary="Short _one_",
+            body="Long",
+            start_date=datetime.date(2024, 1, 1),
+        )
+        self.assertEqual(blogmark.commentary_html, "<p><strong>Hi</strong></p>")
+        self.assertEqual(project.summary_plain, "Short one")
+        self.assertEqual(project.body_html, "<p>Long</p>")
+
+
+class RenderContentCommandTests(TestCase):
+    def setUp(self):
+        self.entry = Entry.objects.create(
+            title="Backfill", slug="backfill", summary="s", body="b"
+        )
+        # Simulate a row written before the stored-render columns existed.
+        Entry.objects.filter(pk=self.entry.pk).update(
+            rendered_hash="", body_html="", summary_html="", summary_plain=""
+        )
+
+    def test_backfills_stale_rows(self):
+        out = StringIO()
+        call_command("render_content", "--all", stdout=out)
+        self.assertIn("Rendered 1, unchanged 0", out.getvalue())
+        self.entry.refresh_from_db()
+        self.assertEqual(self.entry.body_html, "<p>b</p>")
+        self.assertEqual(self.entry.rendered_hash, self.entry.compute_rendered_hash())
+
+    def test_process_pool_renders_in_chunks(self):
+        for i in range(5):
+            Entry.objects.create(title=f"E{i}", slug=f"e{i}", summary="s", body=f"b{i}")
+        Entry.objects.update(rendered_hash="")
+        out = StringIO()
+        call_command(
+            "render_content",
+            "--type",
+            "entry",
+            "--jobs",
+            "2",
+            "--chunk-size",
+            "4",
+            stdout=out,
+        )
+        self.assertIn("Rendered 6, unchanged 0", out.getvalue())
+        self.assertIn("docs/sec", out.getvalue())
+        self.assertEqual(Entry.objects.get(slug="e3").body_html, "<p>b3</p>")
+
+    def test_since_and_after_pk_filters(self):
+        out = StringIO()
+        call_command("render_content", "--all", "--since", "2999-01-01", stdout=out)
+        self.assertIn("Rendered 0, unchanged 0", out.getvalue())
+        out = StringIO()
+        call_command(
+            "render_content",
+            "--type",
+            "entry",
+            "--after-pk",
+            str(self.entry.pk),
+            stdout=out,
+        )
+        self.assertIn("Rendered 0, unchanged 0", out.getvalue())
+        with self.assertRaisesMessage(CommandError, "--after-pk needs --type"):
+            call_command("render_content", "--all", "--after-pk", "1")
+
+    def test_current_rows_skipped_unless_forced(self):
+        call_command("render_content", "--type", "entry", stdout=StringIO())
+        out = StringIO()
+        call_command("render_content", "--type", "entry", stdout=out)
+        self.assertIn("Rendered 0, unchanged 1", out.getvalue())
+        out = StringIO()
+        call_command("render_content", "--type", "entry", "--force", stdout=out)
+        self.assertIn("Rendered 1, unchanged 0", out.getvalue())
+
+
+class PooledConverterTests(SimpleTestCase):
+    FOOTNOTED = "Text[^1].\n\n[^1]: Note.\n\n*[HTML]: Hyper Text\n\nHTML here."
+
+    def test_matches_markdown_markdown(self):
+        expected = markdown.markdown(
+            self.FOOTNOTED,
+            extensions=settings.MARKDOWN_EXTENSIONS,
+            output_format=settings.MARKDOWN_OUTPUT_FORMAT,
+        )
+        self.assertEqual(convert(self.FOOTNOTED), expected)
+        # Second pass on the reused instance must not carry state over.
+        self.assertEqual(convert(self.FOOTNOTED), expected)
+        self.assertNotIn("footnote", convert("Plain."))
+
+    def test_converter_reused_per_thread(self):
+        self.assertIs(get_converter(), get_converter())
+        other = []
+        thread = threading.Thread(target=lambda: other.append(get_converter()))
+        thread.start()
+        thread.join()
+        self.assertIsNot(other[0], get_converter())
+
+
+class ShortcodeEngineTests(SimpleTestCase):
+    def test_in_parse_expansion_matches_prepass(self):
+        docs = [
+            "{{img:a.jpg|right|300|A <caption>}}",
+            "Text before {{img:https://x.test/b.png|left|200}} and after.",
+            "# Title\n\n{{img:/c.jpg|full|800|Multi\nline}}\n\n* item\n\tindented",
+            "No shortcodes at all, just {{ braces }}.",
+        ]
+        for doc in docs:
+            with self.subTest(doc=doc):
+                self.assertEqual(
+                    render_markdown(doc), convert(preprocess_image_shortcodes(doc))
+                )
+
+    def test_registered_shortcode_expands(self):
+        register("shout", r"(\w+)")(lambda m: m.group(1).upper())
+        self.addCleanup(SHORTCODES.pop, "shout")
+        self.assertEqual(render_markdown("say {{shout:hi}}"), "<p>say HI</p>")
+
+
+class DerivedFieldMemoTests(TestCase):
+    def setUp(self):
+        self.entry = Entry(
+            title="Memo", slug="memo", summary="First *summary*", body="Body"
+        )
+
+    def test_repeated_reads_render_once(self):
+        with mock.patch(
+            "blog.models.render_document", side_effect=render_document
+        ) as render:
+            for _ in range(4):
+                self.assertEqual(self.entry.summary_text, "First summary")
+        self.assertEqual(render.call_count, 1)
+
+    def test_reassigning_source_invalidates(self):
+        self.assertEqual(self.entry.summary_text, "First summary")
+        self.entry.summary = "Second"
+        self.assertEqual(self.entry.summary_text, "Second")
+        self.assertEqual(self.entry.body_rendered, "<p>Body</p>")
+        self.entry.body = "Edited"
+        self.assertEqual(self.entry.body_rendered, "<p>Edited</p>")
+
+    def test_image_caption_helpers_memoized_and_invalidated(self):
+        self.entry.image_caption = "A *caption*"
+        with mock.patch("blog.models.convert", side_effect=convert) as render:
+            self.assertEqual(self.entry.image_alt_text, "A caption")
+            self.assertEqual(self.entry.image_alt_text, "A caption")
+        self.assertEqual(render.call_count, 1)
+        self.entry.image_caption = None
+        self.assertEqual(self.entry.image_alt_text, "Memo")
+
+    def test_none_is_memoized(self):
+        class Thing:
+            source = "x"
+            calls = 0
+
+            @derived_from("source")
+            def value(self):
+                self.calls += 1
+
+        thing = Thing()
+        self.assertIsNone(thing.value)
+        self.assertIsNone(thing.value)
+        self.assertEqual(thing.calls, 1)
+
+    def test_refresh_from_db_invalidates(self):
+        self.entry.save()
+        self.assertEqual(self.entry.summary_text, "First summary")
+        Entry.objects.filter(pk=self.entry.pk).update(
+            summary="Changed", summary_plain="Changed", rendered_hash=""
+        )
+        self.entry.refresh_from_db()
+        self.assertEqual(self.entry.summary_text, "Changed")
+
+
+@override_settings(
+    CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
+)
+class HighlightCacheTests(SimpleTestCase):
+    POST = "```python\nprint('hi')\n```\n\n    indented = True\n"
+
+    def setUp(self):
+        cache.clear()
+        highlight.reset()
+
+    def test_second_render_hits_memory_layer(self):
+        first = render_markdown(self.POST)
+        self.assertEqual(highlight.stats(), {"misses": 2})
+        self.assertEqual(render_markdown(self.POST), first)
+        self.assertEqual(highlight.stats()["memory_hits"], 2)
+        self.assertIn('<span class="nb">print</span>', first)
+
+    def test_shared_cache_serves_a_fresh_process(self):
+        first = render_markdown(self.POST)
+        highlight.reset()  # as if another worker
+        self.assertEqual(render_markdown(self.POST), first)
+        self.assertEqual(highlight.stats(), {"cache_hits": 2})
+
+    def test_key_depends_on_language_and_code(self):
+        render_markdown("```python\nx = 1\n```")
+        render_markdown("```ruby\nx = 1\n```")
+        render_markdown("```python\nx = 2\n```")
+        self.assertEqual(highlight.stats(), {"misses": 3})
+
+
+@override_settings(
+    CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}},
+    INCREMENTAL_MIN_CHARS=0,
+)
+class IncrementalRenderTests(SimpleTestCase):
+    CORPUS = [
+        "# Title\n\nPara *one*.\n\nPara two\nwraps.\n\n- a\n- b\n\n- loose\n\n"
+        "1. one\n2. two\n\nAfter.\n\n```python\nx = 1\n\n\ny = 2\n```\n\n"
+        "| a | b |\n|---|---|\n| 1 | 2 |\n\n> quote\n\n> more\n\nTerm\n: def\n\n"
+        "Setext\n======\n\n    indented\n\n---\n\n{{img:a.png|left|300|cap\n\nx}}"
+        "\n\nend",
+        "Term\n\n: spaced\n\nTerm 2\n: def\n\ntext\n\n~~~~\nfence\n\n~~~~\n\n"
+        "```\nunclosed\n\nrest",
+        "a\r\n\r\nb\r\n\r\n- x\r\n\r\n  continued\r\n\r\nc",
+    ]
+
+    def setUp(self):
+        cache.clear()
+        incremental.reset()
+
+    def test_matches_full_render(self):
+        for text in self.CORPUS:
+            with self.subTest(text=text[:20]):
+                self.assertGreater(len(incremental.split_blocks(text)), 1)
+                full = convert(text, shortcodes=True)
+                self.assertEqual(render_markdown(text), full)
+                self.assertEqual(render_markdown(text), full)  # from the cache
+
+    def test_only_changed_block_rerenders(self):
+        paragraphs = [f"Paragraph {n} with *some* text." for n in range(50)]
+        render_markdown("\n\n".join(paragraphs))
+        self.assertEqual(incremental.stats(), {"misses": 50})
+        incremental.reset()
+        paragraphs[20] = "Paragraph 20, edited."
+        edited = "\n\n".join(paragraphs)
+        with mock.patch(
+            "blog.rendering.render_block", wraps=rendering.render_block
+        ) as render_block:
+            html = render_markdown(edited)
+        render_block.assert_called_once_with("Paragraph 20, edited.")
+        self.assertEqual(html, convert(edited, shortcodes=True))
+
+    def test_document_wide_definitions_render_whole(self):
+        for text in [
+            "See [the docs][d].\n\nMore.\n\n[d]: https://example.com",
+            "Claim[^1].\n\nMore.\n\n[^1]: Source.",
+            "The HTML spec.\n\nMore.\n\n*[HTML]: Hyper Text Markup Language",
+            "Intro.\n\n<div>\n\nraw\n\n</div>",
+        ]:
+            with self.subTest(text=text):
+                self.assertIsNone(incremental.split_blocks(text))
+                self.assertEqual(render_markdown(text), convert(text, shortcodes=True))
+        self.assertEqual(incremental.stats(), {})
+
+    @override_settings(INCREMENTAL_MIN_CHARS=10_000)
+    def test_short_documents_render_whole(self):
+        render_markdown("One.\n\nTwo.")
+        self.assertEqual(incremental.stats(), {})
+
+
+@override_settings(MARKDOWN_MAX_CHARS=1000, MARKDOWN_RENDER_TIMEOUT=0.2)
+class RenderBudgetTests(TestCase):
+    # Nested brackets: tiny, but take Python-Markdown tens of seconds.
+    SLOW = "[" * 10000 + "x" + "]" * 10000
+
+    def test_oversized_source_is_refused(self):
+        with self.assertRaises(RenderBudgetExceeded):
+            render_markdown("word " * 300)
+        with self.assertLogs("blog.rendering", "WARNING") as logs:
+            html = render_or_fallback("<b>x</b> " * 200, "test doc")
+        self.assertEqual(html, fallback_html("<b>x</b> " * 200))
+        self.assertTrue(html.startswith('<pre class="markdown-fallback">&lt;b&gt;'))
+        self.assertIn("test doc", logs.output[0])
+
+    @override_settings(MARKDOWN_MAX_CHARS=100_000)
+    def test_slow_render_is_cut_off(self):
+        started = time.perf_counter()
+        with self.assertRaises(RenderBudgetExceeded):
+            render_markdown(self.SLOW)
+        self.assertLess(time.perf_counter() - started, 2)
+        # The thread's converters are rebuilt and keep working.
+        self.assertEqual(render_markdown("*ok*"), "<p><em>ok</em></p>")
+
+    def test_budget_fires_during_cache_lookup(self):
+        def slow_get(key, *args, **kwargs):
+            time.sleep(2)
+
+        started = time.perf_counter()
+        with (
+            mock.patch("blog.layered_cache.cache", **{"get.side_effect": slow_get}),
+            self.assertRaises(RenderBudgetExceeded),
+        ):
+            render_markdown("```python\nprint('over budget')\n```")
+        self.assertLess(time.perf_counter() - started, 1)
+
+    @override_settings(MARKDOWN_MAX_CHARS=100_000)
+    def test_save_keeps_last_good_render(self):
+        entry = Entry.objects.create(
+            title="Budget", slug="budget", summary="S", body="Good *body*."
+        )
+        entry.body = self.SLOW
+        with self.assertLogs("blog.rendering", "WARNING") as logs:
+            entry.save()
+        entry.refresh_from_db()
+        self.assertEqual(entry.body_html, "<p>Good <em>body</em>.</p>")
+        self.assertIn(f"blog.Entry pk={entry.pk} body", logs.output[0])
+        self.assertTrue(entry.render_failed)
+        # Reads serve the fallback; they do not render the markdown again.
+        with mock.patch.object(Entry, "render_source") as render_source:
+            self.assertEqual(entry.body_rendered, "<p>Good <em>body</em>.</p>")
+        render_source.assert_not_called()
+        # The next save retries it, unchanged or not.
+        with self.assertLogs("blog.rendering", "WARNING"):
+            entry.save()
+        entry.body = "Fixed *body*."
+        entry.save()
+        entry.refresh_from_db()
+        self.assertEqual(entry.body_html, "<p>Fixed <em>body</em>.</p>")
+        self.assertEqual(entry.rendered_hash, entry.compute_rendered_hash())
+        self.assertFalse(entry.render_failed)
+
+    def test_render_content_reports_over_budget_rows(self):
+        entry = Entry.objects.create(title="Big", slug="big", summary="S", body="ok")
+        Entry.objects.filter(pk=entry.pk).update(body="word " * 300, rendered_hash="")
+        err = StringIO()
+        with self.assertLogs("blog.rendering", "WARNING"):
+            call_command(
+                "render_content",
+                "--type",
+                "entry",
+                "--jobs",
+                "1",
+                stdout=StringIO(),
+                stderr=err,
+            )
+        self.assertIn("1 field(s) exceeded the render budget", err.getvalue())
+        entry.refresh_from_db()
+        self.assertEqual(entry.body_html, "<p>ok</p>")
+        self.assertTrue(entry.render_failed)  # retried on the next run
+        with self.assertLogs("blog.rendering", "WARNING"):
+            call_command(
+                "render_content",
+                "--type",
+                "entry",
+                "--jobs",
+                "1",
+                stdout=StringIO(),
+                stderr=StringIO(),
+            )
+
+
+class ContentManifestTests(TestCase):
+    SOURCE = (
+        "## Setup {#setup}\n\n"
+        "See [the docs](https://example.com/?a=1&b=2) and "
+        "![chart](/media/chart.png).\n\n"
+        "{{img:photo.jpg|center|600|A photo}}\n\n"
+        '<iframe src="https://www.youtube.com/embed/x"></iframe>\n\n'
+        "```python\nprint(1)\n```\n\n"
+        "```{.rust}\nfn main() {}\n```\n\n"
+        "```\nplain\n```\n\n"
+        "### Again [the docs](https://example.com/?a=1&b=2)\n"
+    )
+
+    def test_manifest_collected_with_render(self):
+        html, manifest = render_document(self.SOURCE, blocks=False)
+        self.assertEqual(html, render_markdown(self.SOURCE, blocks=False))
+        self.assertEqual(
+            manifest,
+            {
+                "headings": [[2, "Setup", "setup"], [3, "Again the docs", None]],
+                "links": ["https://example.com/?a=1&b=2"],
+                "images": ["/media/chart.png", "/media/photo.jpg"],
+                "media": ["https://www.youtube.com/embed/x"],
+                "code": ["python", "rust"],
+            },
+        )
+        self.assertEqual(render_document("Just prose.")[1], {})
+        self.assertEqual(render_document("")[1], {})
+
+    @override_settings(INCREMENTAL_MIN_CHARS=0)
+    def test_block_render_matches_whole_document(self):
+        incremental.reset()
+        self.assertEqual(
+            render_document(self.SOURCE), render_document(self.SOURCE, blocks=False)
+        )
+        # Served from the block cache this time.
+        self.assertEqual(
+            render_document(self.SOURCE), render_document(self.SOURCE, blocks=False)
+        )
+
+    def test_stored_on_save_across_fields(self):
+        entry = Entry.objects.create(
+            title="Manifest",
+            slug="manifest",
+            summary="[Home](/) and [docs](https://example.com/)",
+            body="[Docs](https://example.com/)\n\n```bash\nls\n```",
+        )
+        entry.refresh_from_db()
+        self.assertEqual(
+            entry.content_manifest,
+            {"links": ["/", "https://example.com/"], "code": ["bash"]},
+        )
+        # Key transforms work on every backend (__contains needs PostgreSQL).
+        self.assertTrue(Entry.objects.filter(content_manifest__code__0="bash").exists())
+        entry.body = "No links now."
+        entry.save()
+        entry.refresh_from_db()
+        self.assertEqual(
+            entry.content_manifest, {"links": ["/", "https://example.com/"]}
+        )
@@ -8,7 +8,9 @@ app_name = "til"
 
 urlpatterns = [
     path("", views.index, name="index"),
-    path("<int:year>/<str:month>/<int:day>/<slug:slug>/", views.detail, name="detail"),
+    path(
+        "<int:year>/<month:month>/<int:day>/<slug:slug>/", views.detail, name="detail"
+    ),
     path("tag/<slug:slug>/", views.tag, name="tag"),
     path("search/", views.search, name="search"),
     path("feed/", views.feed, name="feed"),
@@ -12,7 +12,7 @@ from django.shortcuts import redirect
 from django.urls import reverse
 
 from blog.models import Entry
-from blog.views import get_month_number
+from blog.utils import created_within, day_range
 
 
 def index(request):
@@ -27,12 +27,11 @@ def detail(request, year, month, day, slug):
     rather than 301 into a dead end). The migration suffixes slugs on
     collision, so fall back to "<slug>-til" before giving up.
     """
-    same_day = Entry.objects.filter(
-        status="published",
-        created__year=year,
-        created__month=get_month_number(month),
-        created__day=day,
-    )
+    try:
+        bounds = day_range(year, month, day)
+    except ValueError:
+        raise Http404("No published entry for this TIL URL")
+    same_day = Entry.objects.filter(status="published", **created_within(bounds))
     entry = (
         same_day.filter(slug=slug).first()
         or same_day.filter(slug=f"{slug}-til").first()